@@ -1,10 +1,20 @@
-from flask import Flask, render_template, request, jsonify, redirect, url_for, session
+from flask import Flask, render_template, request, jsonify, redirect, url_for, session, Response, stream_with_context
 import json
 import os
+import time
+import itertools
 from dotenv import load_dotenv
 import logging
-from local_llm import LocalLLM
+import config
 from tamil_chat import TamilChat
+from utils.component_loader import ComponentLoader, FAILED
+from utils.generation_backends import NoBackendAvailable, build_router
+from utils.inference_scheduler import SchedulerBusy, SchedulerTimeout
+from utils.intent_detector import get_detector, quick_response
+from utils.async_logging import log_response, setup_async_logging
+from utils.knowledge_base import get_knowledge_base
+from utils.metrics import registry, span, trace
+from utils.nearby import SERVICE_TYPES, get_nearby_index
 import sys
 
 # Load environment variables
@@ -12,41 +22,78 @@ load_dotenv()
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
+if config.ASYNC_LOGGING:
+    setup_async_logging()
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 app.secret_key = os.getenv('FLASK_SECRET_KEY', 'your-secret-key-here')
 
-# Google Maps API key
+# Google Maps API key, only used to draw the map; nearby places come from the local index
 GOOGLE_MAPS_API_KEY = os.getenv('GOOGLE_MAPS_API_KEY')
 if not GOOGLE_MAPS_API_KEY:
-    logger.error("Google Maps API key not found in environment variables. Nearby services will not work.")
-    GOOGLE_MAPS_API_KEY = "YOUR_API_KEY_HERE"  # Replace with your actual API key
-
-# Initialize the local LLM and Tamil chat
-try:
-    llm = LocalLLM()
-    tamil_chat = TamilChat()
-    logger.info("Local LLM and Tamil chat initialized successfully")
-except Exception as e:
-    logger.error(f"Failed to initialize chat systems: {str(e)}")
-    # Initialize with basic functionality if LLM fails
-    llm = None
-    tamil_chat = TamilChat()
-    logger.warning("Initialized with basic functionality (LLM disabled)")
-
-# Load data from JSON files
-def load_json_data(filename):
-    try:
-        with open(f'static/data/{filename}', 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except Exception as e:
-        logger.error(f"Error loading {filename}: {str(e)}")
-        return {}
+    logger.warning("Google Maps API key not found in environment variables. Nearby services are listed without a map.")
+
+# Initialize the Tamil chat and local LLM in the background so the app accepts traffic immediately;
+# keyword answers are served until they are ready, and the app keeps basic functionality if the LLM fails
+def load_llm():
+    """Connect to the shared inference server if configured, otherwise load the models in-process"""
+    if config.INFERENCE_SERVER['address']:
+        from utils.inference_client import RemoteLLM, server_authkey
+        return RemoteLLM(
+            config.INFERENCE_SERVER['address'],
+            server_authkey(config.INFERENCE_SERVER['authkey']),
+            pool_size=config.INFERENCE_SERVER['pool_size'],
+            allow_remote=config.INFERENCE_SERVER['allow_remote']
+        )
+    from local_llm import LocalLLM
+    return LocalLLM(tamil_chat=components.get('tamil_chat'))
+
+def load_rag():
+    from rag_system import RAGSystem
+    return RAGSystem()
+
+def load_tamil_gpt2():
+    from utils.tamil_gpt2 import TamilGPT2Chatbot
+    return TamilGPT2Chatbot()
+
+components = ComponentLoader()
+components.register('tamil_chat', TamilChat)
+components.register('llm', load_llm, required=False)
+
+# Optional backends are only loaded when the routing order uses them
+routed = {name for names in config.GENERATION_BACKENDS['order'].values() for name in names}
+if 'openai' in routed:
+    components.register('openai', load_rag, required=False)
+if 'tamil_gpt2' in routed:
+    components.register('tamil_gpt2', load_tamil_gpt2, required=False)
+components.start()
+
+# Each chat request goes to the first backend for its language that is loaded and can answer in time
+router = build_router(components.get)
+
+UNAVAILABLE_MESSAGE = "I apologize, but the advanced chat functionality is currently unavailable. Please try again later."
+BUSY_MESSAGE = "The assistant is busy right now. Please try again in a few seconds."
+TIMEOUT_MESSAGE = "The assistant took too long to respond. Please try again."
+WARMING_UP_MESSAGES = {
+    'english': "The assistant is still starting up. Please try again in a minute. For emergencies, call 100 immediately.",
+    'tamil': "உதவியாளர் தொடங்கிக் கொண்டிருக்கிறது. ஒரு நிமிடத்தில் மீண்டும் முயற்சிக்கவும். அவசர உதவிக்கு உடனே 100-ஐ அழையுங்கள்."
+}
+
+def basic_response(user_message, language):
+    """Keyword answers served while the chat systems are loading or unavailable"""
+    if language == 'tamil':
+        return WARMING_UP_MESSAGES['tamil']
+    
+    response = quick_response(user_message.strip()) or get_detector().pattern_response(user_message)
+    if response:
+        return response
+    if components.status()['llm']['state'] == FAILED:
+        return UNAVAILABLE_MESSAGE
+    return WARMING_UP_MESSAGES['english']
 
-# Load data
-departments = load_json_data('departments.json')
-common_queries = load_json_data('common_queries.json')
+# Knowledge base files are parsed once and reloaded when edited
+knowledge_base = get_knowledge_base()
 
 @app.route('/')
 def index():
@@ -65,12 +112,118 @@ def english():
 @app.route('/nearby')
 def nearby():
     lang = session.get('lang', 'english')
-    if GOOGLE_MAPS_API_KEY == "YOUR_API_KEY_HERE":
-        return render_template('error.html', 
-                             message="Google Maps API key is not configured. Please contact the administrator.",
-                             lang=lang)
     return render_template('nearby.html', lang=lang, google_maps_api_key=GOOGLE_MAPS_API_KEY)
 
+@app.route('/nearby/api')
+def nearby_api():
+    """The k nearest places of each service type to ``lat``/``lon``, answered offline from the local index"""
+    settings = config.NEARBY_SETTINGS
+    try:
+        lat = float(request.args['lat'])
+        lon = float(request.args['lon'])
+        k = int(request.args.get('k', settings['default_k']))
+    except (KeyError, ValueError):
+        return jsonify({'error': 'lat and lon must be numbers and k an integer'}), 400
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return jsonify({'error': 'lat must be within [-90, 90] and lon within [-180, 180]'}), 400
+    if not 1 <= k <= settings['max_k']:
+        return jsonify({'error': f"k must be between 1 and {settings['max_k']}"}), 400
+    
+    types = [t for t in request.args.get('type', '').split(',') if t] or list(SERVICE_TYPES)
+    unknown = sorted(set(types) - set(SERVICE_TYPES))
+    if unknown:
+        return jsonify({'error': f"Unknown service type {', '.join(unknown)}; use {', '.join(SERVICE_TYPES)}"}), 400
+    
+    with span('nearby_search'):
+        results = get_nearby_index().nearest(lat, lon, k, types, settings['max_distance_km'])
+    return jsonify({'lat': lat, 'lon': lon, 'k': k, 'results': results})
+
+# Chat metrics, exposed at /metrics along with the per-stage timings
+CHAT_REQUESTS = registry.counter('chat_requests_total', "Chat requests by response mode and HTTP status", ['mode', 'status'])
+CHAT_SECONDS = registry.histogram('chat_request_seconds', "Time to the complete chat response", ['mode'])
+FIRST_TOKEN_SECONDS = registry.histogram('chat_first_token_seconds', "Time to the first streamed piece of a response")
+
+def chat_response(user_message, language):
+    """Answer a chat message with the best generation backend that is available"""
+    try:
+        return router.generate(user_message, language)
+    except NoBackendAvailable:
+        return basic_response(user_message, language)
+
+def chat_chunks(user_message, language):
+    """Like chat_response, but yields the answer in pieces as the model generates it"""
+    try:
+        return router.stream(user_message, language)
+    except NoBackendAvailable:
+        return iter([basic_response(user_message, language)])
+
+def traced_chat_response(user_message, language):
+    """chat_response plus the time spent in each stage on this thread"""
+    with trace() as stages:
+        response = chat_response(user_message, language)
+    return response, dict(stages)
+
+def traced_chat_chunks(user_message, language, stages):
+    """chat_chunks, adding the time spent in each stage while a piece is produced to ``stages``.
+
+    Every piece is traced on its own, since the pieces may be read from different threads.
+    """
+    with trace(into=stages):
+        chunks = chat_chunks(user_message, language)
+    try:
+        while True:
+            with trace(into=stages):
+                chunk = next(chunks, None)
+            if chunk is None:
+                return
+            yield chunk
+    finally:
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            close()
+
+def stream_line(**fields):
+    """One line of the NDJSON chat stream"""
+    return json.dumps(fields, ensure_ascii=False) + '\n'
+
+def stream_chat(user_message, language):
+    """Stream a chat response as newline-delimited JSON.
+
+    Each line is ``{"token": ...}`` while the answer is generated, followed by a
+    final ``{"done": true, "response": ..., "language": ...}`` line carrying the
+    full text so clients can fall back to the non-streaming contract.
+    """
+    start = time.perf_counter()
+    stages = {}
+    chunks = traced_chat_chunks(user_message, language, stages)
+    
+    # Wait for the first piece here so a full queue still becomes a 503 rather than a broken stream
+    first_chunk = next(chunks, None)
+    first_token = time.perf_counter() - start
+    FIRST_TOKEN_SECONDS.observe(first_token)
+    
+    def generate():
+        parts = []
+        
+        try:
+            for chunk in itertools.chain([first_chunk] if first_chunk is not None else [], chunks):
+                parts.append(chunk)
+                yield stream_line(token=chunk)
+        except SchedulerTimeout:
+            logger.warning(f"Streamed response for '{user_message}' timed out")
+            yield stream_line(done=True, error=TIMEOUT_MESSAGE, response=''.join(parts).strip(), language=language)
+            return
+        
+        response = ''.join(parts).strip()
+        total = time.perf_counter() - start
+        CHAT_SECONDS.observe(total, mode='stream')
+        stages['first_token'] = first_token
+        log_response(user_message, language, response, total, config.RESPONSE_LOG_SAMPLE_RATE, stages)
+        yield stream_line(done=True, response=response, language=language)
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @app.route('/chat', methods=['GET', 'POST'])
 def chat_page():
     if request.method == 'POST':
@@ -82,23 +235,39 @@ def chat_page():
             if not user_message:
                 return jsonify({'error': 'Empty message'}), 400
             
+            # Clients that ask for it get tokens as they are generated
+            if data.get('stream'):
+                return stream_chat(user_message, language)
+            
+            start = time.perf_counter()
+            
             # Get response based on language
-            if language == 'tamil':
-                response = tamil_chat.get_response(user_message)
-            else:
-                if llm is None:
-                    response = "I apologize, but the advanced chat functionality is currently unavailable. Please try again later."
-                else:
-                    response = llm.get_response(user_message, language)
+            response, stages = traced_chat_response(user_message, language)
             
-            # Log the response for debugging
-            logger.info(f"Response for '{user_message}' ({language}): {response}")
+            # Without streaming the first token arrives with the last
+            total = time.perf_counter() - start
+            CHAT_SECONDS.observe(total, mode='json')
+            log_response(user_message, language, response, total, config.RESPONSE_LOG_SAMPLE_RATE, stages)
             
             return jsonify({
                 'response': response,
                 'language': language
             })
             
+        except SchedulerBusy:
+            logger.warning("Chat request rejected: inference queue is full")
+            response = jsonify({
+                'error': BUSY_MESSAGE,
+                'busy': True
+            })
+            response.headers['Retry-After'] = '5'
+            return response, 503
+        except SchedulerTimeout:
+            logger.warning("Chat request timed out waiting for the model")
+            return jsonify({
+                'error': TIMEOUT_MESSAGE,
+                'busy': True
+            }), 504
         except Exception as e:
             logger.error(f"Error in chat endpoint: {str(e)}")
             return jsonify({
@@ -109,15 +278,57 @@ def chat_page():
     # For GET requests, redirect to home page
     return redirect(url_for('index'))
 
+@app.after_request
+def count_chat_request(response):
+    if request.path == '/chat' and request.method == 'POST':
+        mode = 'stream' if response.mimetype == 'application/x-ndjson' else 'json'
+        CHAT_REQUESTS.inc(mode=mode, status=response.status_code)
+    return response
+
+@app.route('/metrics')
+def metrics():
+    # Prometheus text format; a shared inference server's stages are appended under an inference_ prefix
+    text = registry.render()
+    llm = components.get('llm')
+    remote_metrics = getattr(llm, 'metrics', None)
+    if remote_metrics is not None:
+        try:
+            text += remote_metrics()
+        except Exception as e:
+            logger.warning(f"Could not read inference server metrics: {str(e)}")
+    return Response(text, mimetype='text/plain; version=0.0.4')
+
+@app.route('/stats')
+def stats():
+    llm = components.get('llm')
+    if llm is None:
+        return jsonify({'error': 'LLM is not loaded'}), 503
+    return jsonify(dict(llm.stats(), backends=router.stats()))
+
+@app.route('/healthz')
+def healthz():
+    # Liveness: the process is up and serving, whatever the models are doing
+    return jsonify({'status': 'ok', 'components': {name: c['state'] for name, c in components.status().items()}})
+
+@app.route('/readyz')
+def readyz():
+    status = components.status()
+    llm = components.get('llm')
+    if llm is not None and 'llm' in status:
+        status['llm']['stages'] = llm.startup_timings
+    ready = components.is_ready()
+    degraded = any(c['state'] == FAILED for c in status.values())
+    return jsonify({'ready': ready, 'degraded': degraded, 'components': status}), 200 if ready else 503
+
 @app.route('/departments')
 def departments_page():
     lang = session.get('lang', 'english')
-    return render_template('departments.html', departments=departments, lang=lang)
+    return render_template('departments.html', departments=knowledge_base.get('departments', {}), lang=lang)
 
 @app.route('/common-queries')
 def common_queries_page():
     lang = session.get('lang', 'english')
-    return render_template('common-queries.html', queries=common_queries[lang], lang=lang)
+    return render_template('common-queries.html', queries=knowledge_base.get('common_queries', {})[lang], lang=lang)
 
 @app.route('/kids-mode')
 def kids_mode():
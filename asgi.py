@@ -0,0 +1,209 @@
+"""Asyncio serving mode for many concurrent, mostly idle chat connections.
+
+    uvicorn asgi:app --host 0.0.0.0 --port 5000 --workers 4 --limit-concurrency 4000
+
+With gunicorn every open /chat request, streaming or not, holds a worker
+thread while it waits for llama.cpp. Here /chat runs on the event loop:
+waiting connections cost a coroutine, and model calls are handed to a small
+bounded thread pool (config.ASGI_SETTINGS). Requests that would exceed
+``max_pending`` get the same 503 "busy" answer as a full inference queue.
+Set INFERENCE_SERVER_ADDRESS so the uvicorn workers share one model process.
+
+Every other route (pages, static files, /stats, /healthz, /readyz) is the
+Flask app from app.py, mounted as WSGI.
+"""
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.background import BackgroundTask
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Mount, Route
+
+import config
+from app import (BUSY_MESSAGE, CHAT_REQUESTS, CHAT_SECONDS, FIRST_TOKEN_SECONDS, TIMEOUT_MESSAGE, app as flask_app,
+                 stream_line, traced_chat_chunks, traced_chat_response)
+from utils.async_logging import log_response
+from utils.inference_scheduler import SchedulerBusy, SchedulerTimeout
+
+logger = logging.getLogger(__name__)
+
+executor = ThreadPoolExecutor(max_workers=config.ASGI_SETTINGS['executor_workers'],
+                              thread_name_prefix='chat-executor')
+_pending = None
+_DONE = object()
+
+
+class _Slot:
+    """A place among the pending requests, released exactly once"""
+
+    def __init__(self, semaphore: asyncio.Semaphore):
+        self.semaphore = semaphore
+        self.held = True
+
+    def release(self) -> None:
+        if self.held:
+            self.held = False
+            self.semaphore.release()
+
+
+def pending_slots() -> asyncio.Semaphore:
+    # Created lazily so it belongs to the running event loop
+    global _pending
+    if _pending is None:
+        _pending = asyncio.Semaphore(config.ASGI_SETTINGS['max_pending'])
+    return _pending
+
+
+async def run_blocking(fn, *args):
+    """Run a blocking model call on the bounded executor"""
+    return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+
+
+async def iterate_blocking(iterator):
+    """Consume a blocking iterator chunk by chunk without tying up the event loop"""
+    loop = asyncio.get_running_loop()
+    pending = None
+    try:
+        while True:
+            # Shielded: cancelling the await cannot stop next() on its thread, so the future is kept to wait on
+            pending = loop.run_in_executor(executor, next, iterator, _DONE)
+            chunk = await asyncio.shield(pending)
+            pending = None
+            if chunk is _DONE:
+                return
+            yield chunk
+    finally:
+        # A client that disconnects mid-stream frees its place in the inference queue
+        close = getattr(iterator, 'close', None)
+        if close is not None:
+            await asyncio.shield(asyncio.ensure_future(_close_blocking(iterator, pending)))
+
+
+async def _close_blocking(iterator, pending) -> None:
+    """Close ``iterator`` on the executor once the ``next()`` still running on it, if any, has returned"""
+    if pending is not None:
+        await asyncio.wait([pending])
+    try:
+        await run_blocking(iterator.close)
+    except Exception as e:
+        logger.warning(f"Error closing response stream: {str(e)}")
+
+
+def busy_response() -> JSONResponse:
+    return JSONResponse({'error': BUSY_MESSAGE, 'busy': True}, status_code=503, headers={'Retry-After': '5'})
+
+
+async def stream_chat(user_message: str, language: str, slot: _Slot) -> StreamingResponse:
+    """NDJSON stream with the same lines as app.stream_chat"""
+    start = time.perf_counter()
+    stages = {}
+    chunks = iterate_blocking(traced_chat_chunks(user_message, language, stages))
+
+    # Wait for the first piece here so a full queue still becomes a 503 rather than a broken stream
+    first_chunk = None
+    try:
+        async for chunk in chunks:
+            first_chunk = chunk
+            break
+    except Exception:
+        await chunks.aclose()
+        raise
+    first_token = time.perf_counter() - start
+    FIRST_TOKEN_SECONDS.observe(first_token)
+
+    async def generate():
+        parts = []
+        try:
+            if first_chunk is not None:
+                parts.append(first_chunk)
+                yield stream_line(token=first_chunk)
+            async for chunk in chunks:
+                parts.append(chunk)
+                yield stream_line(token=chunk)
+        except SchedulerTimeout:
+            logger.warning(f"Streamed response for '{user_message}' timed out")
+            yield stream_line(done=True, error=TIMEOUT_MESSAGE, response=''.join(parts).strip(), language=language)
+            return
+        finally:
+            await chunks.aclose()
+            slot.release()
+
+        response = ''.join(parts).strip()
+        total = time.perf_counter() - start
+        CHAT_SECONDS.observe(total, mode='stream')
+        stages['first_token'] = first_token
+        log_response(user_message, language, response, total, config.RESPONSE_LOG_SAMPLE_RATE, stages)
+        yield stream_line(done=True, response=response, language=language)
+
+    # The background task covers clients that disconnect before the body starts
+    return StreamingResponse(generate(), media_type='application/x-ndjson',
+                             headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+                             background=BackgroundTask(slot.release))
+
+
+async def chat(request: Request):
+    response = await _chat(request)
+    mode = 'stream' if isinstance(response, StreamingResponse) else 'json'
+    CHAT_REQUESTS.inc(mode=mode, status=response.status_code)
+    return response
+
+
+async def _chat(request: Request):
+    try:
+        data = await request.json()
+        user_message = data.get('message', '')
+        language = data.get('language', 'english')
+    except Exception:
+        return JSONResponse({'error': 'Invalid JSON body'}, status_code=400)
+
+    if not user_message:
+        return JSONResponse({'error': 'Empty message'}, status_code=400)
+
+    slots = pending_slots()
+    if slots.locked():
+        logger.warning("Chat request rejected: too many pending requests")
+        return busy_response()
+    await slots.acquire()
+    slot = _Slot(slots)
+
+    streaming = False
+    try:
+        if data.get('stream'):
+            response = await stream_chat(user_message, language, slot)
+            # The stream releases the slot when it finishes
+            streaming = True
+            return response
+
+        start = time.perf_counter()
+        response, stages = await run_blocking(traced_chat_response, user_message, language)
+        total = time.perf_counter() - start
+        CHAT_SECONDS.observe(total, mode='json')
+        log_response(user_message, language, response, total, config.RESPONSE_LOG_SAMPLE_RATE, stages)
+        return JSONResponse({'response': response, 'language': language})
+
+    except SchedulerBusy:
+        logger.warning("Chat request rejected: inference queue is full")
+        return busy_response()
+    except SchedulerTimeout:
+        logger.warning("Chat request timed out waiting for the model")
+        return JSONResponse({'error': TIMEOUT_MESSAGE, 'busy': True}, status_code=504)
+    except Exception as e:
+        logger.error(f"Error in chat endpoint: {str(e)}")
+        return JSONResponse({
+            'error': 'An error occurred while processing your request.',
+            'details': str(e)
+        }, status_code=500)
+    finally:
+        if not streaming:
+            slot.release()
+
+
+app = Starlette(routes=[
+    Route('/chat', chat, methods=['POST']),
+    Mount('/', app=WSGIMiddleware(flask_app, workers=config.ASGI_SETTINGS['wsgi_workers']))
+])
@@ -0,0 +1,76 @@
+"""Micro-benchmarks of the chat hot path, one component at a time.
+
+    python benchmarks/bench_components.py --iterations 200
+    python benchmarks/bench_components.py --real-llm --real-embedder --iterations 20
+
+Times TamilChat.get_response on the Tamil queries, and LocalLLM query
+embedding, retrieval (LocalLLM._get_relevant_context) and generation (time
+to first token and total, bypassing the response cache) on the English
+ones. Stub models from stubs.py are used unless the real ones are asked for.
+"""
+import argparse
+import time
+
+from common import latency_summary, load_query_mix, save_results
+
+import stubs
+
+
+def timed(fn, inputs, iterations):
+    seconds = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        fn(inputs[i % len(inputs)])
+        seconds.append(time.perf_counter() - start)
+    return latency_summary(seconds)
+
+
+def generation(llm, questions, iterations):
+    first_tokens, totals = [], []
+    for i in range(iterations):
+        prompt = llm._build_prompt(questions[i % len(questions)])
+        start = time.perf_counter()
+        chunks = llm.scheduler.stream(llm._generate, prompt)
+        next(chunks, None)
+        first_tokens.append(time.perf_counter() - start)
+        for _ in chunks:
+            pass
+        totals.append(time.perf_counter() - start)
+    return {'first_token': latency_summary(first_tokens), 'total': latency_summary(totals)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--generations', type=int, default=20)
+    parser.add_argument('--real-llm', action='store_true')
+    parser.add_argument('--real-embedder', action='store_true')
+    args = parser.parse_args()
+
+    stubs.install(llama=not args.real_llm, embedder=not args.real_embedder)
+    from local_llm import LocalLLM
+
+    queries = load_query_mix()
+    english = [message for message, language in queries if language == 'english']
+    tamil = [message for message, language in queries if language == 'tamil']
+
+    start = time.perf_counter()
+    llm = LocalLLM()
+    results = {'startup_s': time.perf_counter() - start, 'documents': len(llm.documents)}
+
+    results['tamil_chat'] = timed(llm.tamil_chat.get_response, tamil, args.iterations)
+    results['embedding'] = timed(llm._embed_query, english, args.iterations)
+    results['retrieval'] = timed(llm._get_relevant_context, english, args.iterations)
+    results['generation'] = generation(llm, english, args.generations)
+
+    for name in ('tamil_chat', 'embedding', 'retrieval'):
+        print(f"{name:>11}: p50 {results[name]['p50_ms']:.2f} ms, p95 {results[name]['p95_ms']:.2f} ms")
+    print(f" generation: first token p50 {results['generation']['first_token']['p50_ms']:.0f} ms, "
+          f"total p50 {results['generation']['total']['p50_ms']:.0f} ms")
+
+    results['backend'] = {'llm': 'real' if args.real_llm else 'stub', 'embedder': 'real' if args.real_embedder else 'stub'}
+    save_results('components', results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""Cold start and per-worker memory of document embeddings.
+
+Each mode runs in a fresh process to mimic a gunicorn worker booting:
+
+    python benchmarks/bench_embedding_store.py
+
+``baseline`` encodes the whole corpus like the old ``LocalLLM.__init__``,
+``store-cold`` starts from an empty store and ``store-warm`` maps the
+store written by the cold run.
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import memory_mb, save_results
+
+import config
+from sentence_transformers import SentenceTransformer
+from utils.embedding_store import EmbeddingStore
+from utils.knowledge_base import get_knowledge_base
+from utils.retriever import prepare_documents
+
+
+def load_documents():
+    return prepare_documents(get_knowledge_base().snapshot())[0]
+
+
+def run_mode(mode: str, cache_dir: str) -> dict:
+    start = time.perf_counter()
+    model_name = config.EMBEDDING_SETTINGS['model_name']
+    embedder = SentenceTransformer(model_name, device='cpu', cache_folder='./model_cache')
+    model_seconds = time.perf_counter() - start
+
+    documents = load_documents()
+    start = time.perf_counter()
+    if mode == 'baseline':
+        embeddings = embedder.encode(documents, batch_size=32)
+    else:
+        store = EmbeddingStore(model_name, cache_dir)
+        embeddings = store.get_embeddings(documents, lambda docs: embedder.encode(docs, batch_size=32))
+    embed_seconds = time.perf_counter() - start
+
+    return {
+        'documents': len(documents),
+        'shape': list(embeddings.shape),
+        'model_load_s': model_seconds,
+        'embeddings_s': embed_seconds,
+        **memory_mb(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--mode', choices=['baseline', 'store-cold', 'store-warm'])
+    parser.add_argument('--cache-dir')
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(run_mode(args.mode, args.cache_dir)))
+        return
+
+    cache_dir = tempfile.mkdtemp(prefix='embedding-store-')
+    results = {}
+    try:
+        for mode in ['baseline', 'store-cold', 'store-warm']:
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--mode', mode, '--cache-dir', cache_dir],
+                check=True, capture_output=True, text=True
+            ).stdout
+            results[mode] = json.loads(output.strip().splitlines()[-1])
+            print(f"{mode:>11}: embeddings {results[mode]['embeddings_s']:.3f}s, "
+                  f"rss {results[mode]['rss_mb']:.1f} MB, private {results[mode]['private_mb']:.1f} MB")
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+    save_results('embedding_store', results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""Per-query latency of Tamil fuzzy matching against corpus size.
+
+    python benchmarks/bench_fuzzy_matcher.py --sizes 100 1000 10000
+
+The Tamil knowledge base queries are replicated with shuffled word order
+and synthetic words to reach each corpus size. ``linear`` is the old
+TamilChat scan that re-tokenized every key per miss. Both use TamilChat's
+tokenizer (utils.tokenizer), so only the matching strategy differs.
+"""
+import argparse
+import json
+import random
+import time
+
+from common import latency_summary, save_results
+
+import config
+from utils.fuzzy_matcher import FuzzyMatcher
+from utils.tokenizer import get_tokenizer
+
+tokenize = get_tokenizer(config.TOKENIZER_SETTINGS['tamil_stemming'])
+
+
+def linear_match(message, keys):
+    message_words = set(tokenize(message))
+    best_match, best_score = None, 0
+    for query in keys:
+        query_words = set(tokenize(query))
+        union = len(message_words | query_words)
+        if union:
+            score = len(message_words & query_words) / union
+            if score > 0.2 and score > best_score:
+                best_match, best_score = query, score
+    return best_match
+
+
+def build_corpus(size, seed=0):
+    with open('static/data/tamil_responses.json', 'r', encoding='utf-8') as f:
+        base = list(json.load(f)['common_queries'].keys())
+    with open('static/data/tamil_qa.json', 'r', encoding='utf-8') as f:
+        for items in json.load(f).values():
+            if isinstance(items, dict):
+                base.extend(items.keys())
+    rng = random.Random(seed)
+    words = [w for key in base for w in key.split()]
+    corpus = list(base)
+    while len(corpus) < size:
+        corpus.append(' '.join(rng.sample(words, rng.randint(2, 6))))
+    return corpus[:size], base
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--queries', type=int, default=100)
+    parser.add_argument('--skip-linear-above', type=int, default=2000)
+    args = parser.parse_args()
+
+    results = {}
+    for size in args.sizes:
+        corpus, base = build_corpus(size)
+        rng = random.Random(1)
+        messages = [' '.join(rng.sample(key.split(), max(1, len(key.split()) - 1))) for key in rng.choices(base, k=args.queries)]
+
+        start = time.perf_counter()
+        matcher = FuzzyMatcher(corpus, tokenize, **config.TAMIL_MATCH_SETTINGS)
+        build_seconds = time.perf_counter() - start
+
+        indexed = []
+        for message in messages:
+            start = time.perf_counter()
+            matcher.best_match(message)
+            indexed.append(time.perf_counter() - start)
+        results[size] = {'indexed': latency_summary(indexed), 'build_s': build_seconds}
+
+        if size <= args.skip_linear_above:
+            linear = []
+            for message in messages:
+                start = time.perf_counter()
+                linear_match(message, corpus)
+                linear.append(time.perf_counter() - start)
+            results[size]['linear'] = latency_summary(linear)
+
+        line = f"{size:>6} queries  indexed p50 {results[size]['indexed']['p50_ms']:.3f} ms"
+        if 'linear' in results[size]:
+            line += f"  linear p50 {results[size]['linear']['p50_ms']:.3f} ms"
+        print(line + f"  build {build_seconds:.2f}s")
+    save_results('fuzzy_matcher', results)
+
+
+if __name__ == '__main__':
+    main()
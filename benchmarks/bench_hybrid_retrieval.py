@@ -0,0 +1,91 @@
+"""Dense-only vs hybrid (BM25 + dense, reciprocal rank fusion) retrieval: hit rate and latency.
+
+    python benchmarks/bench_hybrid_retrieval.py --real-embedder
+    python benchmarks/bench_hybrid_retrieval.py --scale 10
+
+Queries with a known answer document are taken from the knowledge base:
+every English and Tamil question (the answer is its "Q: ...\\nA: ..." entry)
+and every helpline number that belongs to a single contact (the answer is
+that contact). ``--scale`` repeats the corpus to measure latency on a larger
+index. Without ``--real-embedder`` the stub embedder from stubs.py is used,
+which only rewards shared words, so the dense hit rates are pessimistic.
+"""
+import argparse
+import time
+from collections import Counter
+
+from common import latency_summary, save_results
+
+import stubs
+
+import config
+from utils.knowledge_base import get_knowledge_base
+
+
+def labelled_queries(knowledge_base):
+    """``(query, answer document, language, kind)`` for every query with a single right answer"""
+    queries = []
+    for language in ('english', 'tamil'):
+        for items in knowledge_base['common_queries'][language].values():
+            if isinstance(items, dict):
+                queries.extend((q, f"Q: {q}\nA: {a}", language, 'question') for q, a in items.items())
+        contacts = knowledge_base['emergency_contacts'][language]
+        numbers = Counter(contacts.values())
+        queries.extend((number, f"{contact}: {number}", language, 'number')
+                       for contact, number in contacts.items() if numbers[number] == 1)
+    for items in knowledge_base['tamil_qa'].values():
+        if isinstance(items, dict):
+            queries.extend((q, f"Q: {q}\nA: {a}", 'tamil', 'question') for q, a in items.items())
+    return queries
+
+
+def evaluate(retriever, queries, k: int, repeats: int) -> dict:
+    hits, seconds = Counter(), []
+    totals = Counter(f"{language}_{kind}" for _, _, language, kind in queries)
+    for _ in range(repeats):
+        for query, answer, language, kind in queries:
+            embedding = retriever.embed_query(query)
+            start = time.perf_counter()
+            documents = retriever.search(query, query_embedding=embedding, language=language)
+            seconds.append(time.perf_counter() - start)
+            if answer in documents[:k]:
+                hits[f"{language}_{kind}"] += 1
+    result = {f"hit_at_{k}": {name: hits[name] / (totals[name] * repeats) for name in sorted(totals)}}
+    result['latency'] = latency_summary(seconds)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--k', type=int, default=3)
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--scale', type=int, default=1, help="Repeat the corpus this many times")
+    parser.add_argument('--real-embedder', action='store_true')
+    args = parser.parse_args()
+
+    stubs.install(llama=False, embedder=not args.real_embedder)
+    from utils.retriever import Retriever
+
+    retriever = Retriever()
+    hybrid = retriever._corpus
+    if args.scale > 1:
+        # Distinct copies, so the padding documents compete in both rankings
+        documents = hybrid.documents + [f"{doc} ({i})" for i in range(1, args.scale) for doc in hybrid.documents]
+        languages = hybrid.languages * args.scale
+        hybrid = retriever._build_corpus(documents, languages, retriever.embed_documents(documents))
+    dense = hybrid._replace(lexical=None)
+    queries = labelled_queries(get_knowledge_base().snapshot())
+
+    results = {'documents': len(hybrid.documents), 'queries': len(queries),
+               'embedder': 'real' if args.real_embedder else 'stub', 'settings': dict(config.RETRIEVAL_SETTINGS)}
+    for name, corpus in (('dense', dense), ('hybrid', hybrid)):
+        retriever._corpus = corpus
+        results[name] = evaluate(retriever, queries, args.k, args.repeats)
+        hit_rates = ', '.join(f"{kind} {100 * rate:.0f}%" for kind, rate in results[name][f"hit_at_{args.k}"].items())
+        print(f"{name:>6}: p50 {results[name]['latency']['p50_ms']:.3f} ms, "
+              f"p95 {results[name]['latency']['p95_ms']:.3f} ms; hit@{args.k}: {hit_rates}")
+    save_results('hybrid_retrieval', results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""Keyword intent detection: linear ``any(keyword in message)`` scans vs one automaton.
+
+    python benchmarks/bench_intent_detector.py --keywords 100 1000 5000
+
+Real messages are built from the Tamil and English knowledge base; the
+keyword lists are padded with synthetic words to simulate growth.
+"""
+import argparse
+import json
+import random
+import time
+
+from common import latency_summary, save_results
+
+from utils.intent_detector import IntentDetector, build_default_detector
+
+
+def load_messages():
+    with open('static/data/common_queries.json', 'r', encoding='utf-8') as f:
+        queries = json.load(f)
+    messages = []
+    for lang in ['english', 'tamil']:
+        for items in queries[lang].values():
+            if isinstance(items, dict):
+                messages.extend(items.keys())
+    return messages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--keywords', type=int, nargs='+', default=[100, 1000, 5000])
+    parser.add_argument('--intents', type=int, default=20)
+    args = parser.parse_args()
+
+    messages = load_messages()
+    base = build_default_detector()
+    rng = random.Random(0)
+    alphabet = 'abcdefghijklmnopqrstuvwxyzஅஆஇஈஉஊஎஏஐஒஓகஙசஞடணதநபமயரலவழளறன'
+
+    results = {}
+    for total in args.keywords:
+        keyword_sets = {intent: list(keywords) for intent, keywords in base._keyword_sets.items()}
+        for i in range(max(0, total - sum(len(k) for k in keyword_sets.values()))):
+            word = ''.join(rng.choice(alphabet) for _ in range(rng.randint(4, 10)))
+            keyword_sets.setdefault(f'synthetic:{i % args.intents}', []).append(word)
+
+        lowered = {intent: [k.lower() for k in keywords] for intent, keywords in keyword_sets.items()}
+        linear = []
+        for message in messages:
+            start = time.perf_counter()
+            text = message.lower()
+            [intent for intent, keywords in lowered.items() if any(k in text for k in keywords)]
+            linear.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        detector = IntentDetector(keyword_sets)
+        detector.compile()
+        compile_seconds = time.perf_counter() - start
+        automaton = []
+        for message in messages:
+            start = time.perf_counter()
+            detector.detect(message)
+            automaton.append(time.perf_counter() - start)
+
+        results[total] = {'linear': latency_summary(linear), 'automaton': latency_summary(automaton),
+                          'compile_s': compile_seconds}
+        print(f"{total:>6} keywords  linear p50 {results[total]['linear']['p50_ms']:.3f} ms  "
+              f"automaton p50 {results[total]['automaton']['p50_ms']:.3f} ms  compile {compile_seconds:.3f}s")
+    save_results('intent_detector', results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""Startup time and memory of the knowledge base: JSON files vs the compiled binary snapshot.
+
+    python benchmarks/bench_kb_snapshot.py --scale 10
+
+Every file under static/data is scaled ``--scale`` times (see
+bench_knowledge_base.py), embedded once with the stub embedder and compiled
+into a snapshot. Each mode then loads the knowledge base and the retrieval
+corpus in a fresh process, so resident memory is measured per path:
+
+``json`` parses every file, builds the documents with prepare_documents and
+reads their embeddings from the embedding store, like a start without a
+snapshot. ``snapshot`` opens the compiled snapshot, which decodes nothing
+until a file is accessed; ``all_files_s`` is the time to then decode every
+file, e.g. once the chat components have all started.
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import memory_mb, save_results
+
+import config
+
+MODES = ['json', 'snapshot']
+
+
+def run_mode(mode: str, directory: str) -> dict:
+    from utils.embedding_store import EmbeddingStore
+    from utils.knowledge_base import KnowledgeBase
+    from utils.retriever import Retriever, prepare_documents
+
+    with open(os.path.join(directory, 'files.json'), 'r', encoding='utf-8') as f:
+        files = json.load(f)
+    model_name = config.EMBEDDING_SETTINGS['model_name']
+    baseline = memory_mb()
+
+    start = time.perf_counter()
+    if mode == 'json':
+        knowledge_base = KnowledgeBase(files, check_interval=0)
+        documents, languages = prepare_documents(knowledge_base.snapshot())
+        store = EmbeddingStore(model_name, os.path.join(directory, 'embeddings'))
+        embeddings = store.get_embeddings(documents, lambda docs: sys.exit(f"{len(docs)} documents not in the store"))
+    else:
+        knowledge_base = KnowledgeBase(files, check_interval=0, snapshot_path=os.path.join(directory, 'snapshot'))
+        documents, languages, embeddings = Retriever._compiled_corpus(knowledge_base, model_name)
+    load_seconds = time.perf_counter() - start
+    loaded = memory_mb()
+
+    start = time.perf_counter()
+    for name in knowledge_base.files:
+        knowledge_base.snapshot()[name]
+    all_files_seconds = time.perf_counter() - start
+
+    return {
+        'documents': len(documents),
+        'embedding_shape': list(embeddings.shape),
+        'load_s': load_seconds,
+        'all_files_s': all_files_seconds,
+        'load_rss_mb': loaded['rss_mb'] - baseline['rss_mb'],
+        'load_private_mb': loaded['private_mb'] - baseline['private_mb'],
+        'all_files_rss_mb': memory_mb()['rss_mb'] - baseline['rss_mb']
+    }
+
+
+def prepare(directory: str, factor: int) -> dict:
+    """Write the scaled files, embed their documents and compile the snapshot"""
+    import stubs
+    from bench_knowledge_base import write_scaled_files
+    from utils import knowledge_base as kb_module
+    from utils.kb_snapshot import file_signature, write_snapshot
+    from utils.retriever import Retriever
+
+    files = write_scaled_files(directory, factor)
+    with open(os.path.join(directory, 'files.json'), 'w', encoding='utf-8') as f:
+        json.dump(files, f)
+    knowledge_base = kb_module._default_knowledge_base = kb_module.KnowledgeBase(files, check_interval=0)
+    retriever = Retriever(stubs.StubEmbedder(), os.path.join(directory, 'embeddings'))
+
+    snapshot_path = os.path.join(directory, 'snapshot')
+    start = time.perf_counter()
+    write_snapshot(snapshot_path, files, dict(knowledge_base.snapshot()), knowledge_base.signatures,
+                   retriever.documents, retriever.languages, retriever.embeddings,
+                   config.EMBEDDING_SETTINGS['model_name'], file_signature(config.INGESTION_SETTINGS['chunks_file']))
+    return {
+        'json_mb': sum(os.path.getsize(path) for path in files.values()) / 2 ** 20,
+        'snapshot_mb': os.path.getsize(snapshot_path) / 2 ** 20,
+        'compile_s': time.perf_counter() - start
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mode', choices=MODES)
+    parser.add_argument('--dir')
+    parser.add_argument('--scale', type=int, default=10)
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(run_mode(args.mode, args.dir)))
+        return
+
+    directory = tempfile.mkdtemp(prefix='kb-snapshot-')
+    try:
+        results = {'scale': args.scale, **prepare(directory, args.scale)}
+        print(f"{results['json_mb']:.1f} MB of JSON compiled into a {results['snapshot_mb']:.1f} MB snapshot "
+              f"(with embeddings) in {results['compile_s']:.2f}s")
+        for mode in MODES:
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--mode', mode, '--dir', directory],
+                check=True, capture_output=True, text=True
+            ).stdout
+            results[mode] = json.loads(output.strip().splitlines()[-1])
+            print(f"{mode:>8}: {results[mode]['documents']} documents loaded in "
+                  f"{1000 * results[mode]['load_s']:.1f} ms, +{results[mode]['load_rss_mb']:.1f} MB rss "
+                  f"(+{results[mode]['load_private_mb']:.1f} MB private); all files decoded after "
+                  f"{1000 * results[mode]['all_files_s']:.1f} ms more, +{results[mode]['all_files_rss_mb']:.1f} MB rss")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    save_results('kb_snapshot', results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""Hot reload time and memory of the knowledge base on a corpus ten times the current size.
+
+    python benchmarks/bench_knowledge_base.py --scale 10
+
+Every file under static/data is copied to a temporary directory with each
+entry repeated ``--scale`` times. The script then times the initial parse and
+embedding, edits one entry in common_queries.json and times the reload that
+picks it up. A restart would instead re-parse everything and, without the
+embedding store, re-encode the whole corpus ("cold embeddings" below).
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+from common import memory_mb, save_results
+
+import config
+from sentence_transformers import SentenceTransformer
+from utils import knowledge_base as kb_module
+from utils.retriever import Retriever
+
+
+def scale(value, factor: int):
+    """Repeat every leaf entry of a knowledge base file ``factor`` times with distinct text"""
+    if isinstance(value, dict):
+        if value and all(isinstance(v, str) for v in value.values()):
+            return {f"{k} #{i}" if i else k: f"{v} #{i}" if i else v
+                    for i in range(factor) for k, v in value.items()}
+        return {k: scale(v, factor) for k, v in value.items()}
+    if isinstance(value, list):
+        if all(isinstance(v, str) for v in value):
+            return [f"{v} #{i}" if i else v for i in range(factor) for v in value]
+        if all(isinstance(v, dict) and 'response' in v for v in value):
+            return [dict(v, response=f"{v['response']} #{i}") if i else v for i in range(factor) for v in value]
+        return [scale(v, factor) for v in value]
+    return value
+
+
+def write_scaled_files(directory: str, factor: int) -> dict:
+    files = {}
+    for name, path in kb_module.KNOWLEDGE_BASE_FILES.items():
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        files[name] = os.path.join(directory, os.path.basename(path))
+        with open(files[name], 'w', encoding='utf-8') as f:
+            json.dump(scale(data, factor), f, ensure_ascii=False)
+    return files
+
+
+def edit_one_entry(path: str) -> None:
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    category = next(k for k, v in data['english'].items() if isinstance(v, dict))
+    query = next(iter(data['english'][category]))
+    data['english'][category][query] += " Updated."
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--scale', type=int, default=10)
+    args = parser.parse_args()
+
+    embedder = SentenceTransformer(config.EMBEDDING_SETTINGS['model_name'], device='cpu', cache_folder='./model_cache')
+    directory = tempfile.mkdtemp(prefix='knowledge-base-')
+    results = {'scale': args.scale}
+    try:
+        files = write_scaled_files(directory, args.scale)
+        results['files_mb'] = sum(os.path.getsize(p) for p in files.values()) / 2 ** 20
+        baseline = memory_mb()
+
+        start = time.perf_counter()
+        kb_module._default_knowledge_base = kb_module.KnowledgeBase(files, check_interval=0)
+        results['parse_s'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        retriever = Retriever(embedder, os.path.join(directory, 'embeddings'))
+        results['cold_embeddings_s'] = time.perf_counter() - start
+        results['documents'] = len(retriever.documents)
+        before = memory_mb()
+        results['loaded_rss_mb'] = before['rss_mb'] - baseline['rss_mb']
+
+        edit_one_entry(files['common_queries'])
+        tracemalloc.start()
+        start = time.perf_counter()
+        changed = kb_module.get_knowledge_base().check()
+        results['reload_s'] = time.perf_counter() - start
+        results['reload_peak_alloc_mb'] = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        tracemalloc.stop()
+        results['reload_rss_growth_mb'] = memory_mb()['rss_mb'] - before['rss_mb']
+        results['reload_encoded'] = retriever.embedding_store.stats['encoded']
+        results['changed'] = changed
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    print(f"{results['documents']} documents ({results['files_mb']:.1f} MB of JSON): "
+          f"parse {results['parse_s']:.3f}s, cold embeddings {results['cold_embeddings_s']:.2f}s, "
+          f"reload {results['reload_s']:.3f}s re-encoding {results['reload_encoded']} documents, "
+          f"peak {results['reload_peak_alloc_mb']:.1f} MB allocated during reload")
+    save_results('knowledge_base', results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""Nearest-place lookup latency over a statewide synthetic dataset: KD-tree index vs a full haversine scan.
+
+    python benchmarks/bench_nearby.py --places 50000 --queries 2000 --k 5
+
+Places are scattered uniformly over Tamil Nadu's bounding box with a mix of
+service types close to the real one (many police stations and hospitals,
+fewer women's help desks and fire stations). Each query asks for the ``k``
+nearest place of every type, like /nearby/api without a ``type`` filter.
+``scan`` computes the haversine distance to every place of a type and is
+also used to check that the index returns the same places.
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+from common import latency_summary, memory_mb, save_results
+
+from utils.nearby import EARTH_RADIUS_KM, SERVICE_TYPES, NearbyIndex
+
+# Tamil Nadu bounding box, degrees
+LAT_RANGE = (8.08, 13.56)
+LON_RANGE = (76.24, 80.35)
+TYPE_WEIGHTS = {'police': 0.4, 'women_help_desk': 0.1, 'hospital': 0.35, 'fire_station': 0.15}
+
+
+def synthetic_places(n: int, rng: random.Random):
+    types = rng.choices(list(TYPE_WEIGHTS), weights=list(TYPE_WEIGHTS.values()), k=n)
+    return [{'name': f"{service_type} {i}", 'type': service_type,
+             'lat': rng.uniform(*LAT_RANGE), 'lon': rng.uniform(*LON_RANGE)}
+            for i, service_type in enumerate(types)]
+
+
+class HaversineScan:
+    """Distance to every place of each type, then a partial sort"""
+
+    def __init__(self, places):
+        self.places = {t: [p for p in places if p['type'] == t] for t in SERVICE_TYPES}
+        self.coordinates = {t: np.radians([[p['lat'], p['lon']] for p in typed])
+                            for t, typed in self.places.items()}
+
+    def nearest(self, lat, lon, k):
+        lat, lon = np.radians(lat), np.radians(lon)
+        results = {}
+        for service_type, coordinates in self.coordinates.items():
+            d_lat, d_lon = coordinates[:, 0] - lat, coordinates[:, 1] - lon
+            a = np.sin(d_lat / 2) ** 2 + np.cos(lat) * np.cos(coordinates[:, 0]) * np.sin(d_lon / 2) ** 2
+            km = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+            best = np.argpartition(km, k)[:k]
+            best = best[np.argsort(km[best])]
+            results[service_type] = [dict(self.places[service_type][i], distance_km=float(km[i])) for i in best]
+        return results
+
+
+def time_queries(lookup, queries, k):
+    seconds = []
+    for lat, lon in queries:
+        start = time.perf_counter()
+        lookup(lat, lon, k)
+        seconds.append(time.perf_counter() - start)
+    return latency_summary(seconds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--places', type=int, default=50000)
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    places = synthetic_places(args.places, rng)
+    queries = [(rng.uniform(*LAT_RANGE), rng.uniform(*LON_RANGE)) for _ in range(args.queries)]
+
+    memory_before = memory_mb()
+    start = time.perf_counter()
+    index = NearbyIndex(places)
+    build_seconds = time.perf_counter() - start
+    memory_after = memory_mb()
+    scan = HaversineScan(places)
+
+    # Both must return the same places in the same order (ties aside, which random floats do not produce)
+    mismatches = 0
+    for lat, lon in queries[:200]:
+        expected, found = scan.nearest(lat, lon, args.k), index.nearest(lat, lon, args.k)
+        mismatches += sum([p['name'] for p in expected[t]] != [p['name'] for p in found[t]] for t in SERVICE_TYPES)
+
+    results = {
+        'places': args.places, 'queries': args.queries, 'k': args.k, 'per_type': index.stats(),
+        'build_s': build_seconds,
+        'index_mb': memory_after['rss_mb'] - memory_before['rss_mb'],
+        'mismatches': mismatches,
+        'index': time_queries(index.nearest, queries, args.k),
+        'scan': time_queries(scan.nearest, queries, args.k)
+    }
+    print(f"{args.places} places, built in {1000 * build_seconds:.1f} ms, "
+          f"{results['index_mb']:.1f} MB; {mismatches} mismatches vs scan")
+    for name in ('index', 'scan'):
+        print(f"{name:>6}: p50 {results[name]['p50_ms']:.3f} ms, p95 {results[name]['p95_ms']:.3f} ms, "
+              f"p99 {results[name]['p99_ms']:.3f} ms")
+    save_results('nearby', results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""Prompt-eval time per request with and without the cached prompt preamble.
+
+    python benchmarks/bench_prompt_cache.py --queries 20
+
+Loads the real LocalLLM (GGUF model and embedder) and generates answers for
+English questions from common_queries.json, bypassing the response cache.
+"""
+import argparse
+import json
+import time
+
+from common import latency_summary, save_results
+
+from local_llm import LocalLLM
+
+
+def load_questions(limit):
+    with open('static/data/common_queries.json', 'r', encoding='utf-8') as f:
+        queries = json.load(f)['english']
+    questions = [q for items in queries.values() if isinstance(items, dict) for q in items]
+    return questions[:limit]
+
+
+def run(llm, questions, enabled):
+    llm.prompt_cache.enabled = enabled
+    prompt_eval, evaluated = [], []
+    for question in questions:
+        prompt = llm._build_prompt(question)
+        start = time.perf_counter()
+        chunks = llm._generate(prompt)
+        next(chunks, None)
+        prompt_eval.append(time.perf_counter() - start)
+        for _ in chunks:
+            pass
+        evaluated.append(llm.prompt_cache.stats()['evaluated_tokens'])
+    tokens = [b - a for a, b in zip([0] + evaluated[:-1], evaluated)]
+    return {'prompt_eval': latency_summary(prompt_eval), 'mean_evaluated_tokens': sum(tokens) / len(tokens)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--queries', type=int, default=20)
+    args = parser.parse_args()
+
+    llm = LocalLLM()
+    questions = load_questions(args.queries)
+    results = {}
+    for name, enabled in [('full_prompt', False), ('cached_prefix', True)]:
+        llm.prompt_cache._stats['evaluated_tokens'] = 0
+        results[name] = run(llm, questions, enabled)
+        print(f"{name:>13}: prompt eval p50 {results[name]['prompt_eval']['p50_ms']:.0f} ms, "
+              f"{results[name]['mean_evaluated_tokens']:.0f} tokens evaluated per request")
+    save_results('prompt_cache', results)
+
+
+if __name__ == '__main__':
+    main()
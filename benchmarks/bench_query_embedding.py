@@ -0,0 +1,94 @@
+"""Query embedding throughput and queueing latency: one encode() per query vs micro-batching.
+
+    python benchmarks/bench_query_embedding.py --concurrency 1 8 32 --queries 2000
+    python benchmarks/bench_query_embedding.py --real-embedder
+
+Concurrent clients embed queries from the realistic mix. ``direct`` calls
+``encode([query])`` per query like the old LocalLLM, ``batched`` goes
+through QueryEmbedder with its cache disabled (every query made unique) and
+``batched+cache`` uses the repeated mix with the LRU cache on. Without
+``--real-embedder`` the stub embedder charges ``--call-ms`` per encode call
+plus ``--item-ms`` per query, roughly MiniLM's split on a laptop CPU.
+"""
+import argparse
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from common import latency_summary, load_query_mix, save_results
+
+import stubs
+
+import config
+from utils.query_embedder import QueryEmbedder
+
+
+def run(encode, queries, concurrency: int) -> dict:
+    lock = threading.Lock()
+    seconds = []
+
+    def embed(query):
+        start = time.perf_counter()
+        encode(query)
+        elapsed = time.perf_counter() - start
+        with lock:
+            seconds.append(elapsed)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(embed, queries))
+    wall = time.perf_counter() - start
+    return {'queries_per_s': len(queries) / wall, 'latency': latency_summary(seconds)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--real-embedder', action='store_true')
+    parser.add_argument('--call-ms', type=float, default=4.0)
+    parser.add_argument('--item-ms', type=float, default=0.3)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    settings = config.EMBEDDING_SETTINGS
+    if args.real_embedder:
+        from sentence_transformers import SentenceTransformer
+        embedder = SentenceTransformer(settings['model_name'], device='cpu', cache_folder='./model_cache')
+    else:
+        stubs.STUB_SETTINGS.update(embed_call_ms=args.call_ms, embed_item_ms=args.item_ms)
+        embedder = stubs.StubEmbedder()
+
+    rng = random.Random(args.seed)
+    mix = [message for message, _ in load_query_mix()]
+    repeated = [rng.choice(mix) for _ in range(args.queries)]
+
+    results = {'levels': [], 'embedder': 'real' if args.real_embedder else 'stub'}
+    for concurrency in args.concurrency:
+        unique = [f"{query} #{concurrency}-{i}" for i, query in enumerate(repeated)]
+        level = {'concurrency': concurrency}
+        level['direct'] = run(lambda query: embedder.encode([query], normalize_embeddings=True), unique, concurrency)
+
+        batched = QueryEmbedder(embedder, settings['query_batch_size'], settings['query_batch_wait'], cache_size=0)
+        level['batched'] = run(batched.encode, unique, concurrency)
+        level['batched']['stats'] = batched.stats()
+
+        cached = QueryEmbedder(embedder, settings['query_batch_size'], settings['query_batch_wait'],
+                               settings['query_cache_size'])
+        level['batched+cache'] = run(cached.encode, repeated, concurrency)
+        level['batched+cache']['stats'] = cached.stats()
+        results['levels'].append(level)
+
+        for mode in ('direct', 'batched', 'batched+cache'):
+            stats = level[mode].get('stats', {})
+            extra = (f", batch {stats['mean_batch_size']:.1f}, queue wait p50 {stats['queue_wait_p50_ms']:.2f} ms"
+                     f", hit rate {100 * stats['hit_rate']:.0f}%") if stats else ''
+            print(f"concurrency {concurrency:>3} {mode:>13}: {level[mode]['queries_per_s']:8.1f} queries/s, "
+                  f"p50 {level[mode]['latency']['p50_ms']:.2f} ms, p95 {level[mode]['latency']['p95_ms']:.2f} ms{extra}")
+
+    save_results('query_embedding', results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""Tokens per second and memory of the Tamil GPT-2 model, before and after the CPU serving profile.
+
+Each mode runs in a fresh process so resident memory is measured per model:
+
+    python benchmarks/bench_tamil_gpt2.py --prompts 16 --max-new-tokens 40
+
+``fp32`` loads the model in full precision with PyTorch's default threads
+and generates one prompt at a time, like the original TamilGPT2Chatbot.
+``int8`` applies config.TAMIL_GPT2_SETTINGS (dynamic quantization and thread
+settings) and ``int8-batched`` also generates ``batch_size`` prompts at once.
+Prompts are the Tamil questions of the query mix. Needs torch, transformers
+and the model (downloaded on first run).
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+from common import latency_summary, load_query_mix, memory_mb, save_results
+
+import config
+
+MODES = ['fp32', 'int8', 'int8-batched']
+
+
+def run_mode(mode: str, prompts: int, max_new_tokens: int) -> dict:
+    from utils.tamil_gpt2 import TamilGPT2Chatbot
+
+    if mode == 'fp32':
+        overrides = {'quantize': False, 'intra_op_threads': None, 'inter_op_threads': None, 'batch_size': 1}
+    else:
+        overrides = {'batch_size': config.TAMIL_GPT2_SETTINGS['batch_size'] if mode == 'int8-batched' else 1}
+    baseline = memory_mb()
+    chatbot = TamilGPT2Chatbot(lazy=True, **overrides)
+    chatbot.load()
+    loaded = memory_mb()
+
+    questions = [message for message, language in load_query_mix() if language == 'tamil'][:prompts]
+    batch_size = chatbot.settings['batch_size']
+    chatbot.generate_batch(questions[:1], max_new_tokens)  # Warm-up
+
+    seconds, tokens = [], 0
+    start = time.perf_counter()
+    for i in range(0, len(questions), batch_size):
+        batch_start = time.perf_counter()
+        outputs = chatbot.generate_batch(questions[i:i + batch_size], max_new_tokens)
+        seconds.extend([time.perf_counter() - batch_start] * len(outputs))
+        tokens += sum(len(chatbot.tokenizer.encode(text)) for text in outputs)
+    wall = time.perf_counter() - start
+
+    import torch
+    return {
+        'prompts': len(questions),
+        'batch_size': batch_size,
+        'threads': torch.get_num_threads(),
+        'load_s': chatbot.load_seconds,
+        'generated_tokens': tokens,
+        'tokens_per_s': tokens / wall,
+        'latency': latency_summary(seconds),
+        'model_rss_mb': loaded['rss_mb'] - baseline['rss_mb'],
+        **memory_mb()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mode', choices=MODES)
+    parser.add_argument('--prompts', type=int, default=16)
+    parser.add_argument('--max-new-tokens', type=int, default=40)
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(run_mode(args.mode, args.prompts, args.max_new_tokens)))
+        return
+
+    results = {}
+    for mode in MODES:
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--mode', mode,
+             '--prompts', str(args.prompts), '--max-new-tokens', str(args.max_new_tokens)],
+            check=True, capture_output=True, text=True
+        ).stdout
+        results[mode] = json.loads(output.strip().splitlines()[-1])
+        print(f"{mode:>12}: {results[mode]['tokens_per_s']:.1f} tokens/s, "
+              f"p50 {results[mode]['latency']['p50_ms']:.0f} ms per prompt, "
+              f"model {results[mode]['model_rss_mb']:.0f} MB, rss {results[mode]['rss_mb']:.0f} MB")
+    save_results('tamil_gpt2', results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+"""Tokenizer throughput and Tamil question matching accuracy: NLTK word_tokenize vs utils.tokenizer.
+
+    python benchmarks/bench_tokenizer.py --repeats 50
+
+Throughput is measured over every question and answer in tamil_qa.json plus
+the query mix. Accuracy builds a FuzzyMatcher (config.TAMIL_MATCH_SETTINGS)
+over the tamil_qa.json questions with each tokenizer and looks up altered
+copies of every question; a lookup is correct when the matched question has
+the same answer. The alterations are:
+
+``exact``        the question as stored
+``punctuation``  question marks dropped, typographic quotes and dashes added
+``unicode``      NFD-decomposed vowel signs and zero-width characters, as some keyboards produce
+``inflected``    one word given a case suffix (புகார் -> புகாருக்கு, வழக்கு -> வழக்கை)
+``partial``      one word dropped and the rest shuffled
+
+tamil_qa.json only has a few questions, so the TamilChat questions from
+tamil_responses.json are scored as well.
+
+``nltk`` is skipped when NLTK or its Punkt data is not installed
+(benchmarks/download_nltk_data.py).
+"""
+import argparse
+import json
+import random
+import re
+import time
+import unicodedata
+from collections import defaultdict
+
+from common import NLTK_DATA_DIR, load_query_mix, save_results
+
+import config
+from utils.fuzzy_matcher import FuzzyMatcher
+from utils.tokenizer import tokenize, tokenize_stemmed
+
+VARIANTS = ['exact', 'punctuation', 'unicode', 'inflected', 'partial']
+
+
+def nltk_tokenizer():
+    import nltk
+    from nltk.tokenize import word_tokenize
+    if NLTK_DATA_DIR not in nltk.data.path:
+        nltk.data.path.insert(0, NLTK_DATA_DIR)
+    nltk.data.find('tokenizers/punkt')
+    return lambda text: word_tokenize(text.lower())
+
+
+def tokenizers() -> dict:
+    found = {}
+    try:
+        found['nltk'] = nltk_tokenizer()
+    except (ImportError, LookupError) as e:
+        print(f"Skipping nltk: {str(e).strip().splitlines()[0]}")
+    found['regex'] = lambda text: re.findall(r'\w+', text.lower())  # TamilChat's old fallback
+    found['unicode'] = tokenize
+    found['unicode+stem'] = tokenize_stemmed
+    return found
+
+
+# Case suffixes by how the word ends, spelled as they attach to it
+INFLECTIONS = [
+    ('ம்', ['த்தில்', 'த்திற்கு', 'த்தை']),
+    ('்', ['ை', 'ுக்கு', 'ில்']),
+    ('ு', ['ை', 'ில்']),
+    ('', ['க்கு', 'யை'])
+]
+
+
+def inflections(word: str):
+    for ending, suffixes in INFLECTIONS:
+        if word.endswith(ending):
+            return [word[:len(word) - len(ending)] + suffix for suffix in suffixes]
+
+
+def variants(question: str, kind: str, rng: random.Random):
+    """Altered copies of ``question``; every word and suffix is tried, so small files still give stable rates"""
+    words = question.rstrip('?').split()
+    if kind == 'punctuation':
+        return [f"“{question.rstrip('?')}” — {ending}" for ending in ('!!', '...', '')]
+    if kind == 'unicode':
+        return [' '.join(unicodedata.normalize('NFD', word).replace('\u0BCD', '\u0BCD\u200C') + '\u200B'
+                         for word in words)]
+    if kind == 'inflected':
+        return [' '.join(words[:i] + [inflected] + words[i + 1:])
+                for i, word in enumerate(words) if re.fullmatch(r'[\u0B80-\u0BFF]{3,}', word)
+                for inflected in inflections(word)]
+    if kind == 'partial' and len(words) > 2:
+        altered = []
+        for i in range(len(words)):
+            rest = words[:i] + words[i + 1:]
+            rng.shuffle(rest)
+            altered.append(' '.join(rest))
+        return altered
+    return [question]
+
+
+def accuracy(tokenizer, qa: dict, seed: int) -> dict:
+    matcher = FuzzyMatcher(qa.keys(), tokenizer, **config.TAMIL_MATCH_SETTINGS)
+    correct, total = defaultdict(int), defaultdict(int)
+    rng = random.Random(seed)
+    for question, answer in qa.items():
+        for kind in VARIANTS:
+            for message in variants(question, kind, rng):
+                match, _ = matcher.best_match(message)
+                total[kind] += 1
+                correct[kind] += match is not None and qa[match] == answer
+    return {kind: correct[kind] / total[kind] for kind in VARIANTS if total[kind]}
+
+
+def throughput(tokenizer, texts, repeats: int) -> dict:
+    tokens = 0
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for text in texts:
+            tokens += len(tokenizer(text))
+    seconds = time.perf_counter() - start
+    return {'tokens_per_s': tokens / seconds, 'chars_per_s': repeats * sum(map(len, texts)) / seconds}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeats', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    with open('static/data/tamil_qa.json', 'r', encoding='utf-8') as f:
+        qa = {q: a for items in json.load(f).values() if isinstance(items, dict) for q, a in items.items()}
+    with open('static/data/tamil_responses.json', 'r', encoding='utf-8') as f:
+        common_queries = json.load(f)['common_queries']
+    mix = [message for message, _ in load_query_mix()]
+    texts = list(qa) + list(qa.values()) + list(common_queries) + list(common_queries.values()) + mix
+
+    results = {'texts': len(texts)}
+    for name, tokenizer in tokenizers().items():
+        results[name] = throughput(tokenizer, texts, args.repeats)
+        print(f"{name:>12}: {results[name]['tokens_per_s'] / 1000:7.0f}k tokens/s")
+        for source, questions in (('tamil_qa', qa), ('common_queries', common_queries)):
+            results[name][source] = accuracy(tokenizer, questions, args.seed)
+            rates = ', '.join(f"{kind} {100 * rate:.0f}%" for kind, rate in results[name][source].items())
+            print(f"{'':>14}{source} ({len(questions)} questions): {rates}")
+    save_results('tokenizer', results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""Query latency and recall@k of vector index backends as the corpus grows.
+
+    python benchmarks/bench_vector_index.py --sizes 1000 10000 100000
+
+Synthetic clustered 384-d vectors (the MiniLM dimension) stand in for the
+knowledge base. ``legacy`` is the old per-query norm + full argsort path,
+and recall is measured against the exact float32 index.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from common import latency_summary, save_results
+
+import os
+import tempfile
+
+from utils.vector_index import ExactIndex, IVFIndex, VectorIndex
+
+
+def synthetic_corpus(n_docs: int, dim: int, n_queries: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(8, n_docs // 100), dim)).astype(np.float32)
+    labels = rng.integers(0, len(centers), size=n_docs)
+    docs = centers[labels] + 0.5 * rng.normal(size=(n_docs, dim)).astype(np.float32)
+    query_labels = rng.integers(0, len(centers), size=n_queries)
+    queries = centers[query_labels] + 0.5 * rng.normal(size=(n_queries, dim)).astype(np.float32)
+    return docs, queries
+
+
+def legacy_search(embeddings: np.ndarray, query: np.ndarray, k: int) -> np.ndarray:
+    similarities = np.dot(embeddings, query) / (np.linalg.norm(embeddings, axis=1) * np.linalg.norm(query))
+    return np.argsort(similarities)[-k:][::-1]
+
+
+def time_queries(search, queries) -> list:
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        search(query)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    hits = sum(len(set(f) & set(t)) for f, t in zip(found.tolist(), truth.tolist()))
+    return hits / truth.size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--dim', type=int, default=384)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('-k', type=int, default=10)
+    parser.add_argument('--nprobe', type=int, nargs='+', default=[1, 4, 8, 16, 32])
+    args = parser.parse_args()
+
+    results = {}
+    for size in args.sizes:
+        docs, queries = synthetic_corpus(size, args.dim, args.queries)
+        results[size] = {'legacy': latency_summary(time_queries(lambda q: legacy_search(docs, q, args.k), queries))}
+        truth, _ = ExactIndex(docs).search(queries, args.k)
+        for dtype in ['float32', 'float16', 'int8']:
+            index = ExactIndex(docs, dtype)
+            results[size][f'exact-{dtype}'] = latency_summary(
+                time_queries(lambda q: index.search(q, args.k), queries))
+            results[size][f'exact-{dtype}']['recall'] = recall_at_k(index.search(queries, args.k)[0], truth)
+
+        start = time.perf_counter()
+        ivf = IVFIndex(docs)
+        build_seconds = time.perf_counter() - start
+        path = os.path.join(tempfile.mkdtemp(), 'ivf.npz')
+        ivf.save(path)
+        start = time.perf_counter()
+        ivf = VectorIndex.load(path)
+        load_seconds = time.perf_counter() - start
+        os.remove(path)
+        for nprobe in args.nprobe:
+            name = f'ivf-{ivf.n_lists}-nprobe{nprobe}'
+            results[size][name] = latency_summary(
+                time_queries(lambda q: ivf.search(q, args.k, nprobe=nprobe), queries))
+            results[size][name]['recall'] = recall_at_k(ivf.search(queries, args.k, nprobe=nprobe)[0], truth)
+            results[size][name]['build_s'] = build_seconds
+            results[size][name]['load_s'] = load_seconds
+
+        batch_index = ExactIndex(docs)
+        start = time.perf_counter()
+        batch_index.search(queries, args.k)
+        results[size]['exact-float32-batched'] = {'per_query_ms': 1000 * (time.perf_counter() - start) / len(queries)}
+
+        for name, summary in results[size].items():
+            p50 = summary.get('p50_ms', summary.get('per_query_ms'))
+            line = f"{size:>7} docs  {name:<24} p50 {p50:8.3f} ms"
+            if 'p99_ms' in summary:
+                line += f"  p99 {summary['p99_ms']:8.3f} ms"
+            if 'recall' in summary:
+                line += f"  recall@{args.k} {summary['recall']:.3f}"
+            print(line)
+    save_results('vector_index', results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Tuple
+
+# Allow running the scripts directly from the repository root or this folder
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+RESULTS_DIR = os.path.join(ROOT_DIR, 'benchmarks', 'results')
+# NLTK data for the bench_tokenizer.py baseline, filled by download_nltk_data.py
+NLTK_DATA_DIR = os.getenv('NLTK_DATA_DIR', os.path.join(ROOT_DIR, 'benchmarks', 'nltk_data'))
+
+
+def memory_mb() -> Dict[str, float]:
+    """Return resident and private memory of this process in MB (Linux only)"""
+    usage = {'rss_mb': 0.0, 'private_mb': 0.0}
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    usage['rss_mb'] = int(line.split()[1]) / 1024
+        with open('/proc/self/smaps_rollup', 'r') as f:
+            for line in f:
+                if line.startswith(('Private_Clean:', 'Private_Dirty:')):
+                    usage['private_mb'] += int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return usage
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of ``values``"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def latency_summary(seconds: List[float]) -> Dict[str, float]:
+    """Summarise a list of latencies (in seconds) as milliseconds"""
+    return {
+        'count': len(seconds),
+        'mean_ms': 1000 * sum(seconds) / len(seconds) if seconds else 0.0,
+        'p50_ms': 1000 * percentile(seconds, 50),
+        'p95_ms': 1000 * percentile(seconds, 95),
+        'p99_ms': 1000 * percentile(seconds, 99),
+    }
+
+
+def run_info() -> Dict[str, Any]:
+    """Commit and machine the results were measured on, for comparisons across commits"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR,
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = 'unknown'
+    return {'commit': commit, 'python': platform.python_version(), 'machine': platform.machine(),
+            'cpus': os.cpu_count()}
+
+
+def _load(path: str) -> Any:
+    with open(os.path.join(ROOT_DIR, path), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def load_query_mix() -> List[Tuple[str, str]]:
+    """``(message, language)`` pairs users actually send: known questions and pattern keywords"""
+    queries = []
+    common_queries = _load('static/data/common_queries.json')
+    for language in ('english', 'tamil'):
+        for items in common_queries.get(language, {}).values():
+            if isinstance(items, dict):
+                queries.extend((question, language) for question in items)
+    for items in _load('static/data/tamil_qa.json').values():
+        if isinstance(items, dict):
+            queries.extend((question, 'tamil') for question in items)
+
+    for name, language in (('english_responses', 'english'), ('tamil_responses', 'tamil')):
+        patterns = _load(f'static/data/{name}.json').get('patterns', [])
+        for pattern in (patterns.values() if isinstance(patterns, dict) else patterns):
+            queries.extend((keyword, language) for keyword in pattern.get('keywords', [])[:2])
+    return queries
+
+
+def save_results(name: str, results: Dict[str, Any]) -> str:
+    """Write ``results`` to benchmarks/results/<name>.json and return the path"""
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f'{name}.json')
+    payload = {'benchmark': name, 'timestamp': time.time(), 'run': run_info(), 'results': results}
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, indent=2, ensure_ascii=False)
+    print(f"Results written to {path}")
+    return path
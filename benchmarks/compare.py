@@ -0,0 +1,56 @@
+"""Compare two benchmark result files, e.g. from two commits.
+
+    python benchmarks/compare.py benchmarks/results/load_test-abc1234.json benchmarks/results/load_test-def5678.json
+
+Prints every numeric result that changed by more than ``--threshold``
+percent. Keys ending in ``_ms`` or ``_s`` and ``error_rate`` are lower-is-better; the
+rest are shown without a verdict.
+"""
+import argparse
+import json
+from typing import Any, Dict
+
+
+def flatten(value: Any, prefix: str = '') -> Dict[str, float]:
+    if isinstance(value, dict):
+        items = value.items()
+    elif isinstance(value, list):
+        items = ((str(item.get('concurrency', i)) if isinstance(item, dict) else str(i), item)
+                 for i, item in enumerate(value))
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        return {prefix: float(value)}
+    else:
+        return {}
+    flat = {}
+    for key, item in items:
+        flat.update(flatten(item, f'{prefix}.{key}' if prefix else str(key)))
+    return flat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('before')
+    parser.add_argument('after')
+    parser.add_argument('--threshold', type=float, default=5.0)
+    args = parser.parse_args()
+
+    runs = []
+    for path in (args.before, args.after):
+        with open(path, 'r', encoding='utf-8') as f:
+            runs.append(json.load(f))
+    before, after = (flatten(run['results']) for run in runs)
+    print(f"{runs[0].get('run', {}).get('commit', args.before)} -> {runs[1].get('run', {}).get('commit', args.after)}")
+
+    for key in sorted(set(before) & set(after)):
+        old, new = before[key], after[key]
+        if old == new or (old and abs(new - old) / abs(old) * 100 < args.threshold):
+            continue
+        change = (new - old) / abs(old) * 100 if old else float('inf')
+        verdict = ''
+        if key.endswith(('_ms', '_s', 'error_rate')):
+            verdict = 'better' if new < old else 'worse'
+        print(f"{key:<50} {old:>12.3f} -> {new:>12.3f} ({change:+.1f}%) {verdict}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,14 @@
+"""Download the NLTK tokenizer data used only by bench_tokenizer.py's ``nltk`` baseline.
+
+    pip install nltk
+    python benchmarks/download_nltk_data.py
+
+The chatbot itself does not use NLTK.
+"""
+import nltk
+
+from common import NLTK_DATA_DIR
+
+# punkt_tab replaces the pickled punkt models in NLTK 3.8.2 and later
+nltk.download('punkt', download_dir=NLTK_DATA_DIR)
+nltk.download('punkt_tab', download_dir=NLTK_DATA_DIR)
@@ -0,0 +1,159 @@
+"""Replay a realistic English/Tamil query mix against /chat and report latency.
+
+    python benchmarks/load_test.py --concurrency 1 4 16 --requests 200
+    python benchmarks/load_test.py --url http://localhost:5000 --stream
+
+Without ``--url`` the Flask app runs in-process with the stub models from
+stubs.py (add ``--real-llm``/``--real-embedder`` to load the real ones), so
+the harness needs neither a GGUF file nor network access. Queries come from
+common_queries.json, tamil_qa.json and the response pattern keywords and are
+sampled with a fixed seed; repeats hit the response cache as they would in
+production unless ``--unique`` makes every message distinct.
+
+For each concurrency level it reports throughput, p50/p95/p99 latency,
+time to first token (with ``--stream``) and error rate, and saves everything
+to benchmarks/results/load_test-<commit>.json.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from common import latency_summary, load_query_mix, run_info, save_results
+
+import stubs
+
+
+class HTTPClient:
+    """POST /chat to a running server"""
+
+    def __init__(self, url: str, timeout: float = 120.0):
+        self.url = url.rstrip('/') + '/chat'
+        self.timeout = timeout
+
+    def chat(self, payload: dict):
+        """Return ``(status, first_token_s, total_s)``"""
+        start = time.perf_counter()
+        request = urllib.request.Request(self.url, data=json.dumps(payload).encode('utf-8'),
+                                         headers={'Content-Type': 'application/json'})
+        first_token = None
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                for line in response:
+                    if first_token is None and b'"token"' in line:
+                        first_token = time.perf_counter() - start
+                status = response.status
+        except urllib.error.HTTPError as e:
+            status = e.code
+        return status, first_token, time.perf_counter() - start
+
+
+class InProcessClient:
+    """POST /chat through the Flask test client, streaming the body as it is produced"""
+
+    def __init__(self, flask_app):
+        self.app = flask_app
+
+    def chat(self, payload: dict):
+        start = time.perf_counter()
+        first_token = None
+        with self.app.test_client() as client:
+            response = client.post('/chat', json=payload, buffered=False)
+            for line in response.iter_encoded():
+                if first_token is None and b'"token"' in line:
+                    first_token = time.perf_counter() - start
+            response.close()
+        return response.status_code, first_token, time.perf_counter() - start
+
+
+def start_app(real_llm: bool, real_embedder: bool, timeout: float):
+    stubs.install(llama=not real_llm, embedder=not real_embedder)
+    import app
+    start = time.perf_counter()
+    if not app.components.wait(timeout):
+        raise RuntimeError("Chat components did not finish loading")
+    print(f"App ready in {time.perf_counter() - start:.1f}s")
+    return app.app
+
+
+def run_level(client, queries, concurrency: int, requests: int, stream: bool, unique: bool, seed: int) -> dict:
+    rng = random.Random(seed)
+    plan = [rng.choice(queries) for _ in range(requests)]
+    lock = threading.Lock()
+    latencies, first_tokens, statuses = [], [], {}
+
+    def send(i):
+        message, language = plan[i]
+        if unique:
+            message = f"{message} #{seed}-{concurrency}-{i}"
+        try:
+            status, first_token, total = client.chat({'message': message, 'language': language, 'stream': stream})
+        except Exception as e:
+            status, first_token, total = type(e).__name__, None, None
+        with lock:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+            if status == 200:
+                latencies.append(total)
+                if first_token is not None:
+                    first_tokens.append(first_token)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(send, range(requests)))
+    wall = time.perf_counter() - start
+
+    errors = requests - statuses.get('200', 0)
+    return {
+        'concurrency': concurrency,
+        'requests': requests,
+        'wall_s': wall,
+        'throughput_rps': requests / wall,
+        'error_rate': errors / requests,
+        'statuses': statuses,
+        'latency': latency_summary(latencies),
+        'first_token': latency_summary(first_tokens) if stream else None
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help="Benchmark a running server instead of an in-process app")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--requests', type=int, default=200, help="Requests per concurrency level")
+    parser.add_argument('--stream', action='store_true', help="Use the NDJSON streaming contract")
+    parser.add_argument('--unique', action='store_true', help="Make every message distinct to bypass caches")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--real-llm', action='store_true')
+    parser.add_argument('--real-embedder', action='store_true')
+    parser.add_argument('--token-ms', type=float, default=stubs.STUB_SETTINGS['token_ms'],
+                        help="Stub generation time per token")
+    parser.add_argument('--ready-timeout', type=float, default=600.0)
+    args = parser.parse_args()
+
+    stubs.STUB_SETTINGS['token_ms'] = args.token_ms
+    if args.url:
+        client = HTTPClient(args.url)
+    else:
+        client = InProcessClient(start_app(args.real_llm, args.real_embedder, args.ready_timeout))
+
+    queries = load_query_mix()
+    levels = []
+    for concurrency in args.concurrency:
+        level = run_level(client, queries, concurrency, args.requests, args.stream, args.unique, args.seed)
+        levels.append(level)
+        ttft = f", ttft p50 {level['first_token']['p50_ms']:.0f} ms" if args.stream else ''
+        print(f"concurrency {concurrency:>3}: {level['throughput_rps']:7.1f} req/s, "
+              f"p50 {level['latency']['p50_ms']:.0f} ms, p95 {level['latency']['p95_ms']:.0f} ms, "
+              f"p99 {level['latency']['p99_ms']:.0f} ms{ttft}, errors {100 * level['error_rate']:.1f}%")
+
+    options = {k: v for k, v in vars(args).items() if k != 'concurrency'}
+    options['backend'] = 'http' if args.url else ('real' if args.real_llm else 'stub')
+    save_results(f"load_test-{run_info()['commit']}", {'options': options, 'levels': levels})
+
+
+if __name__ == '__main__':
+    main()
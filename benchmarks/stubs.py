@@ -0,0 +1,123 @@
+"""Stand-ins for the models so the benchmarks run offline and without a GGUF file.
+
+``StubLlama`` implements the parts of llama_cpp.Llama that LocalLLM and
+PromptPrefixCache use. It sleeps ``prompt_ms`` per evaluated prompt token
+(tokens already in its KV state are free, as with llama.cpp) and
+``token_ms`` per generated token, so queueing, streaming and prompt caching
+behave realistically. ``StubEmbedder`` returns deterministic unit vectors
+derived from the words of each text instead of running MiniLM.
+
+Call ``install()`` before LocalLLM is constructed; the real retrieval,
+caching and scheduling code is used unchanged.
+"""
+import re
+import threading
+import time
+import zlib
+from typing import Dict, Iterator, List
+
+import numpy as np
+
+_WORD = re.compile(r'\w+|[^\w\s]')
+
+# Defaults roughly matching a 7B Q4 model on a laptop CPU
+STUB_SETTINGS = {
+    'prompt_ms': 2.0,  # Per prompt token evaluated
+    'token_ms': 40.0,  # Per generated token
+    'max_tokens': 48,  # Tokens generated per answer, at most GENERATION_PARAMS['max_tokens']
+    'embedding_dim': 384,
+    'embed_call_ms': 0.0,  # Fixed cost per encode() call, e.g. Python and Torch dispatch
+    'embed_item_ms': 0.0  # Per text encoded
+}
+
+
+class StubLlama:
+    def __init__(self, model_path: str = '', n_ctx: int = 1024, **kwargs):
+        self._n_ctx = n_ctx
+        self._input_ids: List[int] = []
+
+    def n_ctx(self) -> int:
+        return self._n_ctx
+
+    def tokenize(self, text: bytes, add_bos: bool = True, special: bool = False) -> List[int]:
+        tokens = [zlib.crc32(word.encode('utf-8')) % 32000 + 3 for word in _WORD.findall(text.decode('utf-8'))]
+        return [1] + tokens if add_bos else tokens
+
+    def reset(self) -> None:
+        self._input_ids = []
+
+    def eval(self, tokens: List[int]) -> None:
+        time.sleep(STUB_SETTINGS['prompt_ms'] * len(tokens) / 1000.0)
+        self._input_ids = list(self._input_ids) + list(tokens)
+
+    def save_state(self) -> List[int]:
+        return list(self._input_ids)
+
+    def load_state(self, state: List[int]) -> None:
+        self._input_ids = list(state)
+
+    def __call__(self, prompt: str, stream: bool = False, max_tokens: int = 200, **kwargs):
+        chunks = self._generate(prompt, min(max_tokens, STUB_SETTINGS['max_tokens']))
+        if stream:
+            return chunks
+        return {'choices': [{'text': ''.join(chunk['choices'][0]['text'] for chunk in chunks)}]}
+
+    def _generate(self, prompt: str, max_tokens: int) -> Iterator[Dict]:
+        tokens = self.tokenize(prompt.encode('utf-8'))
+        reused = 0
+        for cached, token in zip(self._input_ids, tokens):
+            if cached != token:
+                break
+            reused += 1
+        self._input_ids = self._input_ids[:reused]
+        self.eval(tokens[reused:])
+
+        # Answer with words from the retrieved context so downstream code sees plausible text
+        context = prompt.split('Relevant Information:', 1)[-1].split('User Query:', 1)[0].split()
+        words = context or ['Please', 'contact', 'the', 'nearest', 'police', 'station.']
+        for i in range(max_tokens):
+            time.sleep(STUB_SETTINGS['token_ms'] / 1000.0)
+            yield {'choices': [{'text': ' ' + words[i % len(words)]}]}
+
+
+class StubEmbedder:
+    # Encoding saturates the CPU, so concurrent calls take turns rather than overlapping
+    _compute = threading.Lock()
+
+    def __init__(self, *args, **kwargs):
+        self.dim = STUB_SETTINGS['embedding_dim']
+
+    def _vector(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for word in _WORD.findall(text.lower()):
+            seed = zlib.crc32(word.encode('utf-8'))
+            vector += np.random.default_rng(seed).standard_normal(self.dim).astype(np.float32)
+        return vector
+
+    def encode(self, sentences, batch_size: int = 32, show_progress_bar: bool = False,
+               normalize_embeddings: bool = False, **kwargs) -> np.ndarray:
+        if isinstance(sentences, str):
+            sentences = [sentences]
+        cost = STUB_SETTINGS['embed_call_ms'] + STUB_SETTINGS['embed_item_ms'] * len(sentences)
+        if cost:
+            with self._compute:
+                time.sleep(cost / 1000.0)
+        matrix = np.stack([self._vector(text) for text in sentences]) if sentences else np.zeros((0, self.dim), np.float32)
+        if normalize_embeddings:
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            matrix /= norms
+        return matrix
+
+
+def install(llama: bool = True, embedder: bool = True) -> None:
+    """Make LocalLLM use the stubs instead of llama.cpp and/or SentenceTransformer"""
+    import config
+    import local_llm
+    from utils import retriever
+    if llama:
+        local_llm.Llama = StubLlama
+    if embedder:
+        retriever.SentenceTransformer = StubEmbedder
+        # Keep stub vectors apart from the real model's embedding store
+        config.EMBEDDING_SETTINGS = dict(config.EMBEDDING_SETTINGS, model_name='stub-embedder')
@@ -0,0 +1,65 @@
+"""Compile the knowledge base into one binary snapshot for fast startup.
+
+The JSON files under static/data, the retrieval documents built from them
+and from ingested chunks, and the documents' embeddings are written to a
+single memory-mappable file (see utils/kb_snapshot.py):
+
+    python compile_knowledge_base.py
+    python compile_knowledge_base.py --output /srv/policechatbot/knowledge_base.snapshot
+
+Processes started afterwards decode files from the snapshot on first use and
+map the embeddings instead of parsing JSON and reading the embedding store.
+Files edited after compiling are detected by their modification time and
+read from JSON as before, so a stale snapshot is never served; rerun this
+script after editing the knowledge base or ingesting documents.
+"""
+import argparse
+import json
+import logging
+import os
+import time
+
+import config
+from utils import knowledge_base as kb_module
+from utils.kb_snapshot import file_signature, write_snapshot
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output', default=config.KNOWLEDGE_BASE_SETTINGS['snapshot_path'])
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    # Parse the JSON files themselves rather than an existing snapshot
+    knowledge_base = kb_module.KnowledgeBase(check_interval=0)
+    kb_module._default_knowledge_base = knowledge_base
+    from utils.retriever import Retriever
+    retriever = Retriever()
+
+    chunks_signature = file_signature(config.INGESTION_SETTINGS['chunks_file'])
+    header = write_snapshot(
+        args.output,
+        knowledge_base.files,
+        dict(knowledge_base.snapshot()),
+        knowledge_base.signatures,
+        retriever.documents,
+        retriever.languages,
+        retriever.embeddings,
+        config.EMBEDDING_SETTINGS['model_name'],
+        chunks_signature
+    )
+    print(json.dumps({
+        'output': args.output,
+        'files': len(header['files']),
+        'documents': header['corpus']['count'],
+        'embedding_shape': header['corpus']['embeddings']['shape'],
+        'size_mb': os.path.getsize(args.output) / 2 ** 20,
+        'seconds': time.perf_counter() - start
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
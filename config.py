@@ -45,11 +45,136 @@ KIDS_MODE_KEYWORDS = {
 
 # NLP settings
 NLP_SETTINGS = {
-    'min_confidence': 0.6,
+    'min_confidence': 0.8,  # FAQ fast path: cosine similarity the closest stored question must reach
+    'min_margin': 0.05,  # ...and its lead over the closest question with a different answer
     'max_response_length': 500,
     'language': 'en'
 }
 
+# Embedding settings
+EMBEDDING_SETTINGS = {
+    'model_name': 'all-MiniLM-L6-v2',
+    'cache_dir': os.path.join(BASE_DIR, 'model_cache', 'embeddings'),  # Memory-mapped, shared by all workers
+    'query_batch_size': 32,  # Concurrent queries encoded in one call
+    'query_batch_wait': 0.002,  # Seconds a query waits for others to share its batch
+    'query_cache_size': 4096  # Recent query embeddings kept in memory, 0 disables the cache
+}
+
+# Retrieval settings
+RETRIEVAL_SETTINGS = {
+    'backend': 'exact',  # 'ivf' for approximate search once the corpus reaches tens of thousands of documents
+    'dtype': 'float32',  # 'float16' or 'int8' trade a little accuracy for memory on large corpora
+    'ivf_lists': None,  # Number of IVF clusters, defaults to sqrt(number of documents)
+    'ivf_nprobe': 8,  # Clusters scanned per query; higher means better recall and slower queries
+    'hybrid': True,  # Fuse BM25 keyword ranking with the dense ranking; False searches embeddings only
+    'fusion_pool': 32,  # Documents taken from each ranking before fusion
+    'rrf_k': 60,  # Reciprocal rank fusion constant; larger values flatten the weight of top ranks
+    'bm25_k1': 1.5,
+    'bm25_b': 0.75,
+    'bm25_max_df': 0.5  # Query terms in more than this fraction of documents are skipped when rarer ones exist
+}
+
+# Knowledge base settings
+KNOWLEDGE_BASE_SETTINGS = {
+    'check_interval': 5.0,  # Seconds between checks of static/data for edited files, 0 disables hot reload
+    'snapshot_path': os.path.join(BASE_DIR, 'data', 'knowledge_base.snapshot')  # Built by compile_knowledge_base.py; used when present
+}
+
+# Document ingestion settings (see ingest_documents.py)
+INGESTION_SETTINGS = {
+    'chunks_file': os.path.join(BASE_DIR, 'data', 'ingested_chunks.jsonl'),  # Kept out of static/, which is served publicly
+    'batch_size': 64,  # New chunks embedded and appended to the live index at a time
+    'max_words': 120  # Upper bound on chunk length, roughly 160 model tokens
+}
+
+# Tamil fuzzy query matching settings
+TAMIL_MATCH_SETTINGS = {
+    'threshold': 0.2,  # Minimum token Jaccard similarity for a match
+    'ngram_size': 3,  # Character n-gram fallback for spelling variants, 0 disables it
+    'ngram_threshold': 0.4  # Minimum n-gram Jaccard similarity for the fallback
+}
+
+# Tokenizer used for Tamil query matching (see utils/tokenizer.py)
+TOKENIZER_SETTINGS = {
+    'tamil_stemming': True  # Strip common Tamil case and plural suffixes so inflected words match
+}
+
+# Inference scheduler settings
+SCHEDULER_SETTINGS = {
+    'max_concurrency': 1,  # Generations running at once; keep at 1 for a single llama.cpp model
+    'max_queue': 16,  # Requests allowed to wait before new ones get a "busy" response
+    'timeout': 60.0  # Seconds a request may wait and run before it is abandoned
+}
+
+# Retrieved context packing settings
+CONTEXT_SETTINGS = {
+    'candidates': 8,  # Documents retrieved before de-duplication and packing
+    'max_context_tokens': 512,  # Upper bound on context tokens; the n_ctx window may lower it further
+    'duplicate_threshold': 0.8  # Word Jaccard similarity above which a passage counts as a near-duplicate
+}
+
+# Prompt prefix KV-cache settings
+PROMPT_CACHE_SETTINGS = {
+    'enabled': True  # False evaluates every prompt in full, as a baseline for prompt-eval timings
+}
+
+# Response cache settings
+RESPONSE_CACHE_SETTINGS = {
+    'max_entries': 1024,  # Per tier, least recently used answers are evicted first
+    'ttl': 24 * 60 * 60,  # Seconds before a cached answer is regenerated
+    'similarity_threshold': 0.95  # Minimum query embedding similarity for a semantic hit
+}
+
+# Shared inference server settings; when an address is set, web workers use inference_server.py
+# instead of loading their own copy of the models
+INFERENCE_SERVER = {
+    'address': os.getenv('INFERENCE_SERVER_ADDRESS'),  # Unix socket path, or host:port on a loopback host
+    'authkey': os.getenv('INFERENCE_SERVER_AUTHKEY'),  # Required shared secret; requests are unpickled
+    'allow_remote': os.getenv('INFERENCE_SERVER_ALLOW_REMOTE') == '1',  # Permit non-loopback TCP hosts
+    'pool_size': 8  # Connections kept per web worker
+}
+
+# Asyncio serving mode settings (see asgi.py)
+ASGI_SETTINGS = {
+    'executor_workers': 32,  # Threads running blocking model calls; requests beyond this wait on the event loop
+    'max_pending': 2048,  # Chat requests allowed in flight per process before new ones get a "busy" response
+    'wsgi_workers': 16  # Threads serving the mounted Flask routes
+}
+
+# Generation backend routing (see utils/generation_backends.py). Backends are tried in order per language;
+# 'openai' needs OPENAI_API_KEY, 'tamil_gpt2' downloads a Hugging Face model and 'stub' answers without any model
+GENERATION_BACKENDS = {
+    'order': {
+        'english': ['llm', 'openai', 'canned'] if os.getenv('OPENAI_API_KEY') else ['llm', 'canned'],
+        'tamil': ['tamil_chat', 'canned']  # Add 'tamil_gpt2' after 'tamil_chat' for free-form answers
+    },
+    'max_queue_depth': 12,  # Requests waiting on a backend before new ones go to the next backend
+    'deadline': 30.0,  # Seconds; a backend whose expected wait plus generation time is longer is skipped
+    'probe_interval': 30.0,  # Seconds between requests still sent to a backend skipped for its deadline
+    'stub': {'delay': 0.05, 'token_delay': 0.0}
+}
+
+# Tamil GPT-2 CPU serving profile (see utils/tamil_gpt2.py)
+TAMIL_GPT2_SETTINGS = {
+    'model_name': 'ai4bharat/IndicGPT2-Tamil',
+    'lazy': True,  # Load the model on the first request instead of at startup
+    'quantize': True,  # Dynamic int8 weights for the Linear layers; roughly 4x smaller and faster matmuls on CPU
+    'intra_op_threads': 4,  # Threads per matrix multiply; process-wide, shared with any other torch model
+    'inter_op_threads': 1,  # Generation is sequential, so parallel operators would only contend for cores
+    'max_new_tokens': 60,
+    'batch_size': 4,  # Prompts generated together when requests arrive at the same time
+    'batch_wait': 0.02,  # Seconds to wait for more prompts before starting a batch
+    'max_queue': 16,
+    'timeout': 60.0
+}
+
+# Nearby services lookup (see utils/nearby.py); places come from static/data/stations.json
+NEARBY_SETTINGS = {
+    'default_k': 5,  # Places returned per service type when the request has no k
+    'max_k': 20,
+    'max_distance_km': None  # Drop places further than this; None returns the k nearest however far
+}
+
 # Offline mode settings
 OFFLINE_MODE = {
     'enabled': True,
@@ -59,4 +184,6 @@ OFFLINE_MODE = {
 # Logging settings
 LOG_LEVEL = 'INFO'
 LOG_FILE = 'police_chatbot.log'
-LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s' 
\ No newline at end of file
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+ASYNC_LOGGING = True  # Write log records from a background thread instead of the request thread
+RESPONSE_LOG_SAMPLE_RATE = 0.05  # Fraction of chat requests whose full response text is logged 
\ No newline at end of file
@@ -1,6 +0,0 @@
-import nltk
-
-# Download required NLTK data
-nltk.download('punkt')
-nltk.download('averaged_perceptron_tagger')
-nltk.download('wordnet') 
\ No newline at end of file
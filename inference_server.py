@@ -0,0 +1,119 @@
+"""Serve one LocalLLM to many web workers over a local socket.
+
+Every gunicorn worker that imports app.py normally builds its own LocalLLM,
+i.e. its own llama.cpp model, SentenceTransformer and embedding matrix.
+Running the model in this process instead lets the HTTP tier scale by core
+count without multiplying RAM:
+
+    export INFERENCE_SERVER_AUTHKEY=$(python -c "import secrets; print(secrets.token_hex(32))")
+    python inference_server.py --address /tmp/policechatbot-inference.sock
+    INFERENCE_SERVER_ADDRESS=/tmp/policechatbot-inference.sock gunicorn -w 8 app:app
+
+Messages are pickled, so anyone who can connect with the authkey can run
+code in this process. INFERENCE_SERVER_AUTHKEY has no default, and TCP
+addresses must be loopback unless INFERENCE_SERVER_ALLOW_REMOTE=1.
+
+Requests are ``(method, args, kwargs)`` tuples sent with
+multiprocessing.connection; replies are ``('ok', result, stages)``,
+``('chunk', text, stages)`` ... ``('done', stages)`` for streams, or
+``('error', type, message)``. ``stages`` holds the per-stage timings
+recorded since the previous reply, for the client's request trace.
+"""
+import argparse
+import logging
+import os
+import threading
+from multiprocessing.connection import Listener
+
+import config
+from local_llm import LocalLLM
+from utils.async_logging import setup_async_logging
+from utils.inference_client import parse_address, server_authkey
+from utils.metrics import registry, trace
+
+logging.basicConfig(level=logging.INFO)
+if config.ASYNC_LOGGING:
+    setup_async_logging()
+logger = logging.getLogger(__name__)
+
+# Methods a client may call; everything else is rejected
+ALLOWED_METHODS = {'get_response', 'stream_response', 'is_emergency', 'stats', 'startup_timings', 'metrics',
+                   'known_documents', 'add_documents', 'remove_documents', 'persist_embeddings'}
+
+
+def handle_connection(conn, llm: LocalLLM) -> None:
+    """Serve requests from one pooled client connection until it closes"""
+    try:
+        while True:
+            try:
+                method, args, kwargs = conn.recv()
+            except EOFError:
+                return
+            if method not in ALLOWED_METHODS:
+                conn.send(('error', 'RemoteError', f"Unknown method: {method}"))
+                continue
+            try:
+                if method == 'stream_response':
+                    send_stream(conn, llm.stream_response(*args, **kwargs))
+                    continue
+                with trace() as stages:
+                    if method == 'startup_timings':
+                        result = llm.startup_timings
+                    elif method == 'metrics':
+                        result = registry.render(prefix='inference_')
+                    else:
+                        result = getattr(llm, method)(*args, **kwargs)
+                conn.send(('ok', result, stages))
+            except (OSError, EOFError):
+                return
+            except Exception as e:
+                conn.send(('error', type(e).__name__, str(e)))
+    finally:
+        conn.close()
+
+
+def send_stream(conn, chunks) -> None:
+    """Send each chunk with the stages recorded while producing it"""
+    try:
+        while True:
+            with trace() as stages:
+                chunk = next(chunks, None)
+            if chunk is None:
+                break
+            conn.send(('chunk', chunk, stages))
+    finally:
+        # Stops generation if the client went away mid-stream
+        chunks.close()
+    conn.send(('done', stages))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--address', default=config.INFERENCE_SERVER['address'] or '/tmp/policechatbot-inference.sock',
+                        help='Unix socket path, or host:port on a loopback host')
+    parser.add_argument('--model-path', default='models/llama-2-7b-chat.Q4_K_M.gguf')
+    args = parser.parse_args()
+
+    # Refuse to start rather than listen with a guessable key or on a public interface
+    try:
+        authkey = server_authkey(config.INFERENCE_SERVER['authkey'])
+        address = parse_address(args.address, config.INFERENCE_SERVER['allow_remote'])
+    except ValueError as e:
+        parser.error(str(e))
+    if isinstance(address, str) and os.path.exists(address):
+        os.remove(address)
+
+    llm = LocalLLM(model_path=args.model_path)
+    with Listener(address, authkey=authkey) as listener:
+        logger.info(f"Inference server listening on {args.address}")
+        while True:
+            try:
+                conn = listener.accept()
+            except Exception as e:
+                logger.warning(f"Rejected inference client: {str(e)}")
+                continue
+            threading.Thread(target=handle_connection, args=(conn, llm), daemon=True).start()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""Ingest a directory of documents into the retrieval index.
+
+Files are streamed paragraph by paragraph (.docx, .txt) or row by row
+(.xlsx, .xls, .csv) and split into chunks. Files whose content hash is
+already indexed are skipped; the chunks of new files are embedded, in
+batches, and appended to the live index of the running inference server,
+and those of edited files replace the chunks of their previous version:
+
+    python ingest_documents.py path/to/circulars --server /tmp/policechatbot-inference.sock
+
+Without a server the chunks are recorded in config.INGESTION_SETTINGS['chunks_file']
+and indexed the next time the model starts.
+"""
+import argparse
+import json
+import logging
+
+import config
+from utils.ingestion import ChunkFileTarget, IngestionPipeline
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('path', help="File or directory to ingest")
+    parser.add_argument('--server', default=config.INFERENCE_SERVER['address'],
+                        help="Inference server address (defaults to INFERENCE_SERVER_ADDRESS)")
+    parser.add_argument('--batch-size', type=int, default=config.INGESTION_SETTINGS['batch_size'])
+    parser.add_argument('--max-words', type=int, default=config.INGESTION_SETTINGS['max_words'])
+    args = parser.parse_args()
+
+    if args.server:
+        from utils.inference_client import RemoteLLM, server_authkey
+        try:
+            authkey = server_authkey(config.INFERENCE_SERVER['authkey'])
+        except ValueError as e:
+            parser.error(str(e))
+        target = RemoteLLM(args.server, authkey, pool_size=1, timeout=600.0, connect_timeout=10.0,
+                           allow_remote=config.INFERENCE_SERVER['allow_remote'])
+    else:
+        logger.info("No inference server configured; chunks will be indexed on the next start")
+        target = ChunkFileTarget(config.INGESTION_SETTINGS['chunks_file'])
+
+    def progress(stats):
+        logger.info(f"{stats['chunks']} chunks read, {stats['new']} added, {stats['unchanged_files']} files unchanged, "
+                    f"{stats['replaced_files']} replaced ({stats['chunks'] / stats['seconds']:.1f} chunks/s)")
+
+    pipeline = IngestionPipeline(target, args.batch_size, args.max_words, progress)
+    stats = pipeline.run(args.path)
+    if args.server and stats['new']:
+        target.persist_embeddings()
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,25 +1,56 @@
 from llama_cpp import Llama
-from sentence_transformers import SentenceTransformer
 import numpy as np
-from typing import List, Dict, Any
-import json
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 import os
 import logging
 import multiprocessing
 import re
+import time
+import config
 from tamil_chat import TamilChat
+from utils.context_builder import ContextBuilder
+from utils.faq import FAQ_FILES, FAQClassifier
+from utils.intent_detector import get_detector, quick_response
+from utils.inference_scheduler import InferenceScheduler, SchedulerBusy, SchedulerTimeout
+from utils.knowledge_base import get_knowledge_base
+from utils.metrics import record, span
+from utils.prompt_cache import PromptPrefixCache
+from utils.response_cache import ResponseCache
+from utils.retriever import get_retriever
 
 logger = logging.getLogger(__name__)
 
+# Static preamble shared by every English prompt. It comes first and is as long as possible
+# so its llama.cpp KV state can be evaluated once and reused (see utils.prompt_cache)
+PROMPT_PREFIX = """You are a Tamil Nadu Police Help Assistant. You must respond in English only. Do not provide Tamil translations.
+
+Important Note: You must respond in English only. Do not provide Tamil translations. The response should be in English only.
+
+Relevant Information:
+"""
+
+# Sampling parameters shared by blocking and streaming generation
+GENERATION_PARAMS = {
+    'max_tokens': 200,
+    'stop': ["User:", "English:", "Note:", "Translation:", "Solution:", "Answer:", "Response:"],
+    'temperature': 0.1,
+    'top_p': 0.9,
+    'repeat_penalty': 1.2,
+    'echo': False
+}
+
 class LocalLLM:
-    def __init__(self, model_path: str = "models/llama-2-7b-chat.Q4_K_M.gguf"):
+    def __init__(self, model_path: str = "models/llama-2-7b-chat.Q4_K_M.gguf", tamil_chat: Optional[TamilChat] = None):
         """Initialize the local LLM system"""
         try:
             # Initialize logger
             self.logger = logging.getLogger(__name__)
+            self.startup_timings = {}
+            stage_start = time.perf_counter()
             
-            # Initialize Tamil chat system
-            self.tamil_chat = TamilChat()
+            # Initialize Tamil chat system, reusing the app's instance when given
+            self.tamil_chat = tamil_chat or TamilChat()
+            stage_start = self._record_stage('tamil_chat', stage_start)
             
             # Get number of CPU cores
             cpu_count = multiprocessing.cpu_count()
@@ -33,118 +64,127 @@ class LocalLLM:
                 n_threads=n_threads,  # Use optimal number of CPU threads
                 n_gpu_layers=0,  # CPU only
                 n_batch=512,  # Batch size for better CPU utilization
+                use_mmap=True,  # Weights stay in the page cache, shared with other processes
                 verbose=False  # Reduce logging overhead
             )
+            stage_start = self._record_stage('llama_model', stage_start)
             
-            # Initialize sentence transformer with CPU optimizations
-            self.embedder = SentenceTransformer(
-                'all-MiniLM-L6-v2',
-                device='cpu',
-                cache_folder='./model_cache'  # Cache embeddings locally
-            )
+            # Evaluate the fixed prompt preamble once and keep its KV state
+            self.prompt_cache = PromptPrefixCache(self.llm, PROMPT_PREFIX, **config.PROMPT_CACHE_SETTINGS)
+            stage_start = self._record_stage('prompt_prefix', stage_start)
             
-            # Load knowledge base
-            self.knowledge_base = self._load_knowledge_base()
+            # All generation goes through one bounded queue; a single Llama object is not thread-safe
+            self.scheduler = InferenceScheduler('llm', **config.SCHEDULER_SETTINGS)
             
-            # Create document embeddings with progress tracking
-            self.logger.info("Preparing document embeddings...")
-            self.documents = self._prepare_documents()
-            self.embeddings = self.embedder.encode(
-                self.documents,
-                batch_size=32,  # Smaller batch size for CPU
-                show_progress_bar=True
-            )
+            # Embedder, knowledge base and retrieval corpus are shared with the other generation backends
+            self.retriever = get_retriever()
+            self.startup_timings.update(self.retriever.startup_timings)
+            self.context_builder = ContextBuilder(self._count_tokens, config.CONTEXT_SETTINGS['duplicate_threshold'])
+            
+            # Answers to repeated questions are served from memory; they are dropped when the corpus changes
+            self.response_cache = ResponseCache(**config.RESPONSE_CACHE_SETTINGS)
+            self.retriever.subscribe(self.response_cache.clear)
             
-            self.logger.info(f"Local LLM system initialized successfully using {n_threads} CPU threads")
+            # Questions that closely match a stored FAQ are answered without generation
+            stage_start = time.perf_counter()
+            self.faq = self._build_faq(self.retriever.knowledge_base)
+            get_knowledge_base().subscribe(self._reload_faq)
+            self._record_stage('faq', stage_start)
+            
+            timings = ', '.join(f"{stage} {seconds:.2f}s" for stage, seconds in self.startup_timings.items())
+            self.logger.info(f"Local LLM system initialized successfully using {n_threads} CPU threads ({timings})")
             
         except Exception as e:
             self.logger.error(f"Error initializing Local LLM system: {str(e)}")
             raise
     
-    def _load_knowledge_base(self) -> Dict[str, Any]:
-        """Load all knowledge base files"""
-        knowledge_base = {}
-        
-        # Load emergency contacts
-        with open('static/data/emergency_contacts.json', 'r', encoding='utf-8') as f:
-            knowledge_base['emergency_contacts'] = json.load(f)
-        
-        # Load departments
-        with open('static/data/departments.json', 'r', encoding='utf-8') as f:
-            knowledge_base['departments'] = json.load(f)
-        
-        # Load common queries
-        with open('static/data/common_queries.json', 'r', encoding='utf-8') as f:
-            knowledge_base['common_queries'] = json.load(f)
-        
-        # Load kids safety
-        with open('static/data/kids_safety.json', 'r', encoding='utf-8') as f:
-            knowledge_base['kids_safety'] = json.load(f)
-        
-        # Load FIR information
-        with open('static/data/fir_info.json', 'r', encoding='utf-8') as f:
-            knowledge_base['fir_info'] = json.load(f)
-        
-        # Load response patterns
-        with open('static/data/english_responses.json', 'r', encoding='utf-8') as f:
-            knowledge_base['english_responses'] = json.load(f)
-        
-        with open('static/data/tamil_responses.json', 'r', encoding='utf-8') as f:
-            knowledge_base['tamil_responses'] = json.load(f)
-        
-        return knowledge_base
+    def _record_stage(self, stage: str, start: float) -> float:
+        """Record how long a startup stage took and return the start of the next one"""
+        now = time.perf_counter()
+        self.startup_timings[stage] = now - start
+        return now
     
-    def _prepare_documents(self) -> List[str]:
-        """Prepare documents for embedding"""
-        documents = []
-        
-        # Add emergency contacts (English only)
-        for contact, number in self.knowledge_base['emergency_contacts']['english'].items():
-            documents.append(f"{contact}: {number}")
-        
-        # Add departments (English only)
-        for category, items in self.knowledge_base['departments']['english'].items():
-            if isinstance(items, dict):
-                for dept, desc in items.items():
-                    documents.append(f"{dept}: {desc}")
-        
-        # Add common queries (English only)
-        for category, items in self.knowledge_base['common_queries']['english'].items():
-            if isinstance(items, dict):
-                for query, answer in items.items():
-                    documents.append(f"Q: {query}\nA: {answer}")
-        
-        # Add kids safety (English only)
-        for category, items in self.knowledge_base['kids_safety']['english'].items():
-            if isinstance(items, list):
-                for item in items:
-                    documents.append(item)
-        
-        # Add response patterns (English only)
-        response_data = self.knowledge_base['english_responses']
-        if isinstance(response_data, dict) and 'patterns' in response_data:
-            for pattern in response_data['patterns']:
-                if isinstance(pattern, dict) and 'keywords' in pattern and 'response' in pattern:
-                    documents.append(f"Keywords: {', '.join(pattern['keywords'])}\nResponse: {pattern['response']}")
-        
-        return documents
+    @property
+    def knowledge_base(self) -> Dict[str, Any]:
+        return self.retriever.knowledge_base
+    
+    @property
+    def embedder(self):
+        return self.retriever.embedder
+    
+    @property
+    def embedding_store(self):
+        return self.retriever.embedding_store
+    
+    @property
+    def documents(self) -> List[str]:
+        return self.retriever.documents
+    
+    @property
+    def embeddings(self) -> np.ndarray:
+        return self.retriever.embeddings
+    
+    @property
+    def index(self):
+        return self.retriever.index
+    
+    def known_documents(self) -> Dict[str, str]:
+        """Content hash of every ingested source file by path, so ingestion can skip unchanged files"""
+        return self.retriever.known_documents()
+    
+    def add_documents(self, chunks: List[Dict[str, str]]) -> int:
+        """Embed document chunks and add them to the live index, replacing older versions; returns the number added"""
+        return self.retriever.add_documents(chunks)
+    
+    def remove_documents(self, paths: List[str]) -> int:
+        """Drop the ingested chunks of the files at ``paths`` from the live index; returns the number removed"""
+        return self.retriever.remove_documents(paths)
+    
+    def persist_embeddings(self) -> None:
+        """Write the embeddings of ingested chunks to the embedding store so restarts do not re-encode them"""
+        self.retriever.persist_embeddings()
     
-    def _get_relevant_context(self, query: str, top_k: int = 3) -> str:
+    def _embed_query(self, query: str) -> np.ndarray:
+        """Encode a query as a (1, dim) unit-length embedding"""
+        return self.retriever.embed_query(query)
+    
+    def _get_relevant_context(self, query: str, top_k: int = 3, query_embedding: Optional[np.ndarray] = None,
+                              token_budget: Optional[int] = None) -> str:
         """Get relevant context for the query using sentence transformers"""
-        # Get query embedding
-        query_embedding = self.embedder.encode([query])[0]
+        return self._build_context(query, top_k, query_embedding, token_budget)[0]
+    
+    def _build_context(self, query: str, top_k: int = 3, query_embedding: Optional[np.ndarray] = None,
+                       token_budget: Optional[int] = None) -> Tuple[str, int]:
+        """Relevant context for the query and its token count"""
+        passages = self.retriever.search(query, query_embedding=query_embedding, language='english')
         
-        # Calculate cosine similarities using numpy for better CPU performance
-        similarities = np.dot(self.embeddings, query_embedding) / (
-            np.linalg.norm(self.embeddings, axis=1) * np.linalg.norm(query_embedding)
+        # Pack the best distinct documents into the token budget
+        if token_budget is None:
+            token_budget = config.CONTEXT_SETTINGS['max_context_tokens']
+        return self.context_builder.build(passages, token_budget, top_k)
+    
+    def _build_faq(self, knowledge_base: Dict[str, Any]) -> FAQClassifier:
+        """FAQ classifier over the knowledge base, with the thresholds from config.NLP_SETTINGS"""
+        return FAQClassifier.build(
+            knowledge_base,
+            lambda questions: self.retriever.embed_documents(questions, namespace='faq'),
+            min_confidence=config.NLP_SETTINGS['min_confidence'],
+            min_margin=config.NLP_SETTINGS['min_margin']
         )
-        
-        # Get top k most similar documents
-        top_indices = np.argsort(similarities)[-top_k:][::-1]
-        
-        # Combine relevant documents
-        context = "\n\n".join([self.documents[i] for i in top_indices])
-        return context
+    
+    def _reload_faq(self, knowledge_base: Dict[str, Any], changed: List[str]) -> None:
+        """Rebuild the FAQ classifier when one of its source files is edited"""
+        if FAQ_FILES.intersection(changed):
+            self.faq = self._build_faq(knowledge_base)
+    
+    def _faq_response(self, query_embedding: np.ndarray) -> Optional[str]:
+        """The stored answer when the query confidently matches an FAQ question, otherwise None"""
+        with span('faq_match'):
+            match = self.faq.match(query_embedding[0])
+        if match is None:
+            return None
+        self.logger.debug(f"FAQ fast path: {match.question!r} (score {match.score:.2f}, margin {match.margin:.2f})")
+        return match.answer
     
     def _create_prompt(self, query: str, context: str, language: str) -> str:
         """Create prompt for the LLM"""
@@ -169,20 +209,101 @@ Please provide a helpful and accurate response based on the context. If the cont
     
     def is_emergency(self, message: str, language: str) -> bool:
         """Check if the message contains emergency keywords"""
-        emergency_keywords = {
-            'english': ['emergency', 'help', 'danger', 'threat', 'attack', 'robbery', 'theft', 'assault'],
-            'tamil': ['அவசர', 'உதவி', 'ஆபத்து', 'அச்சுறுத்தல்', 'தாக்குதல்', 'கொள்ளை', 'திருட்டு', 'தாக்குதல்']
-        }
-        return any(keyword in message.lower() for keyword in emergency_keywords[language])
+        return get_detector().has(message, f'emergency:{language}')
 
+    def stats(self) -> Dict[str, Any]:
+        """Runtime statistics of the scheduler and caches"""
+        return {
+            'scheduler': self.scheduler.metrics(),
+            'prompt_cache': self.prompt_cache.stats(),
+            'context': self.context_builder.stats(),
+            'query_embeddings': self.retriever.query_embedder.stats(),
+            'response_cache': self.response_cache.stats(),
+            'faq': self.faq.stats()
+        }
+    
     def get_emergency_response(self, language: str) -> str:
         """Get emergency response based on language"""
         if language == 'tamil':
             return "அவசர உதவிக்கு உடனே 100-ஐ அழையுங்கள். நாங்கள் உங்களுக்கு உதவுவோம்."
         return "EMERGENCY: Please call 100 immediately for police assistance!"
 
-    def get_response(self, message: str, lang: str = 'en') -> str:
-        """Get response from the model"""
+    @staticmethod
+    def quick_response(message: str) -> Optional[str]:
+        """Return a canned answer for greetings and emergencies, or None"""
+        return quick_response(message)
+    
+    def _cached_response(self, message: str):
+        """Look the query up in the response cache.
+
+        Returns ``(response, query_embedding)``; the embedding is reused for
+        retrieval on a miss.
+        """
+        start = time.perf_counter()
+        cached = self.response_cache.get_exact(message)
+        lookup_seconds = time.perf_counter() - start
+        if cached is not None:
+            record('cache_lookup', lookup_seconds)
+            return cached, None
+        
+        # The query embedding is timed as its own stage
+        query_embedding = self._embed_query(message)
+        start = time.perf_counter()
+        cached = self.response_cache.get_similar(query_embedding[0])
+        record('cache_lookup', lookup_seconds + time.perf_counter() - start)
+        return cached, query_embedding
+    
+    def _build_prompt(self, message: str, query_embedding: Optional[np.ndarray] = None) -> str:
+        """Create the English-only generation prompt for a query"""
+        suffix = f"""
+
+User Query: {message}
+
+Response:"""
+        
+        # Context gets whatever the window leaves after the fixed parts and the answer
+        start = time.perf_counter()
+        overhead = self._count_tokens(PROMPT_PREFIX + suffix) + 1
+        available = self.llm.n_ctx() - GENERATION_PARAMS['max_tokens'] - overhead
+        budget = max(0, min(config.CONTEXT_SETTINGS['max_context_tokens'], available))
+        build_seconds = time.perf_counter() - start
+        
+        # Get relevant context for English responses; retrieval is timed as its own stage
+        context, context_tokens = self._build_context(message, query_embedding=query_embedding, token_budget=budget)
+        
+        start = time.perf_counter()
+        prompt_tokens = overhead + context_tokens
+        prompt = PROMPT_PREFIX + context + suffix
+        record('prompt_build', build_seconds + time.perf_counter() - start)
+        self.logger.debug(f"Prompt: {prompt_tokens} tokens ({prompt_tokens - overhead} context, budget {budget})")
+        return prompt
+    
+    def _count_tokens(self, text: str) -> int:
+        """Number of model tokens in ``text`` (without the BOS token)"""
+        return len(self.llm.tokenize(text.encode('utf-8'), add_bos=False))
+    
+    def _generate(self, prompt: str) -> Iterator[Dict[str, Any]]:
+        """Stream completion chunks for a prompt; runs on the scheduler worker that owns the model"""
+        start = time.perf_counter()
+        prompt_tokens = self.prompt_cache.prepare(prompt)
+        first_chunk = None
+        try:
+            for chunk in self.llm(prompt, stream=True, **GENERATION_PARAMS):
+                if first_chunk is None:
+                    first_chunk = time.perf_counter()
+                    self.prompt_cache.record(prompt_tokens, first_chunk - start)
+                    record('prompt_eval', first_chunk - start)
+                yield chunk
+        finally:
+            if first_chunk is not None:
+                record('generation', time.perf_counter() - first_chunk)
+    
+    def get_response(self, message: str, lang: str = 'en', raise_errors: bool = False) -> str:
+        """Get response from the model.
+
+        Errors become an apology unless ``raise_errors`` is set, as it is by
+        the backend router so that it can fall back to another backend.
+        """
         try:
             # For Tamil mode, use TamilChat system
             if lang == 'ta':
@@ -191,45 +312,97 @@ Please provide a helpful and accurate response based on the context. If the cont
             # For English mode, continue with LLM logic
             message = message.strip()
             
-            if message.lower() in ["hello", "hi", "greetings"]:
-                return "Hello! I am the Tamil Nadu Police Help Assistant. How can I assist you today?"
+            with span('intent_check'):
+                quick_response = self.quick_response(message)
+            if quick_response:
+                return quick_response
             
-            # Check for emergency keywords in English
-            emergency_keywords = ['emergency', 'help', 'danger', 'threat', 'attack', 'robbery', 'assault']
-            if any(keyword in message.lower() for keyword in emergency_keywords):
-                return "For emergency help, immediately call 100. We will help you."
-
-            # Get relevant context for English responses
-            context = self._get_relevant_context(message)
+            cached, query_embedding = self._cached_response(message)
+            if cached is not None:
+                return cached
             
-            # Create prompt for English responses
-            prompt = f"""You are a Tamil Nadu Police Help Assistant. You must respond in English only. Do not provide Tamil translations.
-
-User Query: {message}
-
-Relevant Information:
-{context}
-
-Important Note: You must respond in English only. Do not provide Tamil translations. The response should be in English only.
-
-Response:"""
+            faq_response = self._faq_response(query_embedding)
+            if faq_response is not None:
+                return faq_response
+            
+            start = time.perf_counter()
+            prompt = self._build_prompt(message, query_embedding)
 
             # Generate response with stricter parameters
-            response = self.llm(
-                prompt,
-                max_tokens=200,
-                stop=["User:", "English:", "Note:", "Translation:", "Solution:", "Answer:", "Response:"],
-                temperature=0.1,
-                top_p=0.9,
-                repeat_penalty=1.2,
-                echo=False
-            )
+            chunks = self.scheduler.stream(self._generate, prompt)
+            
+            # Extract text from the completion chunks
+            texts = [chunk['choices'][0]['text'] for chunk in chunks]
             
-            # Extract text from response dictionary
-            response_text = response['choices'][0]['text'].strip() if isinstance(response, dict) else str(response).strip()
+            with span('post_processing'):
+                response_text = ''.join(texts).strip()
+                if response_text:
+                    self.response_cache.put(message, query_embedding[0], response_text, time.perf_counter() - start)
             
             return response_text
 
+        except (SchedulerBusy, SchedulerTimeout):
+            raise
         except Exception as e:
             logging.error(f"Error generating response: {str(e)}")
-            return "Sorry, unable to generate response at the moment. Please try again." 
\ No newline at end of file
+            if raise_errors:
+                raise
+            return "Sorry, unable to generate response at the moment. Please try again."
+    
+    def stream_response(self, message: str, lang: str = 'en', raise_errors: bool = False) -> Iterator[str]:
+        """Yield the response in pieces as llama.cpp generates tokens.
+
+        With ``raise_errors``, a failure before the first piece is raised
+        instead of streamed as an apology (see get_response).
+        """
+        parts = []
+        try:
+            if lang == 'ta':
+                yield self.tamil_chat.get_response(message)
+                return
+            
+            message = message.strip()
+            
+            with span('intent_check'):
+                quick_response = self.quick_response(message)
+            if quick_response:
+                yield quick_response
+                return
+            
+            cached, query_embedding = self._cached_response(message)
+            if cached is not None:
+                yield cached
+                return
+            
+            faq_response = self._faq_response(query_embedding)
+            if faq_response is not None:
+                yield faq_response
+                return
+            
+            start = time.perf_counter()
+            prompt = self._build_prompt(message, query_embedding)
+            
+            started = False
+            for chunk in self.scheduler.stream(self._generate, prompt):
+                text = chunk['choices'][0]['text']
+                if not started:
+                    # Match the stripped output of get_response
+                    text = text.lstrip()
+                    if not text:
+                        continue
+                    started = True
+                parts.append(text)
+                yield text
+            
+            with span('post_processing'):
+                response_text = ''.join(parts).strip()
+                if response_text:
+                    self.response_cache.put(message, query_embedding[0], response_text, time.perf_counter() - start)
+            
+        except (SchedulerBusy, SchedulerTimeout):
+            raise
+        except Exception as e:
+            logging.error(f"Error streaming response: {str(e)}")
+            if raise_errors and not parts:
+                raise
+            yield "Sorry, unable to generate response at the moment. Please try again."
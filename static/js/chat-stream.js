@@ -0,0 +1,34 @@
+// Shared by the chat pages; load it before chat.js or kids-mode.js
+
+// Function to read a streamed (NDJSON) chat response, calling onToken for each piece
+async function readChatStream(response, onToken) {
+    const contentType = response.headers.get('Content-Type') || '';
+    if (!response.body || !contentType.includes('application/x-ndjson')) {
+        return response.json();
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let result = {};
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        let newline;
+        while ((newline = buffer.indexOf('\n')) >= 0) {
+            const line = buffer.slice(0, newline).trim();
+            buffer = buffer.slice(newline + 1);
+            if (!line) continue;
+            const event = JSON.parse(line);
+            if (event.done) {
+                result = event;
+            } else if (event.token) {
+                onToken(event.token);
+            }
+        }
+    }
+    return result;
+}
@@ -32,15 +32,29 @@ document.addEventListener('DOMContentLoaded', function() {
                 },
                 body: JSON.stringify({
                     message: message,
-                    mode: 'general'
+                    mode: 'general',
+                    stream: true
                 })
             });
 
-            const data = await response.json();
+            // Render tokens as they arrive, then settle on the final text
+            let botMessage = null;
+            const data = await readChatStream(response, function(token) {
+                if (!botMessage) {
+                    addMessage('');
+                    botMessage = chatMessages.lastElementChild;
+                }
+                botMessage.textContent += token;
+                chatMessages.scrollTop = chatMessages.scrollHeight;
+            });
             
             // Add bot response to chat
             if (data.response) {
-                addMessage(data.response);
+                if (botMessage) {
+                    botMessage.textContent = data.response;
+                } else {
+                    addMessage(data.response);
+                }
             }
 
             // If emergency contacts are included, display them
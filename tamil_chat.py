@@ -1,39 +1,34 @@
-import json
-import nltk
-from nltk.tokenize import word_tokenize
-from nltk.corpus import stopwords
-import re
-import codecs
 import logging
+import config
+from utils.fuzzy_matcher import FuzzyMatcher
+from utils.intent_detector import TAMIL_CHAT_PATTERNS, get_detector
+from utils.knowledge_base import get_knowledge_base
+from utils.metrics import span
+from utils.tokenizer import get_tokenizer
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Answer for queries that match no pattern or known question
+UNKNOWN_RESPONSE = "மன்னிக்கவும், உங்கள் கேள்விக்கு தமிழில் பதில் அளிக்க முடியவில்லை. தயவுசெய்து மீண்டும் முயற்சிக்கவும் அல்லது வேறு விதமாக கேள்வியை கேட்கவும்."
+
 class TamilChat:
     def __init__(self):
         """Initialize Tamil chat system"""
         try:
-            # Load knowledge base
-            self.knowledge_base = self._load_knowledge_base()
+            # Unicode-aware Tamil/English tokenizer, optionally stemming Tamil case suffixes
+            self.tokenize = get_tokenizer(config.TOKENIZER_SETTINGS['tamil_stemming'])
             
-            # Initialize NLTK components
-            nltk.download('punkt')
-            nltk.download('averaged_perceptron_tagger')
-            nltk.download('wordnet')
+            # Common Tamil patterns, compiled into the shared intent detector
+            self.patterns = TAMIL_CHAT_PATTERNS
+            get_detector()
             
-            # Define common Tamil patterns
-            self.patterns = {
-                'case_registration': [
-                    'வழக்கு', 'பதிவு', 'செய்வது', 'எப்படி',
-                    'வழக்குப் பதிவு', 'வழக்கு பதிவு', 'வழக்கு பதிவு செய்வது',
-                    'வழக்குப் பதிவு செய்வது எப்படி'
-                ],
-                'emergency': [
-                    'அவசர', 'உதவி', 'ஆபத்து', 'அச்சுறுத்தல்',
-                    'தாக்குதல்', 'கொள்ளை', 'திருட்டு'
-                ]
-            }
+            # Load knowledge base and tokenize the known queries once instead of on every miss;
+            # both are rebuilt together when tamil_responses.json is edited
+            knowledge_base = get_knowledge_base()
+            self._lookup = self._build_lookup(knowledge_base.get('tamil_responses', {}))
+            knowledge_base.subscribe(self._reload)
             
             logger.info("Tamil chat system initialized successfully")
             
@@ -41,31 +36,51 @@ class TamilChat:
             logger.error(f"Error initializing Tamil chat system: {str(e)}")
             raise
 
-    def _load_knowledge_base(self):
-        """Load Tamil knowledge base"""
-        try:
-            with open('static/data/tamil_responses.json', 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except Exception as e:
-            logger.error(f"Error loading Tamil knowledge base: {str(e)}")
-            return {}
+    @property
+    def knowledge_base(self):
+        return self._lookup[0]
+
+    @property
+    def matcher(self):
+        return self._lookup[1]
+
+    @property
+    def detector(self):
+        return get_detector()
+
+    def _build_lookup(self, knowledge_base):
+        """The Tamil knowledge base and the fuzzy matcher over its queries, as one swappable pair"""
+        matcher = FuzzyMatcher(
+            knowledge_base.get('common_queries', {}).keys(),
+            self.tokenize,
+            **config.TAMIL_MATCH_SETTINGS
+        )
+        return knowledge_base, matcher
+
+    def _reload(self, knowledge_base, changed):
+        if 'tamil_responses' in changed:
+            self._lookup = self._build_lookup(knowledge_base['tamil_responses'])
 
     def _check_patterns(self, message: str) -> str:
         """Check if message matches any predefined patterns"""
-        message = message.lower().strip()
+        intents = self.detector.detect(message.strip())
         
         # Check for case registration patterns
-        if any(pattern in message for pattern in self.patterns['case_registration']):
+        if 'tamil_chat:case_registration' in intents:
             return "வழக்குப் பதிவு செய்ய, உங்கள் அருகிலுள்ள காவல் நிலையத்திற்கு செல்லவும். உங்கள் அடையாள சான்று, நிகழ்வு தொடர்பான ஆவணங்கள் மற்றும் சாட்சிகளின் விவரங்களை கொண்டு வாருங்கள். காவல்துறை அதிகாரி உங்கள் புகாரை பதிவு செய்து FIR எண் வழங்குவார்."
         
         # Check for emergency patterns
-        if any(pattern in message for pattern in self.patterns['emergency']):
+        if 'tamil_chat:emergency' in intents:
             return "அவசர உதவிக்கு உடனே 100-ஐ அழையுங்கள். நாங்கள் உங்களுக்கு உதவுவோம்."
         
         return None
 
     def get_response(self, message: str) -> str:
         """Get response for Tamil query"""
+        with span('tamil_chat'):
+            return self._get_response(message)
+
+    def _get_response(self, message: str) -> str:
         try:
             # Clean the input message
             message = message.strip()
@@ -75,32 +90,21 @@ class TamilChat:
             if pattern_response:
                 return pattern_response
             
-            # Check for exact matches in knowledge base
-            if message in self.knowledge_base.get('common_queries', {}):
-                return self.knowledge_base['common_queries'][message]
+            # Use one knowledge base version for the whole lookup, even if a reload swaps it meanwhile
+            knowledge_base, matcher = self._lookup
             
-            # Try to find similar queries
-            message_words = set(word_tokenize(message.lower()))
-            best_match = None
-            best_score = 0
+            # Check for exact matches in knowledge base
+            if message in knowledge_base.get('common_queries', {}):
+                return knowledge_base['common_queries'][message]
             
-            for query in self.knowledge_base.get('common_queries', {}).keys():
-                query_words = set(word_tokenize(query.lower()))
-                # Calculate Jaccard similarity
-                intersection = len(message_words.intersection(query_words))
-                union = len(message_words.union(query_words))
-                if union > 0:
-                    score = intersection / union
-                    if score > 0.2:  # Lower threshold for better matching
-                        if score > best_score:
-                            best_score = score
-                            best_match = query
+            # Try to find similar queries by Jaccard similarity over shared tokens
+            best_match, best_score = matcher.best_match(message)
             
             if best_match:
-                return self.knowledge_base['common_queries'][best_match]
+                return knowledge_base['common_queries'][best_match]
             
             # Default response for unknown queries
-            return "மன்னிக்கவும், உங்கள் கேள்விக்கு தமிழில் பதில் அளிக்க முடியவில்லை. தயவுசெய்து மீண்டும் முயற்சிக்கவும் அல்லது வேறு விதமாக கேள்வியை கேட்கவும்."
+            return UNKNOWN_RESPONSE
             
         except Exception as e:
             logger.error(f"Error in Tamil chat: {str(e)}")
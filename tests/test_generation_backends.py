@@ -0,0 +1,71 @@
+import os
+import sys
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.generation_backends import BackendRouter, GenerationBackend, StubBackend
+from utils.inference_scheduler import InferenceScheduler
+
+
+class FixedBackend(GenerationBackend):
+    name = 'fixed'
+
+    def generate(self, message: str, language: str) -> str:
+        return 'fixed answer'
+
+
+class ScheduledBackend(GenerationBackend):
+    """Answers after ``seconds`` on a single-worker scheduler, so concurrent requests queue"""
+
+    name = 'scheduled'
+
+    def __init__(self, seconds: float):
+        super().__init__()
+        self.seconds = seconds
+        self.scheduler = InferenceScheduler('test', max_concurrency=1)
+
+    def generate(self, message: str, language: str) -> str:
+        return self.scheduler.run(time.sleep, self.seconds) or 'scheduled answer'
+
+
+def router(backend: GenerationBackend, **kwargs) -> BackendRouter:
+    fallback = FixedBackend()
+    return BackendRouter({backend.name: backend, 'fixed': fallback}, {'english': [backend.name, 'fixed']}, **kwargs)
+
+
+class BackendRouterTest(unittest.TestCase):
+    def test_slow_backend_is_probed_and_used_again(self):
+        stub = StubBackend(delay=0.3, text='stub answer')
+        backends = router(stub, deadline=0.2, probe_interval=0.1)
+
+        self.assertEqual(backends.generate('hi', 'english'), 'stub answer')
+        self.assertEqual(backends.generate('hi', 'english'), 'fixed answer')
+
+        # The backend is fast again; probes bring its estimate back under the deadline
+        stub.delay = 0.01
+        for _ in range(10):
+            time.sleep(0.11)
+            backends.generate('hi', 'english')
+            if stub.latency < backends.deadline:
+                break
+        self.assertLess(stub.latency, backends.deadline)
+        self.assertEqual(backends.generate('hi', 'english'), 'stub answer')
+
+    def test_latency_excludes_queue_wait(self):
+        backend = ScheduledBackend(0.1)
+        backends = router(backend, deadline=10.0)
+        threads = [threading.Thread(target=backends.generate, args=('hi', 'english')) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Answers waited up to 0.2s in the queue, but each took 0.1s to serve
+        self.assertLess(backend.latency, 0.15)
+
+
+if __name__ == '__main__':
+    unittest.main()
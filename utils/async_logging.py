@@ -0,0 +1,44 @@
+import atexit
+import logging
+import logging.handlers
+import queue
+import random
+from typing import Dict, Optional
+
+from utils.metrics import format_stages
+
+# Response bodies go to their own logger so they can be routed or silenced separately
+response_logger = logging.getLogger('chat.responses')
+
+_listener = None
+
+
+def setup_async_logging() -> None:
+    """Hand log records to a background thread instead of writing them on the request thread.
+
+    The root logger's handlers are moved behind a QueueHandler; a
+    QueueListener thread formats and writes the records. Safe to call more
+    than once.
+    """
+    global _listener
+    root = logging.getLogger()
+    if _listener is not None or not root.handlers:
+        return
+    handlers = list(root.handlers)
+    records = queue.SimpleQueue()
+    for handler in handlers:
+        root.removeHandler(handler)
+    root.addHandler(logging.handlers.QueueHandler(records))
+    _listener = logging.handlers.QueueListener(records, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+
+def log_response(message: str, language: str, response: str, seconds: float, sample_rate: float,
+                 stages: Optional[Dict[str, float]] = None) -> None:
+    """Log a chat exchange, including the response text for a ``sample_rate`` fraction of requests"""
+    timing = f"{1000 * seconds:.0f} ms" + (f" ({format_stages(stages)})" if stages else '')
+    if random.random() < sample_rate:
+        response_logger.info(f"Response for '{message}' ({language}) in {timing}: {response}")
+    else:
+        response_logger.debug(f"Response ({language}) in {timing}")
@@ -0,0 +1,68 @@
+from collections import Counter
+from typing import Callable, Dict, List, Sequence, Tuple
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from utils.tokenizer import tokenize
+from utils.vector_index import top_k
+
+
+class BM25Index:
+    """Okapi BM25 over an inverted index kept as a scipy CSR matrix.
+
+    Row ``t`` of the (terms x documents) matrix holds the precomputed BM25
+    weight of term ``t`` in every document containing it, so scoring a query
+    only touches the postings of its terms. Terms found in more than
+    ``max_df`` of the documents are pruned from queries that have rarer
+    terms; they barely change the ranking but have the longest postings.
+    """
+
+    def __init__(self, documents: Sequence[str], k1: float = 1.5, b: float = 0.75, max_df: float = 0.5,
+                 tokenizer: Callable[[str], List[str]] = tokenize):
+        self.tokenizer = tokenizer
+        self.max_df = max_df
+        self.vocabulary: Dict[str, int] = {}
+        self.n_documents = len(documents)
+
+        terms, docs, counts = [], [], []
+        lengths = np.zeros(len(documents), dtype=np.float32)
+        for doc_id, text in enumerate(documents):
+            frequencies = Counter(tokenizer(text))
+            lengths[doc_id] = sum(frequencies.values())
+            for term, count in frequencies.items():
+                terms.append(self.vocabulary.setdefault(term, len(self.vocabulary)))
+                docs.append(doc_id)
+                counts.append(count)
+
+        terms = np.asarray(terms, dtype=np.int64)
+        docs = np.asarray(docs, dtype=np.int64)
+        tf = np.asarray(counts, dtype=np.float32)
+        self.df = np.bincount(terms, minlength=len(self.vocabulary))
+        idf = np.log1p((self.n_documents - self.df + 0.5) / (self.df + 0.5)).astype(np.float32)
+        average_length = lengths.mean() if len(documents) else 1.0
+        norm = k1 * (1 - b + b * lengths[docs] / max(average_length, 1.0))
+        weights = idf[terms] * tf * (k1 + 1) / (tf + norm)
+        self.weights = csr_matrix((weights, (terms, docs)), shape=(len(self.vocabulary), self.n_documents))
+
+    def __len__(self) -> int:
+        return self.n_documents
+
+    def _query_terms(self, query: str) -> List[int]:
+        term_ids = sorted({self.vocabulary[t] for t in self.tokenizer(query) if t in self.vocabulary})
+        rare = [t for t in term_ids if self.df[t] <= self.max_df * self.n_documents]
+        return rare or term_ids
+
+    def search(self, query: str, k: int = 10) -> Tuple[np.ndarray, np.ndarray]:
+        """Return ``(indices, scores)`` of the ``k`` best documents that share a term with the query"""
+        term_ids = self._query_terms(query)
+        if not term_ids:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        # Accumulate the query terms' postings, touching only the documents that contain them
+        indptr, indices, data = self.weights.indptr, self.weights.indices, self.weights.data
+        postings = [slice(indptr[t], indptr[t + 1]) for t in term_ids]
+        matched, inverse = np.unique(np.concatenate([indices[p] for p in postings]), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate([data[p] for p in postings]))
+        best, best_scores = top_k(scores[np.newaxis], k)
+        return matched[best[0]], best_scores[0].astype(np.float32)
@@ -0,0 +1,107 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+PENDING = 'pending'
+LOADING = 'loading'
+READY = 'ready'
+FAILED = 'failed'
+
+
+class _Component:
+    def __init__(self, name: str, factory: Callable[[], Any], required: bool):
+        self.name = name
+        self.factory = factory
+        self.required = required
+        self.state = PENDING
+        self.instance = None
+        self.seconds = None
+        self.error = None
+
+
+class ComponentLoader:
+    """Build heavy components in a background thread so the app can serve immediately.
+
+    Components are loaded one after another in registration order. Until a
+    component is ready, :meth:`get` returns ``None`` and callers fall back to
+    cheaper answers. A failed optional component leaves the app running in a
+    degraded mode; a failed required one keeps it out of readiness.
+    """
+
+    def __init__(self):
+        self._components: Dict[str, _Component] = OrderedDict()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._started = None
+
+    def register(self, name: str, factory: Callable[[], Any], required: bool = True) -> None:
+        self._components[name] = _Component(name, factory, required)
+
+    def start(self, background: bool = True) -> None:
+        """Load every registered component, in a daemon thread unless ``background`` is False"""
+        self._started = time.perf_counter()
+        if not background:
+            self._load_all()
+            return
+        self._thread = threading.Thread(target=self._load_all, name='component-loader', daemon=True)
+        self._thread.start()
+
+    def _load_all(self) -> None:
+        for component in self._components.values():
+            with self._lock:
+                component.state = LOADING
+            start = time.perf_counter()
+            try:
+                instance = component.factory()
+                with self._lock:
+                    component.instance = instance
+                    component.state = READY
+            except Exception as e:
+                logger.error(f"Failed to load {component.name}: {str(e)}")
+                with self._lock:
+                    component.error = str(e)
+                    component.state = FAILED
+            component.seconds = time.perf_counter() - start
+            logger.info(f"Startup: {component.name} {component.state} in {component.seconds:.2f}s")
+        logger.info(f"Startup: all components finished in {time.perf_counter() - self._started:.2f}s")
+
+    def get(self, name: str) -> Optional[Any]:
+        """Return the component if it is ready, otherwise None"""
+        component = self._components.get(name)
+        if component is None or component.state != READY:
+            return None
+        return component.instance
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until loading has finished; returns False on timeout"""
+        if self._thread is None:
+            return True
+        self._thread.join(timeout)
+        return not self._thread.is_alive()
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        """Per-component state, load time and error"""
+        with self._lock:
+            return {
+                name: {
+                    'state': component.state,
+                    'required': component.required,
+                    'seconds': component.seconds,
+                    'error': component.error,
+                }
+                for name, component in self._components.items()
+            }
+
+    def is_ready(self) -> bool:
+        """True once nothing is still loading and every required component is ready"""
+        with self._lock:
+            for component in self._components.values():
+                if component.state in (PENDING, LOADING):
+                    return False
+                if component.required and component.state != READY:
+                    return False
+            return True
@@ -0,0 +1,105 @@
+import logging
+import re
+import threading
+from functools import lru_cache
+from typing import Callable, Dict, List, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Sentence ends in English and Tamil text, and line breaks between list items
+_SENTENCE_END = re.compile(r'(?<=[.!?।])\s+|\n+')
+_WORD = re.compile(r'\w+', re.UNICODE)
+
+SEPARATOR = "\n\n"
+
+
+def _word_set(text: str) -> frozenset:
+    return frozenset(_WORD.findall(text.lower()))
+
+
+class ContextBuilder:
+    """Pack the best retrieved passages into a prompt token budget.
+
+    Candidates are taken in score order. Passages that are near-duplicates
+    (word Jaccard similarity at or above ``duplicate_threshold``) of one
+    already chosen are dropped, and the first passage that does not fit is
+    cut at a sentence boundary. Token counts come from ``count_tokens`` (the
+    model's own tokenizer); counts and word sets of the ``cache_size`` most
+    recently seen passages are cached.
+    """
+
+    def __init__(self, count_tokens: Callable[[str], int], duplicate_threshold: float = 0.8,
+                 min_truncated_tokens: int = 32, cache_size: int = 8192):
+        self.count_tokens = count_tokens
+        self.duplicate_threshold = duplicate_threshold
+        self.min_truncated_tokens = min_truncated_tokens
+        # Bounded, since passages change with knowledge base reloads and ingestion
+        self.tokens = lru_cache(maxsize=cache_size)(count_tokens)
+        self._words = lru_cache(maxsize=cache_size)(_word_set)
+        self._lock = threading.Lock()
+        self.separator_tokens = count_tokens(SEPARATOR)
+        self._stats = {'requests': 0, 'context_tokens': 0, 'passages': 0, 'duplicates': 0, 'truncated': 0}
+
+    def _is_duplicate(self, text: str, chosen: List[str]) -> bool:
+        words = self._words(text)
+        for other in chosen:
+            other_words = self._words(other)
+            union = len(words | other_words)
+            if union and len(words & other_words) / union >= self.duplicate_threshold:
+                return True
+        return False
+
+    def _truncate(self, text: str, budget: int) -> str:
+        """Longest run of leading sentences of ``text`` that fits in ``budget`` tokens"""
+        kept = []
+        used = 0
+        for sentence in _SENTENCE_END.split(text):
+            if not sentence.strip():
+                continue
+            cost = self.count_tokens(sentence) + (1 if kept else 0)
+            if used + cost > budget:
+                break
+            kept.append(sentence)
+            used += cost
+        return ' '.join(kept)
+
+    def build(self, passages: Sequence[str], budget: int, max_passages: int = 3) -> Tuple[str, int]:
+        """Join the best passages that fit in ``budget`` tokens; returns ``(context, tokens)``"""
+        chosen: List[str] = []
+        used = 0
+        duplicates = truncated = 0
+        for text in passages:
+            if len(chosen) >= max_passages:
+                break
+            if self._is_duplicate(text, chosen):
+                duplicates += 1
+                continue
+            cost = self.tokens(text) + (self.separator_tokens if chosen else 0)
+            if used + cost <= budget:
+                chosen.append(text)
+                used += cost
+                continue
+            remaining = budget - used - (self.separator_tokens if chosen else 0)
+            if remaining >= self.min_truncated_tokens:
+                shortened = self._truncate(text, remaining)
+                if shortened:
+                    chosen.append(shortened)
+                    used += self.count_tokens(shortened) + (self.separator_tokens if len(chosen) > 1 else 0)
+                    truncated += 1
+            break
+
+        with self._lock:
+            self._stats['requests'] += 1
+            self._stats['context_tokens'] += used
+            self._stats['passages'] += len(chosen)
+            self._stats['duplicates'] += duplicates
+            self._stats['truncated'] += truncated
+        return SEPARATOR.join(chosen), used
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            stats = dict(self._stats)
+        requests = stats['requests'] or 1
+        stats['mean_context_tokens'] = stats['context_tokens'] / requests
+        stats['mean_passages'] = stats['passages'] / requests
+        return stats
@@ -0,0 +1,173 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from typing import Callable, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingStore:
+    """Content-addressed on-disk cache of document embeddings.
+
+    Each row is keyed by a hash of the embedder model name and the document
+    text. Rows live in a single ``.npy`` file that is opened with
+    ``mmap_mode='r'``, so every worker process maps the same pages read-only
+    instead of holding a private copy. Only documents that are not already in
+    the store are passed to the encoder.
+
+    Each ``namespace`` has its own manifest and matrix, so consumers that
+    embed different document sets with the same model (the retrieval corpus,
+    the FAQ questions) do not evict each other's rows.
+    """
+
+    def __init__(self, model_name: str, cache_dir: str = './model_cache/embeddings', namespace: str = ''):
+        self.model_name = model_name
+        self.cache_dir = cache_dir
+        self.slug = re.sub(r'[^A-Za-z0-9_.-]+', '_', f'{model_name}.{namespace}' if namespace else model_name)
+        # Matrices and indexes written by this store: the slug, a 16-digit digest and an extension
+        self._own_file = re.compile(re.escape(self.slug) + r'-[0-9a-f]{16}\.')
+        self.manifest_path = os.path.join(cache_dir, f'{self.slug}.json')
+        self.stats = {'cached': 0, 'encoded': 0, 'seconds': 0.0}
+        self.current_file = None
+        self._attached = None
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def document_key(self, text: str) -> str:
+        """Return the content address of a document for this model"""
+        return hashlib.sha256(f"{self.model_name}\0{text}".encode('utf-8')).hexdigest()
+
+    def _load(self) -> Tuple[List[str], np.ndarray]:
+        """Load the manifest keys and the memory-mapped matrix, if any"""
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            if manifest.get('model') != self.model_name:
+                return [], None
+            matrix = np.load(os.path.join(self.cache_dir, manifest['file']), mmap_mode='r')
+            keys = manifest['keys']
+            if matrix.ndim != 2 or matrix.shape[0] != len(keys):
+                logger.warning(f"Embedding store {self.manifest_path} is inconsistent, rebuilding")
+                return [], None
+            self.current_file = manifest['file']
+            return keys, matrix
+        except FileNotFoundError:
+            return [], None
+        except Exception as e:
+            logger.warning(f"Could not read embedding store {self.manifest_path}: {str(e)}")
+            return [], None
+
+    def _save(self, keys: List[str], matrix: np.ndarray) -> None:
+        """Write the matrix and then atomically swap in a manifest pointing at it"""
+        digest = hashlib.sha256('\n'.join(keys).encode('utf-8')).hexdigest()[:16]
+        filename = f'{self.slug}-{digest}.npy'
+        path = os.path.join(self.cache_dir, filename)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.save(f, np.ascontiguousarray(matrix, dtype=np.float32))
+        os.replace(tmp_path, path)
+
+        manifest = {'model': self.model_name, 'file': filename, 'dim': int(matrix.shape[1]), 'keys': keys}
+        tmp_manifest = f'{self.manifest_path}.{os.getpid()}.tmp'
+        with open(tmp_manifest, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+        os.replace(tmp_manifest, self.manifest_path)
+
+        # Old matrices stay valid for processes that already mapped them. Only this namespace's files are
+        # removed; other namespaces and models share the directory.
+        prefix = filename[:-len('.npy')]
+        for name in os.listdir(self.cache_dir):
+            if self._own_file.match(name) and not name.startswith(prefix) and not name.endswith('.tmp'):
+                try:
+                    os.remove(os.path.join(self.cache_dir, name))
+                except OSError:
+                    pass
+
+    def attach(self, documents: Sequence[str], matrix: np.ndarray, source: str) -> None:
+        """Serve embeddings loaded from elsewhere (the compiled snapshot) as if they were stored.
+
+        Their rows are reused instead of re-encoded the next time
+        ``get_embeddings`` misses, and are written to the store then. Vector
+        indexes over ``matrix`` are saved under a name derived from ``source``,
+        which must change whenever the matrix does.
+        """
+        self._attached = (list(documents), matrix)
+        self.current_file = f"{self.slug}-{hashlib.sha256(source.encode('utf-8')).hexdigest()[:16]}.npy"
+
+    def index_path(self, backend: str) -> str:
+        """Path for a vector index built over the current matrix, or None"""
+        if self.current_file is None:
+            return None
+        return os.path.join(self.cache_dir, self.current_file[:-len('.npy')] + f'.{backend}.npz')
+
+    def get_embeddings(self, documents: Sequence[str],
+                       encode: Callable[[List[str]], np.ndarray]) -> np.ndarray:
+        """Return a read-only (n_documents, dim) float32 matrix for ``documents``.
+
+        ``encode`` is only called with the documents missing from the store.
+        """
+        start = time.perf_counter()
+        keys = [self.document_key(doc) for doc in documents]
+        stored_keys, stored = self._load()
+
+        if stored is not None and stored_keys == keys:
+            self.stats = {'cached': len(keys), 'encoded': 0, 'seconds': time.perf_counter() - start}
+            logger.info(f"Loaded {len(keys)} embeddings from {self.manifest_path}")
+            return stored
+
+        stored_index: Dict[str, int] = {key: i for i, key in enumerate(stored_keys)}
+        attached_index: Dict[str, int] = {}
+        if self._attached is not None:
+            attached_documents, attached = self._attached
+            attached_index = {self.document_key(doc): i for i, doc in enumerate(attached_documents)}
+        missing: Dict[str, str] = {}
+        for key, doc in zip(keys, documents):
+            if key not in stored_index and key not in attached_index and key not in missing:
+                missing[key] = doc
+
+        new_index: Dict[str, int] = {}
+        new_vectors = None
+        if missing:
+            new_vectors = np.asarray(encode(list(missing.values())), dtype=np.float32)
+            new_index = {key: i for i, key in enumerate(missing)}
+
+        if new_vectors is not None:
+            dim = new_vectors.shape[1]
+        elif stored is not None:
+            dim = stored.shape[1]
+        elif attached_index:
+            dim = attached.shape[1]
+        else:
+            return np.zeros((0, 0), dtype=np.float32)
+
+        matrix = np.empty((len(keys), dim), dtype=np.float32)
+        for row, key in enumerate(keys):
+            if key in new_index:
+                matrix[row] = new_vectors[new_index[key]]
+            elif key in stored_index:
+                matrix[row] = stored[stored_index[key]]
+            else:
+                matrix[row] = attached[attached_index[key]]
+
+        try:
+            self._save(keys, matrix)
+            # The store now holds every row it needs; the attached matrix is no longer consulted
+            self._attached = None
+            _, mapped = self._load()
+            if mapped is not None:
+                matrix = mapped
+        except OSError as e:
+            logger.warning(f"Could not persist embeddings to {self.cache_dir}: {str(e)}")
+
+        self.stats = {
+            'cached': sum(1 for key in keys if key in stored_index or key in attached_index),
+            'encoded': len(missing),
+            'seconds': time.perf_counter() - start,
+        }
+        logger.info(f"Embedding store: {self.stats['cached']} cached, {self.stats['encoded']} encoded "
+                    f"in {self.stats['seconds']:.2f}s")
+        return matrix
@@ -0,0 +1,122 @@
+import logging
+import threading
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from utils.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+# Knowledge base files the FAQ answers come from; editing one rebuilds the classifier
+FAQ_FILES = {'common_queries', 'fir_info', 'english_responses'}
+
+FAQ_LOOKUPS = registry.counter('chat_faq_lookups_total',
+                               "FAQ fast path lookups by outcome (answered, low_confidence, low_margin)", ['outcome'])
+
+
+class FAQMatch(NamedTuple):
+    question: str
+    answer: str
+    score: float
+    margin: float
+
+
+def faq_entries(knowledge_base: Dict[str, Any]) -> List[Tuple[str, str]]:
+    """English ``(question, answer)`` pairs from common queries, FIR filing information and response patterns"""
+    entries = []
+
+    for category, items in knowledge_base['common_queries']['english'].items():
+        if isinstance(items, dict):
+            entries.extend(items.items())
+
+    fir_info = knowledge_base.get('fir_info', {}).get('english', {})
+    for method, info in fir_info.get('filing_methods', {}).items():
+        answer = f"To file an FIR {method}: {'; '.join(info.get('steps', []))}."
+        if info.get('requirements'):
+            answer += f" You will need: {', '.join(info['requirements'])}."
+        entries.append((f"How do I file an FIR {method}?", answer))
+    if fir_info.get('important_notes'):
+        entries.append(("What are my rights when filing an FIR?", '. '.join(fir_info['important_notes']) + '.'))
+
+    # Every keyword of a pattern is a way of asking for its response
+    for pattern in knowledge_base.get('english_responses', {}).get('patterns', []):
+        if isinstance(pattern, dict) and 'response' in pattern:
+            entries.extend((keyword, pattern['response']) for keyword in pattern.get('keywords', []))
+
+    return entries
+
+
+class FAQClassifier:
+    """Nearest stored question by embedding similarity, accepted only when the match is unambiguous.
+
+    A query is answered when its most similar question scores at least
+    ``min_confidence`` and beats the best question with a *different*
+    answer by ``min_margin``; questions sharing an answer (e.g. the keywords
+    of one response pattern) do not count against each other.
+    """
+
+    def __init__(self, entries: List[Tuple[str, str]], embeddings: np.ndarray,
+                 min_confidence: float = 0.8, min_margin: float = 0.05):
+        self.questions = [question for question, _ in entries]
+        self.answers = []
+        answer_ids = {}
+        for _, answer in entries:
+            answer_ids.setdefault(answer, len(self.answers))
+            if answer_ids[answer] == len(self.answers):
+                self.answers.append(answer)
+        self.answer_ids = np.array([answer_ids[answer] for _, answer in entries], dtype=np.int64)
+        self.matrix = np.asarray(embeddings, dtype=np.float32)
+        self.min_confidence = min_confidence
+        self.min_margin = min_margin
+        self._lock = threading.Lock()
+        self._stats = {'lookups': 0, 'answered': 0, 'low_confidence': 0, 'low_margin': 0}
+
+    @classmethod
+    def build(cls, knowledge_base: Dict[str, Any], encode: Callable[[List[str]], np.ndarray],
+              **thresholds) -> 'FAQClassifier':
+        """Classifier over the knowledge base's FAQ entries, with questions embedded by ``encode``"""
+        entries = faq_entries(knowledge_base)
+        embeddings = encode([question for question, _ in entries]) if entries else np.zeros((0, 0), np.float32)
+        logger.info(f"FAQ classifier built over {len(entries)} questions")
+        return cls(entries, embeddings, **thresholds)
+
+    def __len__(self) -> int:
+        return len(self.questions)
+
+    def _count(self, outcome: str) -> None:
+        with self._lock:
+            self._stats['lookups'] += 1
+            self._stats[outcome] += 1
+        FAQ_LOOKUPS.inc(outcome=outcome)
+
+    def best(self, query_embedding: np.ndarray) -> Optional[FAQMatch]:
+        """The closest question and its margin, without applying the thresholds"""
+        if not len(self):
+            return None
+        scores = self.matrix @ np.asarray(query_embedding, dtype=np.float32).reshape(-1)
+        top = int(np.argmax(scores))
+        others = scores[self.answer_ids != self.answer_ids[top]]
+        runner_up = float(others.max()) if others.size else -1.0
+        score = float(scores[top])
+        return FAQMatch(self.questions[top], self.answers[self.answer_ids[top]], score, score - runner_up)
+
+    def match(self, query_embedding: np.ndarray) -> Optional[FAQMatch]:
+        """The stored answer for the query if the thresholds are met, otherwise None"""
+        best = self.best(query_embedding)
+        if best is None or best.score < self.min_confidence:
+            self._count('low_confidence')
+            return None
+        if best.margin < self.min_margin:
+            self._count('low_margin')
+            return None
+        self._count('answered')
+        return best
+
+    def stats(self) -> Dict[str, Any]:
+        """How often the fast path fired, and why it did not"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats['entries'] = len(self)
+        stats['fire_rate'] = stats['answered'] / stats['lookups'] if stats['lookups'] else 0.0
+        return stats
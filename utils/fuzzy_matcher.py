@@ -0,0 +1,79 @@
+from collections import defaultdict
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+
+def char_ngrams(tokens: Iterable[str], n: int) -> FrozenSet[str]:
+    """Character n-grams of each token, padded so word edges count"""
+    grams = set()
+    for token in tokens:
+        padded = f' {token} '
+        if len(padded) <= n:
+            grams.add(padded)
+            continue
+        for i in range(len(padded) - n + 1):
+            grams.add(padded[i:i + n])
+    return frozenset(grams)
+
+
+class _JaccardIndex:
+    """Inverted index from feature to key ids with precomputed feature sets"""
+
+    def __init__(self, feature_sets: List[FrozenSet[str]]):
+        self.sizes = [len(features) for features in feature_sets]
+        self.postings: Dict[str, List[int]] = defaultdict(list)
+        for key_id, features in enumerate(feature_sets):
+            for feature in features:
+                self.postings[feature].append(key_id)
+
+    def best(self, features: FrozenSet[str], threshold: float) -> Tuple[Optional[int], float]:
+        # Only keys sharing at least one feature with the query are scored
+        overlap: Dict[int, int] = defaultdict(int)
+        for feature in features:
+            for key_id in self.postings.get(feature, ()):
+                overlap[key_id] += 1
+
+        best_id, best_score = None, 0.0
+        for key_id, intersection in overlap.items():
+            score = intersection / (len(features) + self.sizes[key_id] - intersection)
+            # Ties go to the earlier key, as with the old linear scan
+            if score > threshold and (score > best_score or (score == best_score and key_id < best_id)):
+                best_id, best_score = key_id, score
+        return best_id, best_score
+
+
+class FuzzyMatcher:
+    """Find the stored query most similar to a message by Jaccard similarity.
+
+    Keys are tokenized once when the matcher is built. A lookup tokenizes
+    the message once and only scores keys that share a token with it. When
+    ``ngram_size`` is set, messages with no token match fall back to
+    character n-gram similarity, which tolerates Tamil spelling variants.
+    """
+
+    def __init__(self, keys: Iterable[str], tokenize: Callable[[str], List[str]],
+                 threshold: float = 0.2, ngram_size: int = 0, ngram_threshold: float = 0.4):
+        self.keys = list(keys)
+        self.tokenize = tokenize
+        self.threshold = threshold
+        self.ngram_size = ngram_size
+        self.ngram_threshold = ngram_threshold
+
+        token_lists = [tokenize(key) for key in self.keys]
+        self.token_sets = [frozenset(tokens) for tokens in token_lists]
+        self._tokens = _JaccardIndex(self.token_sets)
+        self._ngrams = None
+        if ngram_size:
+            self._ngrams = _JaccardIndex([char_ngrams(tokens, ngram_size) for tokens in token_lists])
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def best_match(self, message: str) -> Tuple[Optional[str], float]:
+        """Return ``(key, score)`` of the best match above threshold, or ``(None, 0.0)``"""
+        tokens = self.tokenize(message)
+        key_id, score = self._tokens.best(frozenset(tokens), self.threshold)
+        if key_id is None and self._ngrams is not None:
+            key_id, score = self._ngrams.best(char_ngrams(tokens, self.ngram_size), self.ngram_threshold)
+        if key_id is None:
+            return None, 0.0
+        return self.keys[key_id], score
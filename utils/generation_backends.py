@@ -0,0 +1,345 @@
+import itertools
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import config
+from tamil_chat import UNKNOWN_RESPONSE
+from utils.inference_scheduler import SchedulerBusy, SchedulerTimeout
+from utils.intent_detector import get_detector, quick_response
+from utils.metrics import registry, trace
+
+logger = logging.getLogger(__name__)
+
+BACKEND_REQUESTS = registry.counter('chat_backend_requests_total',
+                                    "Generation backend attempts by outcome (answered, no_answer, skipped_*, busy, "
+                                    "timeout, error)", ['backend', 'outcome'])
+
+
+class NoAnswer(Exception):
+    """The backend has nothing specific to say; ``text`` is its generic reply, if any"""
+
+    def __init__(self, text: Optional[str] = None):
+        super().__init__(text or '')
+        self.text = text
+
+
+class NoBackendAvailable(Exception):
+    """Every backend for the language was unavailable, overloaded or had no answer"""
+
+
+class GenerationBackend:
+    """One way of answering a chat message.
+
+    Subclasses implement ``generate`` and, if they can produce the answer
+    piece by piece, ``stream``. ``ready`` and ``queue_depth`` let the router
+    skip backends that are still loading or overloaded; the router keeps an
+    exponentially weighted average of each backend's service time, i.e. the
+    latency of its answers without the time they waited in its queue.
+    """
+
+    name = 'backend'
+
+    def __init__(self, languages=('english', 'tamil')):
+        self.languages = tuple(languages)
+        self.latency: Optional[float] = None
+        self.last_attempt = float('-inf')
+        self._lock = threading.Lock()
+
+    def ready(self) -> bool:
+        return True
+
+    def queue_depth(self) -> int:
+        """Requests waiting for or running on this backend"""
+        return 0
+
+    def generate(self, message: str, language: str) -> str:
+        raise NotImplementedError
+
+    def stream(self, message: str, language: str) -> Iterator[str]:
+        yield self.generate(message, language)
+
+    def observe(self, seconds: float, alpha: float = 0.2) -> None:
+        with self._lock:
+            self.latency = seconds if self.latency is None else (1 - alpha) * self.latency + alpha * seconds
+
+    def expected_seconds(self) -> Optional[float]:
+        """Rough time until a new request would be answered: one service time per queued request and its own"""
+        if self.latency is None:
+            return None
+        return (self.queue_depth() + 1) * self.latency
+
+
+class ComponentBackend(GenerationBackend):
+    """Backend around a component that is loaded in the background (see utils.component_loader)"""
+
+    def __init__(self, get_component: Callable[[], Any], **kwargs):
+        super().__init__(**kwargs)
+        self._get_component = get_component
+
+    @property
+    def component(self):
+        return self._get_component()
+
+    def ready(self) -> bool:
+        return self.component is not None
+
+
+class SchedulerBackend(ComponentBackend):
+    """Backend whose component queues requests on an InferenceScheduler reported by ``stats()['scheduler']``"""
+
+    def __init__(self, get_component: Callable[[], Any], refresh_interval: float = 0.5, **kwargs):
+        super().__init__(get_component, **kwargs)
+        self.refresh_interval = refresh_interval
+        self._depth = (0.0, 0)
+
+    def queue_depth(self) -> int:
+        # stats() is a round trip to the inference server in shared mode, so it is read at most every refresh_interval
+        checked, depth = self._depth
+        now = time.monotonic()
+        if now - checked > self.refresh_interval:
+            try:
+                scheduler = self.component.stats()['scheduler']
+                depth = scheduler['queue_depth'] + scheduler['running']
+            except Exception as e:
+                logger.warning(f"Could not read the {self.name} queue depth: {str(e)}")
+            self._depth = (now, depth)
+        return depth
+
+
+class LocalLLMBackend(SchedulerBackend):
+    """llama.cpp through LocalLLM, in-process or on the shared inference server"""
+
+    name = 'llm'
+
+    # Errors are raised rather than answered with an apology, so the router falls back
+    def generate(self, message: str, language: str) -> str:
+        return self.component.get_response(message, language, raise_errors=True)
+
+    def stream(self, message: str, language: str) -> Iterator[str]:
+        return self.component.stream_response(message, language, raise_errors=True)
+
+
+class OpenAIBackend(ComponentBackend):
+    """ChatGPT through RAGSystem"""
+
+    name = 'openai'
+
+    def generate(self, message: str, language: str) -> str:
+        return self.component.get_response(message, language, raise_errors=True)
+
+
+class TamilGPT2Backend(SchedulerBackend):
+    """Free-form Tamil generation with utils.tamil_gpt2"""
+
+    name = 'tamil_gpt2'
+
+    def __init__(self, get_component: Callable[[], Any], **kwargs):
+        kwargs.setdefault('languages', ('tamil',))
+        super().__init__(get_component, **kwargs)
+
+    def generate(self, message: str, language: str) -> str:
+        return self.component.generate_response(message)
+
+
+class TamilChatBackend(ComponentBackend):
+    """Pattern and known-question answers from TamilChat"""
+
+    name = 'tamil_chat'
+
+    def __init__(self, get_component: Callable[[], Any], **kwargs):
+        kwargs.setdefault('languages', ('tamil',))
+        super().__init__(get_component, **kwargs)
+
+    def generate(self, message: str, language: str) -> str:
+        response = self.component.get_response(message)
+        if response == UNKNOWN_RESPONSE:
+            raise NoAnswer(response)
+        return response
+
+
+class CannedBackend(GenerationBackend):
+    """Greeting, emergency and response pattern answers; needs no model"""
+
+    name = 'canned'
+
+    def generate(self, message: str, language: str) -> str:
+        if language == 'tamil':
+            response = get_detector().pattern_response(message, 'tamil_responses')
+        else:
+            response = quick_response(message.strip()) or get_detector().pattern_response(message)
+        if not response:
+            raise NoAnswer()
+        return response
+
+
+class StubBackend(GenerationBackend):
+    """Fixed answer after a fixed delay, for tests and load tests without models"""
+
+    name = 'stub'
+
+    def __init__(self, delay: float = 0.05, token_delay: float = 0.0,
+                 text: str = "This is a test answer to: {message}", **kwargs):
+        super().__init__(**kwargs)
+        self.delay = delay
+        self.token_delay = token_delay
+        self.text = text
+
+    def generate(self, message: str, language: str) -> str:
+        return ''.join(self.stream(message, language))
+
+    def stream(self, message: str, language: str) -> Iterator[str]:
+        time.sleep(self.delay)
+        for i, word in enumerate(self.text.format(message=message).split(' ')):
+            if i:
+                time.sleep(self.token_delay)
+            yield ' ' + word if i else word
+
+
+class BackendRouter:
+    """Pick a generation backend per request by language, load and latency.
+
+    Backends are tried in the configured order for the message's language.
+    One is skipped while it is loading, when more than ``max_queue_depth``
+    requests are waiting for it, or when its expected wait plus generation
+    time would exceed ``deadline`` seconds. A backend skipped for its latency
+    still gets one request every ``probe_interval`` seconds, so a single slow
+    answer does not shut it out for good. A backend that is busy, times out
+    or fails hands the request to the next one. If no backend answers,
+    the first generic ``NoAnswer`` reply is used, then a busy error is
+    re-raised so the client gets a 503, and otherwise NoBackendAvailable.
+    """
+
+    def __init__(self, backends: Dict[str, GenerationBackend], order: Dict[str, List[str]],
+                 max_queue_depth: int = 12, deadline: float = 30.0, probe_interval: float = 30.0):
+        self.backends = backends
+        self.order = order
+        self.max_queue_depth = max_queue_depth
+        self.deadline = deadline
+        self.probe_interval = probe_interval
+
+    def candidates(self, language: str) -> List[GenerationBackend]:
+        names = self.order.get(language, self.order.get('english', []))
+        return [self.backends[name] for name in names
+                if name in self.backends and language in self.backends[name].languages]
+
+    def _skip_reason(self, backend: GenerationBackend) -> Optional[str]:
+        if not backend.ready():
+            return 'not_ready'
+        if backend.queue_depth() > self.max_queue_depth:
+            return 'queue'
+        expected = backend.expected_seconds()
+        if (expected is not None and expected > self.deadline
+                and time.monotonic() - backend.last_attempt < self.probe_interval):
+            return 'deadline'
+        return None
+
+    def _attempts(self, message: str, language: str, start: Callable[[GenerationBackend], Any]):
+        """Run ``start(backend)`` on each admissible backend until one succeeds; returns (backend, result)"""
+        fallback_text, busy = None, None
+        for backend in self.candidates(language):
+            reason = self._skip_reason(backend)
+            if reason is not None:
+                BACKEND_REQUESTS.inc(backend=backend.name, outcome=f'skipped_{reason}')
+                if reason != 'not_ready':
+                    busy = busy or SchedulerBusy(f"{backend.name} is overloaded")
+                continue
+            try:
+                return backend, start(backend)
+            except NoAnswer as e:
+                BACKEND_REQUESTS.inc(backend=backend.name, outcome='no_answer')
+                fallback_text = fallback_text or e.text
+            except SchedulerBusy as e:
+                BACKEND_REQUESTS.inc(backend=backend.name, outcome='busy')
+                busy = e
+            except SchedulerTimeout as e:
+                BACKEND_REQUESTS.inc(backend=backend.name, outcome='timeout')
+                busy = e
+            except Exception as e:
+                BACKEND_REQUESTS.inc(backend=backend.name, outcome='error')
+                logger.error(f"Backend {backend.name} failed: {str(e)}")
+            finally:
+                # The probe interval counts from the end of the last attempt
+                backend.last_attempt = time.monotonic()
+
+        if fallback_text:
+            return None, fallback_text
+        if busy is not None:
+            raise busy
+        raise NoBackendAvailable(f"No generation backend answered for language '{language}'")
+
+    def generate(self, message: str, language: str) -> str:
+        def start(backend):
+            begin = time.perf_counter()
+            with trace() as stages:
+                response = backend.generate(message, language)
+            # Queue wait is already accounted for by queue_depth() in expected_seconds
+            backend.observe(time.perf_counter() - begin - stages.get('queue_wait', 0.0))
+            return response
+
+        backend, response = self._attempts(message, language, start)
+        if backend is not None:
+            BACKEND_REQUESTS.inc(backend=backend.name, outcome='answered')
+        return response
+
+    def stream(self, message: str, language: str) -> Iterator[str]:
+        """Like generate, but yields the answer in pieces.
+
+        A backend counts as answering once its first piece arrives, so
+        failures before that still fall back to the next backend.
+        """
+        begin = {}
+
+        def start(backend):
+            begin['time'] = time.perf_counter()
+            with trace() as stages:
+                chunks = iter(backend.stream(message, language))
+                first_chunk = next(chunks, None)
+            begin['time'] += stages.get('queue_wait', 0.0)
+            return itertools.chain([first_chunk] if first_chunk is not None else [], chunks)
+
+        backend, chunks = self._attempts(message, language, start)
+        if backend is None:
+            return iter([chunks])
+        BACKEND_REQUESTS.inc(backend=backend.name, outcome='answered')
+        return self._observed(backend, chunks, begin['time'])
+
+    @staticmethod
+    def _observed(backend: GenerationBackend, chunks: Iterator[str], begin: float) -> Iterator[str]:
+        """Yield the chunks, then record the service time from ``begin`` (the end of the queue wait)"""
+        yield from chunks
+        backend.observe(time.perf_counter() - begin)
+
+    def stats(self) -> Dict[str, Any]:
+        return {name: {'ready': backend.ready(), 'latency_ms': None if backend.latency is None else 1000 * backend.latency}
+                for name, backend in self.backends.items()}
+
+
+BACKEND_TYPES = {
+    'llm': LocalLLMBackend,
+    'openai': OpenAIBackend,
+    'tamil_gpt2': TamilGPT2Backend,
+    'tamil_chat': TamilChatBackend
+}
+
+
+def build_router(get_component: Callable[[str], Any], settings: Optional[Dict[str, Any]] = None) -> BackendRouter:
+    """Router over the backends named in ``settings['order']`` (config.GENERATION_BACKENDS by default).
+
+    Model backends read their component lazily through ``get_component(name)``,
+    so the router can be built before the components finish loading.
+    """
+    settings = settings or config.GENERATION_BACKENDS
+    backends = {}
+    for name in {name for names in settings['order'].values() for name in names}:
+        if name == 'canned':
+            backends[name] = CannedBackend()
+        elif name == 'stub':
+            backends[name] = StubBackend(**settings.get('stub', {}))
+        elif name in BACKEND_TYPES:
+            backends[name] = BACKEND_TYPES[name](lambda name=name: get_component(name))
+        else:
+            raise ValueError(f"Unknown generation backend '{name}'")
+    return BackendRouter(backends, settings['order'], settings['max_queue_depth'], settings['deadline'],
+                         settings['probe_interval'])
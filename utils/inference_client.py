@@ -0,0 +1,179 @@
+import ipaddress
+import logging
+import queue
+import threading
+import time
+from multiprocessing.connection import Client, Connection
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+from utils.inference_scheduler import SchedulerBusy, SchedulerTimeout
+from utils.metrics import merge
+
+logger = logging.getLogger(__name__)
+
+# Errors that cross the process boundary with their type preserved
+REMOTE_ERRORS = {
+    'SchedulerBusy': SchedulerBusy,
+    'SchedulerTimeout': SchedulerTimeout,
+}
+
+
+class RemoteError(Exception):
+    """Any other error raised inside the inference server"""
+
+
+def _is_loopback(host: str) -> bool:
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host.strip('[]')).is_loopback
+    except ValueError:
+        return False
+
+
+def parse_address(address: str, allow_remote: bool = False) -> Union[str, Tuple[str, int]]:
+    """``host:port`` becomes a TCP address, anything else is a Unix socket path.
+
+    multiprocessing.connection unpickles what it receives, so TCP hosts other
+    than loopback are refused unless ``allow_remote`` is set.
+    """
+    if ':' in address and not address.startswith('/'):
+        host, port = address.rsplit(':', 1)
+        if not allow_remote and not _is_loopback(host):
+            raise ValueError(f"Inference server address {address} is not a loopback host; use a Unix socket, "
+                             f"127.0.0.1, or set INFERENCE_SERVER_ALLOW_REMOTE=1")
+        return host.strip('[]'), int(port)
+    return address
+
+
+def server_authkey(authkey: Optional[str]) -> bytes:
+    """The configured shared secret as bytes; there is no default, since anyone holding it can run code"""
+    if not authkey:
+        raise ValueError("INFERENCE_SERVER_AUTHKEY must be set to a random secret shared by the inference "
+                         "server and its clients")
+    return authkey.encode('utf-8')
+
+
+def raise_remote(kind: str, message: str) -> None:
+    raise REMOTE_ERRORS.get(kind, RemoteError)(message)
+
+
+class _ConnectionPool:
+    """Reusable connections to the inference server, created on demand up to ``size``"""
+
+    def __init__(self, address, authkey: bytes, size: int, timeout: float):
+        self.address = address
+        self.authkey = authkey
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def acquire(self) -> Connection:
+        if not self._slots.acquire(timeout=self.timeout):
+            raise SchedulerBusy("No free connection to the inference server")
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            try:
+                return Client(self.address, authkey=self.authkey)
+            except Exception:
+                self._slots.release()
+                raise
+
+    def release(self, conn: Connection, reuse: bool = True) -> None:
+        if reuse:
+            self._idle.put(conn)
+        else:
+            try:
+                conn.close()
+            except OSError:
+                pass
+        self._slots.release()
+
+
+class RemoteLLM:
+    """Thin client for a LocalLLM running in ``inference_server.py``.
+
+    Exposes the parts of the LocalLLM interface the web app uses, so every
+    gunicorn worker can share one model process instead of loading its own
+    copy of the GGUF weights, embedder and embeddings.
+    """
+
+    def __init__(self, address: str, authkey: bytes, pool_size: int = 8,
+                 timeout: float = 60.0, connect_timeout: float = 300.0, allow_remote: bool = False):
+        self.address = parse_address(address, allow_remote)
+        self.pool = _ConnectionPool(self.address, authkey, pool_size, timeout)
+
+        # The server may still be loading the model; wait for it to accept connections
+        deadline = time.monotonic() + connect_timeout
+        while True:
+            try:
+                self.startup_timings = self._call('startup_timings')
+                break
+            except (OSError, EOFError) as e:
+                if time.monotonic() > deadline:
+                    raise ConnectionError(f"Inference server at {address} is not reachable: {str(e)}")
+                time.sleep(1.0)
+        logger.info(f"Connected to inference server at {address}")
+
+    def _call(self, method: str, *args, **kwargs) -> Any:
+        conn = self.pool.acquire()
+        reuse = False
+        try:
+            conn.send((method, args, kwargs))
+            status, *payload = conn.recv()
+            reuse = True
+        finally:
+            self.pool.release(conn, reuse)
+        if status == 'error':
+            raise_remote(*payload)
+        result, stages = payload
+        merge(stages)
+        return result
+
+    def get_response(self, message: str, lang: str = 'en', raise_errors: bool = False) -> str:
+        return self._call('get_response', message, lang, raise_errors=raise_errors)
+
+    def is_emergency(self, message: str, language: str) -> bool:
+        return self._call('is_emergency', message, language)
+
+    def stats(self) -> Dict[str, Any]:
+        return self._call('stats')
+
+    def metrics(self) -> str:
+        """The server's metrics in Prometheus text format, with names prefixed by ``inference_``"""
+        return self._call('metrics')
+
+    def known_documents(self) -> Dict[str, str]:
+        return self._call('known_documents')
+
+    def add_documents(self, chunks: List[Dict[str, str]]) -> int:
+        return self._call('add_documents', chunks)
+
+    def remove_documents(self, paths: List[str]) -> int:
+        return self._call('remove_documents', paths)
+
+    def persist_embeddings(self) -> None:
+        return self._call('persist_embeddings')
+
+    def stream_response(self, message: str, lang: str = 'en', raise_errors: bool = False) -> Iterator[str]:
+        conn = self.pool.acquire()
+        finished = False
+        try:
+            conn.send(('stream_response', (message, lang), {'raise_errors': raise_errors}))
+            while True:
+                status, *payload = conn.recv()
+                if status == 'chunk':
+                    text, stages = payload
+                    merge(stages)
+                    yield text
+                elif status == 'done':
+                    finished = True
+                    merge(payload[0])
+                    return
+                else:
+                    finished = True
+                    raise_remote(*payload)
+        finally:
+            # A connection abandoned mid-stream still has unread messages, so it is not reused
+            self.pool.release(conn, finished)
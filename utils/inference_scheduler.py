@@ -0,0 +1,290 @@
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from utils.metrics import merge, record, trace
+
+logger = logging.getLogger(__name__)
+
+# Number of recent wait times kept for percentile metrics
+WAIT_SAMPLES = 1000
+
+_DONE = object()
+
+
+class SchedulerBusy(Exception):
+    """Raised when the queue is full and a request is rejected"""
+
+
+class SchedulerTimeout(Exception):
+    """Raised when a request does not finish within its timeout"""
+
+
+class _Job:
+    def __init__(self, fn: Optional[Callable], args: tuple, kwargs: dict, deadline: float,
+                 item: Any = None, stream: bool = False):
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.item = item
+        self.batchable = fn is None
+        self.stream = stream
+        self.deadline = deadline
+        self.enqueued = time.perf_counter()
+        self.started = None
+        # Stages recorded while the worker runs the job, and the part already merged into the caller's trace
+        self.stages = {}
+        self.merged = {}
+        self.done = threading.Event()
+        self.cancelled = False
+        self.result = None
+        self.error = None
+        self.chunks = deque()
+        self.chunk_ready = threading.Condition()
+
+    def push(self, chunk: Any) -> None:
+        with self.chunk_ready:
+            self.chunks.append(chunk)
+            self.chunk_ready.notify()
+
+
+class InferenceScheduler:
+    """Bounded queue in front of a model that must not be called concurrently.
+
+    Requests are queued and executed by ``max_concurrency`` worker threads.
+    When ``max_queue`` requests are already waiting, new ones are rejected
+    with :class:`SchedulerBusy` instead of piling up threads, and a request
+    that waits or runs longer than its timeout raises :class:`SchedulerTimeout`.
+
+    If ``batch_handler`` is given, items passed to :meth:`run_batched` that
+    arrive within ``batch_wait`` seconds of each other are handed to it
+    together (up to ``max_batch_size``) and decoded in one call.
+    """
+
+    def __init__(self, name: str, max_concurrency: int = 1, max_queue: int = 16, timeout: float = 60.0,
+                 batch_handler: Optional[Callable[[List[Any]], List[Any]]] = None,
+                 max_batch_size: int = 1, batch_wait: float = 0.0):
+        self.name = name
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.batch_handler = batch_handler
+        self.max_batch_size = max(1, max_batch_size)
+        self.batch_wait = batch_wait
+
+        self._queue = deque()
+        self._condition = threading.Condition()
+        self._running = 0
+        self._wait_times = deque(maxlen=WAIT_SAMPLES)
+        self._counters = {'submitted': 0, 'completed': 0, 'failed': 0, 'rejected': 0,
+                          'timed_out': 0, 'batches': 0, 'batched_items': 0}
+        self._max_depth = 0
+
+        for i in range(max(1, max_concurrency)):
+            worker = threading.Thread(target=self._worker, name=f'{name}-scheduler-{i}', daemon=True)
+            worker.start()
+
+    def _enqueue(self, job: _Job) -> _Job:
+        with self._condition:
+            if len(self._queue) >= self.max_queue:
+                self._counters['rejected'] += 1
+                raise SchedulerBusy(f"{self.name} queue is full ({self.max_queue} waiting)")
+            self._queue.append(job)
+            self._counters['submitted'] += 1
+            self._max_depth = max(self._max_depth, len(self._queue))
+            self._condition.notify()
+        return job
+
+    def _deadline(self, timeout: Optional[float]) -> float:
+        return time.perf_counter() + (self.timeout if timeout is None else timeout)
+
+    @staticmethod
+    def _record_wait(job: _Job) -> None:
+        """Report the job's time in the queue as a stage of the caller's request"""
+        if job.started is not None:
+            record('queue_wait', job.started - job.enqueued)
+
+    @staticmethod
+    def _merge_stages(job: _Job) -> None:
+        """Add what the job recorded on the worker since the last call to the caller's trace"""
+        stages = dict(job.stages)
+        merge({stage: seconds - job.merged.get(stage, 0.0) for stage, seconds in stages.items()
+               if seconds != job.merged.get(stage)})
+        job.merged = stages
+
+    def _wait(self, job: _Job) -> Any:
+        if not job.done.wait(max(0.0, job.deadline - time.perf_counter())):
+            job.cancelled = True
+            with self._condition:
+                self._counters['timed_out'] += 1
+            raise SchedulerTimeout(f"{self.name} request timed out")
+        self._record_wait(job)
+        self._merge_stages(job)
+        if job.error is not None:
+            raise job.error
+        return job.result
+
+    def run(self, fn: Callable, *args, timeout: Optional[float] = None, **kwargs) -> Any:
+        """Run ``fn(*args, **kwargs)`` on a worker and return its result"""
+        return self._wait(self._enqueue(_Job(fn, args, kwargs, self._deadline(timeout))))
+
+    def run_batched(self, item: Any, timeout: Optional[float] = None) -> Any:
+        """Hand ``item`` to ``batch_handler``, possibly together with other queued items"""
+        if self.batch_handler is None:
+            raise ValueError(f"{self.name} scheduler has no batch handler")
+        return self._wait(self._enqueue(_Job(None, (), {}, self._deadline(timeout), item=item)))
+
+    def stream(self, fn: Callable[..., Iterator], *args, timeout: Optional[float] = None, **kwargs) -> Iterator:
+        """Run the generator ``fn(*args, **kwargs)`` on a worker and return an iterator over its items.
+
+        The request is queued (or rejected) immediately; the worker slot is
+        held until the generator is exhausted or the caller stops reading.
+        """
+        job = self._enqueue(_Job(fn, args, kwargs, self._deadline(timeout), stream=True))
+        return self._iterate(job)
+
+    def _iterate(self, job: _Job) -> Iterator:
+        waited = False
+        try:
+            while True:
+                with job.chunk_ready:
+                    while not job.chunks:
+                        remaining = job.deadline - time.perf_counter()
+                        if remaining <= 0:
+                            job.cancelled = True
+                            with self._condition:
+                                self._counters['timed_out'] += 1
+                            raise SchedulerTimeout(f"{self.name} request timed out")
+                        job.chunk_ready.wait(remaining)
+                    chunk = job.chunks.popleft()
+                if not waited:
+                    waited = True
+                    self._record_wait(job)
+                self._merge_stages(job)
+                if chunk is _DONE:
+                    if job.error is not None:
+                        raise job.error
+                    return
+                yield chunk
+        finally:
+            # Client went away or timed out: let the worker stop generating
+            job.cancelled = True
+
+    def _next_jobs(self) -> List[_Job]:
+        """Block until work is available and return the next job or batch"""
+        with self._condition:
+            while not self._queue:
+                self._condition.wait()
+            job = self._queue.popleft()
+            if not job.batchable or self.max_batch_size == 1:
+                return [job]
+
+            batch = [job]
+            batch_deadline = time.perf_counter() + self.batch_wait
+            while len(batch) < self.max_batch_size:
+                batch.extend(self._take_batchable(self.max_batch_size - len(batch)))
+                remaining = batch_deadline - time.perf_counter()
+                if len(batch) >= self.max_batch_size or remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            return batch
+
+    def _take_batchable(self, limit: int) -> List[_Job]:
+        taken = [job for job in self._queue if job.batchable][:limit]
+        for job in taken:
+            self._queue.remove(job)
+        return taken
+
+    def _worker(self) -> None:
+        while True:
+            jobs = self._next_jobs()
+            now = time.perf_counter()
+            live = []
+            for job in jobs:
+                if job.cancelled or now > job.deadline:
+                    # Caller already gave up while the request was queued
+                    job.error = SchedulerTimeout(f"{self.name} request expired in queue")
+                    job.done.set()
+                    job.push(_DONE)
+                else:
+                    job.started = now
+                    live.append(job)
+            if not live:
+                continue
+
+            with self._condition:
+                self._running += len(live)
+                self._wait_times.extend(now - job.enqueued for job in live)
+            try:
+                if live[0].batchable:
+                    self._execute_batch(live)
+                else:
+                    self._execute(live[0])
+            finally:
+                with self._condition:
+                    self._running -= len(live)
+
+    def _finish(self, job: _Job, error: Optional[BaseException] = None) -> None:
+        job.error = error
+        with self._condition:
+            self._counters['failed' if error else 'completed'] += 1
+        job.done.set()
+        if job.stream:
+            job.push(_DONE)
+
+    def _execute(self, job: _Job) -> None:
+        try:
+            with trace() as job.stages:
+                self._run(job)
+            self._finish(job)
+        except Exception as e:
+            logger.error(f"{self.name} scheduler job failed: {str(e)}")
+            self._finish(job, e)
+
+    @staticmethod
+    def _run(job: _Job) -> None:
+        if job.stream:
+            for chunk in job.fn(*job.args, **job.kwargs):
+                if job.cancelled:
+                    break
+                job.push(chunk)
+        else:
+            job.result = job.fn(*job.args, **job.kwargs)
+
+    def _execute_batch(self, jobs: List[_Job]) -> None:
+        try:
+            results = self.batch_handler([job.item for job in jobs])
+            with self._condition:
+                self._counters['batches'] += 1
+                self._counters['batched_items'] += len(jobs)
+            for job, result in zip(jobs, results):
+                job.result = result
+                self._finish(job)
+        except Exception as e:
+            logger.error(f"{self.name} batch of {len(jobs)} failed: {str(e)}")
+            for job in jobs:
+                self._finish(job, e)
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._queue)
+
+    def metrics(self) -> Dict[str, Any]:
+        """Queue depth, counters and recent queue wait percentiles"""
+        with self._condition:
+            waits = sorted(self._wait_times)
+            stats = dict(self._counters)
+            stats.update({
+                'name': self.name,
+                'queue_depth': len(self._queue),
+                'max_queue_depth': self._max_depth,
+                'queue_limit': self.max_queue,
+                'running': self._running,
+            })
+
+        def pct(p):
+            return 1000 * waits[min(len(waits) - 1, int(p / 100.0 * len(waits)))] if waits else 0.0
+
+        stats.update({'wait_p50_ms': pct(50), 'wait_p95_ms': pct(95), 'wait_p99_ms': pct(99)})
+        return stats
@@ -0,0 +1,342 @@
+import csv
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+import zipfile
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set
+from xml.etree import ElementTree
+
+logger = logging.getLogger(__name__)
+
+_WORD_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+_SENTENCE_END = re.compile(r'(?<=[.!?।])\s+')
+
+SUPPORTED_EXTENSIONS = ('.docx', '.xlsx', '.xls', '.csv', '.txt')
+
+
+def fingerprint(text: str) -> str:
+    """Content address of a chunk; whitespace differences do not count as changes"""
+    return hashlib.sha256(' '.join(text.split()).encode('utf-8')).hexdigest()
+
+
+def document_hash(path: str) -> str:
+    """Content address of a source file, read in blocks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# Stage 1: read documents one paragraph or row at a time
+
+def iter_docx_paragraphs(path: str) -> Iterator[str]:
+    """Stream paragraph texts from a .docx without loading the whole document tree"""
+    with zipfile.ZipFile(path) as archive, archive.open('word/document.xml') as xml:
+        for event, element in ElementTree.iterparse(xml, events=('end',)):
+            if element.tag == f'{_WORD_NS}p':
+                text = ''.join(node.text or '' for node in element.iter(f'{_WORD_NS}t')).strip()
+                if text:
+                    yield text
+                element.clear()
+
+
+def _row_text(header: List[Any], row: Iterable[Any]) -> str:
+    cells = [(str(h).strip() if h is not None else '', str(v).strip()) for h, v in zip(header, row) if v not in (None, '')]
+    return '; '.join(f"{h}: {v}" if h else v for h, v in cells)
+
+
+def iter_xlsx_rows(path: str) -> Iterator[str]:
+    """Stream rows of every sheet as 'column: value' text using openpyxl's read-only mode"""
+    from openpyxl import load_workbook
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        for sheet in workbook.worksheets:
+            rows = sheet.iter_rows(values_only=True)
+            header = list(next(rows, []))
+            for row in rows:
+                text = _row_text(header, row)
+                if text:
+                    yield text
+    finally:
+        workbook.close()
+
+
+def iter_xls_rows(path: str) -> Iterator[str]:
+    """Legacy .xls files have no streaming reader; read them sheet by sheet with pandas"""
+    import pandas as pd
+    for _, frame in pd.read_excel(path, sheet_name=None).items():
+        header = list(frame.columns)
+        for row in frame.itertuples(index=False):
+            text = _row_text(header, ['' if pd.isna(v) else v for v in row])
+            if text:
+                yield text
+
+
+def iter_csv_rows(path: str) -> Iterator[str]:
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        for row in reader:
+            text = _row_text(header, row)
+            if text:
+                yield text
+
+
+def iter_text_paragraphs(path: str) -> Iterator[str]:
+    """Blank-line separated paragraphs of a plain text file"""
+    paragraph = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                paragraph.append(line.strip())
+            elif paragraph:
+                yield ' '.join(paragraph)
+                paragraph = []
+    if paragraph:
+        yield ' '.join(paragraph)
+
+
+READERS = {
+    '.docx': iter_docx_paragraphs,
+    '.xlsx': iter_xlsx_rows,
+    '.xls': iter_xls_rows,
+    '.csv': iter_csv_rows,
+    '.txt': iter_text_paragraphs,
+}
+
+
+def iter_files(root: str) -> Iterator[str]:
+    """Supported files under ``root`` (or ``root`` itself), in a stable order"""
+    if os.path.isfile(root):
+        yield root
+        return
+    for directory, _, files in sorted(os.walk(root)):
+        for name in sorted(files):
+            if name.lower().endswith(SUPPORTED_EXTENSIONS) and not name.startswith('~$'):
+                yield os.path.join(directory, name)
+
+
+# Stage 2: group paragraphs into retrieval-sized chunks
+
+def _split_long(paragraph: str, max_words: int) -> Iterator[str]:
+    words = paragraph.split()
+    if len(words) <= max_words:
+        yield paragraph
+        return
+    piece = []
+    for sentence in _SENTENCE_END.split(paragraph):
+        sentence_words = sentence.split()
+        if piece and len(piece) + len(sentence_words) > max_words:
+            yield ' '.join(piece)
+            piece = []
+        # A single sentence longer than the limit is cut by words
+        while len(sentence_words) > max_words:
+            yield ' '.join(sentence_words[:max_words])
+            sentence_words = sentence_words[max_words:]
+        piece.extend(sentence_words)
+    if piece:
+        yield ' '.join(piece)
+
+
+def iter_chunks(path: str, max_words: int = 120) -> Iterator[Dict[str, str]]:
+    """Chunks of one file; paragraphs are packed together, spreadsheet rows stay one chunk each"""
+    extension = os.path.splitext(path)[1].lower()
+    records = READERS[extension](path)
+    source = os.path.basename(path)
+    if extension in ('.xlsx', '.xls', '.csv'):
+        for row in records:
+            for text in _split_long(row, max_words):
+                yield {'source': source, 'text': text}
+        return
+
+    buffer, words = [], 0
+    for paragraph in records:
+        for piece in _split_long(paragraph, max_words):
+            piece_words = len(piece.split())
+            if buffer and words + piece_words > max_words:
+                yield {'source': source, 'text': '\n'.join(buffer)}
+                buffer, words = [], 0
+            buffer.append(piece)
+            words += piece_words
+    if buffer:
+        yield {'source': source, 'text': '\n'.join(buffer)}
+
+
+# Stages 3 and 4: skip unchanged documents, embed the chunks of new and edited ones in batches
+
+class IngestionPipeline:
+    """Stream files into a live retrieval index.
+
+    ``target`` is anything with ``known_documents()``,
+    ``add_documents(chunks)`` and ``remove_documents(paths)`` (LocalLLM
+    in-process, or RemoteLLM talking to the inference server); it embeds
+    each batch of chunks and adds them to its index while it keeps serving.
+    Chunks are keyed by the absolute path of their file and the file's
+    content hash: unchanged files are skipped without being read, and the
+    chunks of an edited file replace the ones indexed from its previous
+    version. Files are sent in batches as they are read, so only
+    ``batch_size`` chunks are held in memory; when a file fails half way,
+    the chunks it already sent are removed again so the next run retries it.
+    """
+
+    def __init__(self, target: Any, batch_size: int = 64, max_words: int = 120,
+                 progress: Optional[Callable[[Dict[str, Any]], None]] = None):
+        self.target = target
+        self.batch_size = batch_size
+        self.max_words = max_words
+        self.progress = progress
+
+    def run(self, root: str) -> Dict[str, Any]:
+        start = time.perf_counter()
+        versions = self.target.known_documents()
+        stats = {'files': 0, 'unchanged_files': 0, 'replaced_files': 0, 'failed_files': 0,
+                 'chunks': 0, 'new': 0, 'skipped': 0}
+        batch = []
+        sent = set()
+
+        def flush():
+            if batch:
+                stats['new'] += self.target.add_documents(list(batch))
+                sent.update(chunk['path'] for chunk in batch)
+                batch.clear()
+                if self.progress:
+                    self.progress(dict(stats, seconds=time.perf_counter() - start))
+
+        for path in iter_files(root):
+            stats['files'] += 1
+            key = os.path.abspath(path)
+            chunks = self._read(path, key, versions, stats)
+            while True:
+                # Only reading errors fail the file; errors from the target end the run
+                try:
+                    chunk = next(chunks, None)
+                except Exception as e:
+                    stats['failed_files'] += 1
+                    logger.error(f"Error ingesting {path}: {str(e)}")
+                    batch[:] = [chunk for chunk in batch if chunk['path'] != key]
+                    if key in sent:
+                        stats['new'] -= self.target.remove_documents([key])
+                    break
+                if chunk is None:
+                    break
+                batch.append(chunk)
+                if len(batch) >= self.batch_size:
+                    flush()
+        flush()
+
+        stats['seconds'] = time.perf_counter() - start
+        stats['chunks_per_second'] = stats['chunks'] / stats['seconds'] if stats['seconds'] else 0.0
+        return stats
+
+    def _read(self, path: str, key: str, versions: Dict[str, str], stats: Dict[str, Any]) -> Iterator[Dict[str, str]]:
+        """New chunks of one file, tagged with its path and content hash; nothing if the file is unchanged"""
+        digest = document_hash(path)
+        if versions.get(key) == digest:
+            stats['unchanged_files'] += 1
+            return
+
+        seen = set()
+        for chunk in iter_chunks(path, self.max_words):
+            stats['chunks'] += 1
+            chunk.update(path=key, document_hash=digest, fingerprint=fingerprint(chunk['text']))
+            # Repeated paragraphs (headers, footers) are indexed once per document
+            if chunk['fingerprint'] in seen:
+                stats['skipped'] += 1
+                continue
+            seen.add(chunk['fingerprint'])
+            yield chunk
+
+        if key in versions:
+            stats['replaced_files'] += 1
+        versions[key] = digest
+
+
+def load_chunk_file(path: str) -> List[Dict[str, str]]:
+    """Chunks previously ingested into ``path`` (JSON lines), in insertion order"""
+    chunks = []
+    if not os.path.exists(path):
+        return chunks
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                chunks.append(json.loads(line))
+    return chunks
+
+
+def append_chunk_file(path: str, chunks: Iterable[Dict[str, str]]) -> None:
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'a', encoding='utf-8') as f:
+        for chunk in chunks:
+            f.write(json.dumps(chunk, ensure_ascii=False) + '\n')
+
+
+def chunk_documents(chunks: Iterable[Dict[str, str]]) -> Dict[str, str]:
+    """Content hash of the document each source path was last ingested from"""
+    return {chunk['path']: chunk['document_hash'] for chunk in chunks if chunk.get('path')}
+
+
+def replaced_documents(versions: Dict[str, str], chunks: Iterable[Dict[str, str]]) -> Set[str]:
+    """Paths of ``chunks`` that were ingested before from a different version of their file"""
+    return {chunk['path'] for chunk in chunks
+            if chunk.get('path') in versions and versions[chunk['path']] != chunk['document_hash']}
+
+
+def store_chunks(path: str, chunks: List[Dict[str, str]]) -> int:
+    """Record ``chunks`` in the chunks file, dropping the chunks of earlier versions of their documents.
+
+    Only appends when no document is replaced; otherwise the file is
+    rewritten next to ``path`` and renamed into place. Returns the number of
+    chunks dropped.
+    """
+    existing = load_chunk_file(path)
+    replaced = replaced_documents(chunk_documents(existing), chunks)
+    if not replaced:
+        append_chunk_file(path, chunks)
+        return 0
+    kept = [chunk for chunk in existing if chunk.get('path') not in replaced]
+    _rewrite_chunk_file(path, kept + chunks)
+    return len(existing) - len(kept)
+
+
+def remove_chunks(path: str, paths: Iterable[str]) -> int:
+    """Drop the chunks of the documents at ``paths`` from the chunks file; returns the number dropped"""
+    paths = set(paths)
+    existing = load_chunk_file(path)
+    kept = [chunk for chunk in existing if chunk.get('path') not in paths]
+    if len(kept) < len(existing):
+        _rewrite_chunk_file(path, kept)
+    return len(existing) - len(kept)
+
+
+def _rewrite_chunk_file(path: str, chunks: List[Dict[str, str]]) -> None:
+    """Replace the chunks file with ``chunks``, written next to it and renamed into place"""
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        for chunk in chunks:
+            f.write(json.dumps(chunk, ensure_ascii=False) + '\n')
+    os.replace(tmp_path, path)
+
+
+class ChunkFileTarget:
+    """Ingestion target for when no inference server is running.
+
+    Chunks are only recorded in the chunks file; LocalLLM embeds and indexes
+    them the next time it starts.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def known_documents(self) -> Dict[str, str]:
+        return chunk_documents(load_chunk_file(self.path))
+
+    def add_documents(self, chunks: List[Dict[str, str]]) -> int:
+        store_chunks(self.path, chunks)
+        return len(chunks)
+
+    def remove_documents(self, paths: List[str]) -> int:
+        return remove_chunks(self.path, paths)
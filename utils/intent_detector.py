@@ -0,0 +1,234 @@
+import logging
+import threading
+import unicodedata
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import config
+from utils.knowledge_base import get_knowledge_base
+
+logger = logging.getLogger(__name__)
+
+# Emergency keywords shared by LocalLLM.is_emergency and RAGSystem
+EMERGENCY_KEYWORDS = {
+    'english': ['emergency', 'help', 'danger', 'threat', 'attack', 'robbery', 'theft', 'assault'],
+    'tamil': ['அவசர', 'உதவி', 'ஆபத்து', 'அச்சுறுத்தல்', 'தாக்குதல்', 'கொள்ளை', 'திருட்டு', 'தாக்குதல்']
+}
+
+# Keywords that short-circuit the English chat path to the emergency number
+CHAT_EMERGENCY_KEYWORDS = ['emergency', 'help', 'danger', 'threat', 'attack', 'robbery', 'assault']
+
+# Predefined Tamil chat patterns, checked in this order by TamilChat
+TAMIL_CHAT_PATTERNS = {
+    'case_registration': [
+        'வழக்கு', 'பதிவு', 'செய்வது', 'எப்படி',
+        'வழக்குப் பதிவு', 'வழக்கு பதிவு', 'வழக்கு பதிவு செய்வது',
+        'வழக்குப் பதிவு செய்வது எப்படி'
+    ],
+    'emergency': [
+        'அவசர', 'உதவி', 'ஆபத்து', 'அச்சுறுத்தல்',
+        'தாக்குதல்', 'கொள்ளை', 'திருட்டு'
+    ]
+}
+
+# Knowledge base files whose keyword patterns become intents
+RESPONSE_PATTERN_FILES = ('english_responses', 'tamil_responses')
+
+# Zero-width joiners are part of the grapheme they sit in
+_JOINERS = {'\u200c', '\u200d'}
+
+
+def normalize_text(text: str) -> str:
+    """NFC-normalize and lower-case text before matching"""
+    return unicodedata.normalize('NFC', text).lower()
+
+
+def _continues_grapheme(ch: str) -> bool:
+    """True for vowel signs, the pulli and other marks that extend the previous letter"""
+    return ch in _JOINERS or unicodedata.category(ch) in ('Mn', 'Mc', 'Me')
+
+
+class AhoCorasick:
+    """Multi-pattern substring matcher.
+
+    All patterns are compiled into one automaton, so a search is a single
+    pass over the text regardless of how many patterns there are.
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns = list(patterns)
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[int]] = [[]]
+
+        for pattern_id, pattern in enumerate(self.patterns):
+            state = 0
+            for ch in pattern:
+                next_state = self._goto[state].get(ch)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][ch] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                state = next_state
+            self._output[state].append(pattern_id)
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(ch, 0)
+                self._output[next_state].extend(self._output[self._fail[next_state]])
+
+    def search(self, text: str) -> List[Tuple[int, int, int]]:
+        """Return ``(start, end, pattern_id)`` for every occurrence in ``text``"""
+        matches = []
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for pattern_id in output[state]:
+                matches.append((i + 1 - len(self.patterns[pattern_id]), i + 1, pattern_id))
+        return matches
+
+
+class IntentDetector:
+    """Detect every intent whose keywords occur in a message in one pass.
+
+    Keywords match as substrings (like the ``keyword in message.lower()``
+    checks they replace) but never end in the middle of a Tamil grapheme, so
+    a keyword ending in a bare consonant does not match the same consonant
+    followed by a vowel sign or pulli.
+    """
+
+    def __init__(self, keyword_sets: Optional[Dict[str, Iterable[str]]] = None):
+        self._keyword_sets: Dict[str, List[str]] = {}
+        self.responses: Dict[str, str] = {}
+        self._automaton = None
+        self._pattern_intents: List[List[Tuple[str, str]]] = []
+        for intent, keywords in (keyword_sets or {}).items():
+            self.add(intent, keywords)
+
+    def add(self, intent: str, keywords: Iterable[str]) -> None:
+        """Register keywords for an intent; takes effect on the next compile"""
+        self._keyword_sets.setdefault(intent, []).extend(k for k in keywords if k)
+        self._automaton = None
+
+    @property
+    def intents(self) -> List[str]:
+        return list(self._keyword_sets)
+
+    def compile(self) -> None:
+        """Build the automaton over the keywords of every intent"""
+        pattern_ids: Dict[str, int] = {}
+        pattern_intents: List[List[Tuple[str, str]]] = []
+        for intent, keywords in self._keyword_sets.items():
+            for keyword in keywords:
+                pattern = normalize_text(keyword)
+                if pattern not in pattern_ids:
+                    pattern_ids[pattern] = len(pattern_intents)
+                    pattern_intents.append([])
+                pattern_intents[pattern_ids[pattern]].append((intent, keyword))
+        self._pattern_intents = pattern_intents
+        self._automaton = AhoCorasick(pattern_ids)
+
+    def detect(self, message: str) -> Dict[str, List[str]]:
+        """Return ``{intent: [matched keywords]}`` for every intent found in ``message``"""
+        if self._automaton is None:
+            self.compile()
+        text = normalize_text(message)
+        found: Dict[str, List[str]] = {}
+        for start, end, pattern_id in self._automaton.search(text):
+            if _continues_grapheme(text[start]) or (end < len(text) and _continues_grapheme(text[end])):
+                continue
+            for intent, keyword in self._pattern_intents[pattern_id]:
+                keywords = found.setdefault(intent, [])
+                if keyword not in keywords:
+                    keywords.append(keyword)
+        return found
+
+    def has(self, message: str, intent: str) -> bool:
+        return intent in self.detect(message)
+
+    def pattern_response(self, message: str, source: str = 'english_responses') -> Optional[str]:
+        """Canned response of the first pattern from ``source`` that matches, or None"""
+        found = self.detect(message)
+        for intent in self._keyword_sets:
+            if intent.startswith(f'{source}:') and intent in found and intent in self.responses:
+                return self.responses[intent]
+        return None
+
+
+def _response_patterns() -> Tuple[Dict[str, List[str]], Dict[str, str]]:
+    keyword_sets, responses = {}, {}
+    knowledge_base = get_knowledge_base().snapshot()
+    for name in RESPONSE_PATTERN_FILES:
+        data = knowledge_base.get(name)
+        patterns = data.get('patterns', []) if isinstance(data, dict) else []
+        items = patterns.items() if isinstance(patterns, dict) else enumerate(patterns)
+        for key, pattern in items:
+            if isinstance(pattern, dict) and 'keywords' in pattern:
+                keyword_sets[f'{name}:{key}'] = pattern['keywords']
+                if 'response' in pattern:
+                    responses[f'{name}:{key}'] = pattern['response']
+    return keyword_sets, responses
+
+
+def build_default_detector() -> IntentDetector:
+    """Compile every keyword table used by the chat systems into one detector"""
+    detector = IntentDetector()
+    for language, keywords in EMERGENCY_KEYWORDS.items():
+        detector.add(f'emergency:{language}', keywords)
+    detector.add('emergency:chat', CHAT_EMERGENCY_KEYWORDS)
+    for name, keywords in TAMIL_CHAT_PATTERNS.items():
+        detector.add(f'tamil_chat:{name}', keywords)
+    for name, keywords in config.KIDS_MODE_KEYWORDS.items():
+        detector.add(f'kids:{name}', keywords)
+    keyword_sets, responses = _response_patterns()
+    for intent, keywords in keyword_sets.items():
+        detector.add(intent, keywords)
+    detector.responses.update(responses)
+    detector.compile()
+    logger.info(f"Intent detector compiled {len(detector.intents)} intents")
+    return detector
+
+
+_default_detector = None
+_default_lock = threading.Lock()
+
+
+def get_detector() -> IntentDetector:
+    """Return the process-wide detector, compiling it on first use"""
+    global _default_detector
+    if _default_detector is None:
+        with _default_lock:
+            if _default_detector is None:
+                _default_detector = build_default_detector()
+                get_knowledge_base().subscribe(_reload_detector)
+    return _default_detector
+
+
+def _reload_detector(knowledge_base: Dict, changed: List[str]) -> None:
+    """Recompile the detector when a response pattern file is edited and swap it in"""
+    global _default_detector
+    if set(changed) & set(RESPONSE_PATTERN_FILES):
+        _default_detector = build_default_detector()
+
+
+def quick_response(message: str) -> Optional[str]:
+    """Canned English answer for greetings and emergencies, or None"""
+    if message.lower() in ["hello", "hi", "greetings"]:
+        return "Hello! I am the Tamil Nadu Police Help Assistant. How can I assist you today?"
+    
+    # Check for emergency keywords in English
+    if get_detector().has(message, 'emergency:chat'):
+        return "For emergency help, immediately call 100. We will help you."
+    
+    return None
@@ -0,0 +1,165 @@
+import json
+import logging
+import mmap
+import os
+import struct
+import time
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Bump when the layout changes; snapshots of another version are ignored and the JSON files are used
+SNAPSHOT_VERSION = 1
+
+_MAGIC = b'PKBSNAP\0'
+# Magic, format version, header offset, header length
+_PROLOGUE = struct.Struct('<8sIQQ')
+# Payloads start on 64-byte boundaries so the embedding matrix can be mapped in place
+_ALIGNMENT = 64
+
+Signature = Optional[Tuple[int, int]]
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def file_signature(path: str) -> Signature:
+    """Modification time and size of ``path``, or None if it does not exist"""
+    try:
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+    except OSError:
+        return None
+
+
+def _encode_json(data: Any) -> bytes:
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def write_snapshot(path: str, files: Dict[str, str], data: Dict[str, Any], signatures: Dict[str, Signature],
+                   documents: Sequence[str], languages: Sequence[str], embeddings: np.ndarray,
+                   model_name: str, chunks_signature: Signature) -> Dict[str, Any]:
+    """Write the knowledge base and its retrieval corpus to one binary file and return the header.
+
+    Layout: a fixed prologue pointing at a JSON header, then one payload per
+    knowledge base file (compact UTF-8 JSON), the document texts (one UTF-8
+    blob plus an int64 offset table), the document languages and the float32
+    embedding matrix. The header records where each payload lives and the
+    signature of every source file, so a reader can tell which parts are
+    still current. The file is written next to ``path`` and renamed into
+    place, so running processes keep their mapping of the previous snapshot.
+    """
+    header: Dict[str, Any] = {'version': SNAPSHOT_VERSION, 'created': time.time(), 'files': {}}
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(tmp_path, 'wb') as f:
+        f.write(b'\0' * _PROLOGUE.size)
+
+        def payload(blob: bytes) -> Dict[str, int]:
+            f.write(b'\0' * (-f.tell() % _ALIGNMENT))
+            offset = f.tell()
+            f.write(blob)
+            return {'offset': offset, 'length': len(blob)}
+
+        for name, source in files.items():
+            if name in data:
+                header['files'][name] = dict(payload(_encode_json(data[name])), path=source,
+                                             signature=signatures.get(name))
+
+        texts = [document.encode('utf-8') for document in documents]
+        offsets = np.zeros(len(texts) + 1, dtype=np.int64)
+        np.cumsum([len(text) for text in texts], out=offsets[1:])
+        language_names = sorted(set(languages))
+        language_codes = np.array([language_names.index(language) for language in languages], dtype=np.uint8)
+        matrix = np.ascontiguousarray(embeddings, dtype=np.float32)
+        header['corpus'] = {
+            'count': len(texts),
+            'texts': payload(b''.join(texts)),
+            'offsets': payload(offsets.tobytes()),
+            'languages': dict(payload(language_codes.tobytes()), names=language_names),
+            'embeddings': dict(payload(matrix.tobytes()), shape=list(matrix.shape), model=model_name),
+            'chunks_signature': chunks_signature
+        }
+
+        f.write(b'\0' * (-f.tell() % _ALIGNMENT))
+        header_blob = _encode_json(header)
+        header_offset = f.tell()
+        f.write(header_blob)
+        f.seek(0)
+        f.write(_PROLOGUE.pack(_MAGIC, SNAPSHOT_VERSION, header_offset, len(header_blob)))
+    os.replace(tmp_path, path)
+    return header
+
+
+def _signature_value(signature: Signature) -> Optional[List[int]]:
+    return list(signature) if signature is not None else None
+
+
+class KnowledgeBaseSnapshot:
+    """Read-only view of a snapshot written by ``write_snapshot``.
+
+    The file is memory-mapped; knowledge base files are only decoded when
+    ``load_file`` is called, and the embedding matrix is a NumPy view of the
+    mapping, so worker processes share its pages instead of each holding a
+    copy.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._map) < _PROLOGUE.size:
+            raise SnapshotError(f"{path} is truncated")
+        magic, version, header_offset, header_length = _PROLOGUE.unpack_from(self._map)
+        if magic != _MAGIC:
+            raise SnapshotError(f"{path} is not a knowledge base snapshot")
+        if version != SNAPSHOT_VERSION:
+            raise SnapshotError(f"{path} has format version {version}, expected {SNAPSHOT_VERSION}")
+        self.header = json.loads(self._map[header_offset:header_offset + header_length])
+
+    @classmethod
+    def open(cls, path: Optional[str]) -> Optional['KnowledgeBaseSnapshot']:
+        """The snapshot at ``path``, or None if there is none or it cannot be read"""
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            return cls(path)
+        except Exception as e:
+            logger.warning(f"Ignoring knowledge base snapshot {path}: {str(e)}")
+            return None
+
+    def _bytes(self, entry: Dict[str, int]) -> bytes:
+        return self._map[entry['offset']:entry['offset'] + entry['length']]
+
+    def current_files(self, files: Dict[str, str], signatures: Dict[str, Signature]) -> Set[str]:
+        """Names of ``files`` whose snapshot entry was compiled from the same path and file version"""
+        current = set()
+        for name, path in files.items():
+            entry = self.header['files'].get(name)
+            if (entry and entry['path'] == path and signatures.get(name) is not None
+                    and entry['signature'] == _signature_value(signatures[name])):
+                current.add(name)
+        return current
+
+    def load_file(self, name: str) -> Any:
+        """Decode one knowledge base file"""
+        return json.loads(self._bytes(self.header['files'][name]))
+
+    def corpus(self, model_name: str, chunks_signature: Signature) -> Optional[Tuple[List[str], List[str], np.ndarray]]:
+        """``(documents, languages, embeddings)`` if they were compiled with this model and chunk file"""
+        corpus = self.header.get('corpus')
+        if (not corpus or corpus['embeddings']['model'] != model_name
+                or corpus['chunks_signature'] != _signature_value(chunks_signature)):
+            return None
+        texts = self._bytes(corpus['texts'])
+        offsets = np.frombuffer(self._bytes(corpus['offsets']), dtype=np.int64).tolist()
+        documents = [texts[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(corpus['count'])]
+        names = corpus['languages']['names']
+        languages = [names[code] for code in self._bytes(corpus['languages'])]
+        entry = corpus['embeddings']
+        embeddings = np.frombuffer(self._map, dtype=np.float32, count=entry['length'] // 4,
+                                   offset=entry['offset']).reshape(entry['shape'])
+        return documents, languages, embeddings
@@ -0,0 +1,185 @@
+import json
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Optional
+
+import config
+from utils.kb_snapshot import KnowledgeBaseSnapshot, file_signature
+
+logger = logging.getLogger(__name__)
+
+# Knowledge base files under static/data, parsed once per process and shared by every chat component
+KNOWLEDGE_BASE_FILES = {
+    'emergency_contacts': 'static/data/emergency_contacts.json',
+    'departments': 'static/data/departments.json',
+    'common_queries': 'static/data/common_queries.json',
+    'kids_safety': 'static/data/kids_safety.json',
+    'fir_info': 'static/data/fir_info.json',
+    'english_responses': 'static/data/english_responses.json',
+    'tamil_responses': 'static/data/tamil_responses.json',
+    'tamil_qa': 'static/data/tamil_qa.json',
+    'stations': 'static/data/stations.json'
+}
+
+Listener = Callable[[Mapping[str, Any], List[str]], None]
+
+
+class _Files(Mapping):
+    """File name to parsed JSON; files taken from a compiled snapshot are decoded on first access"""
+
+    def __init__(self, parsed: Dict[str, Any], snapshot: Optional[KnowledgeBaseSnapshot] = None,
+                 compiled: frozenset = frozenset()):
+        self._parsed = parsed
+        self._snapshot = snapshot
+        self._compiled = compiled
+
+    def __getitem__(self, name: str) -> Any:
+        try:
+            return self._parsed[name]
+        except KeyError:
+            if name not in self._compiled:
+                raise
+        # Decoding twice in a race is harmless; both results are equal
+        data = self._parsed[name] = self._snapshot.load_file(name)
+        return data
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self._parsed
+        yield from (name for name in self._compiled if name not in self._parsed)
+
+    def __len__(self) -> int:
+        return len(self._compiled | set(self._parsed))
+
+    def replace(self, changed: Dict[str, Any]) -> '_Files':
+        """A new mapping with ``changed`` files swapped in; undecoded files stay lazy"""
+        return _Files({**self._parsed, **changed}, self._snapshot, self._compiled - set(changed))
+
+
+class KnowledgeBase:
+    """Parsed knowledge base files with hot reload.
+
+    ``snapshot()`` returns a mapping of file name to parsed JSON. Snapshots are
+    never mutated: a reload builds a new dict and swaps it in, so a request
+    that took a snapshot keeps a consistent view. ``check()`` compares file
+    modification times, re-parses only the files that changed and then calls
+    the listeners registered with ``subscribe`` so they can rebuild their
+    derived data (embeddings, lookup tables) and swap it in the same way.
+    A file that fails to parse keeps its previous contents.
+
+    With ``snapshot_path`` pointing at a snapshot built by
+    compile_knowledge_base.py, files that have not changed since it was
+    compiled are decoded from it lazily instead of being parsed at startup.
+    """
+
+    def __init__(self, files: Dict[str, str] = KNOWLEDGE_BASE_FILES, check_interval: float = 5.0,
+                 snapshot_path: Optional[str] = None):
+        self.files = dict(files)
+        self.check_interval = check_interval
+        self.version = 0
+        self.stats = {'reloads': 0, 'errors': 0, 'last_reload_s': 0.0, 'last_changed': []}
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._watcher = None
+
+        self._signatures = {name: file_signature(path) for name, path in self.files.items()}
+        self.compiled = KnowledgeBaseSnapshot.open(snapshot_path)
+        self.compiled_files = frozenset(self.compiled.current_files(self.files, self._signatures)
+                                        if self.compiled else ())
+        parsed = {}
+        for name, path in self.files.items():
+            if name not in self.compiled_files:
+                data = self._parse(path)
+                parsed[name] = data if data is not None else {}
+        self._data = _Files(parsed, self.compiled, self.compiled_files)
+        if self.compiled:
+            logger.info(f"Using knowledge base snapshot {snapshot_path} for {len(self.compiled_files)} "
+                        f"of {len(self.files)} files")
+
+    @property
+    def signatures(self) -> Dict[str, Any]:
+        """Modification time and size of each file as last loaded"""
+        return dict(self._signatures)
+
+    def _parse(self, path: str) -> Optional[Any]:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            self.stats['errors'] += 1
+            logger.error(f"Error loading knowledge base file {path}: {str(e)}")
+            return None
+
+    def snapshot(self) -> Mapping[str, Any]:
+        """The current parsed files; treat the result as read-only"""
+        return self._data
+
+    def get(self, name: str, default: Any = None) -> Any:
+        return self._data.get(name, default)
+
+    def subscribe(self, listener: Listener) -> None:
+        """Call ``listener(snapshot, changed_names)`` after every reload"""
+        self._listeners.append(listener)
+
+    def check(self) -> List[str]:
+        """Reload the files changed on disk since the last check and return their names"""
+        with self._lock:
+            start = time.perf_counter()
+            changed = {}
+            for name, path in self.files.items():
+                signature = file_signature(path)
+                if signature == self._signatures[name]:
+                    continue
+                self._signatures[name] = signature
+                data = self._parse(path)
+                if data is not None:
+                    changed[name] = data
+            if not changed:
+                return []
+
+            self._data = self._data.replace(changed)
+            self.version += 1
+            names = sorted(changed)
+            for listener in list(self._listeners):
+                try:
+                    listener(self._data, names)
+                except Exception as e:
+                    self.stats['errors'] += 1
+                    logger.error(f"Error applying knowledge base reload: {str(e)}")
+
+            seconds = time.perf_counter() - start
+            self.stats.update(reloads=self.stats['reloads'] + 1, last_reload_s=seconds, last_changed=names)
+            logger.info(f"Reloaded knowledge base files {', '.join(names)} in {seconds:.2f}s")
+            return names
+
+    def start_watching(self) -> None:
+        """Poll for changes every ``check_interval`` seconds in a daemon thread"""
+        if self._watcher is not None or self.check_interval <= 0:
+            return
+
+        def watch():
+            while True:
+                time.sleep(self.check_interval)
+                try:
+                    self.check()
+                except Exception as e:
+                    logger.error(f"Error checking knowledge base files: {str(e)}")
+
+        self._watcher = threading.Thread(target=watch, name='knowledge-base-watcher', daemon=True)
+        self._watcher.start()
+
+
+_default_knowledge_base = None
+_default_lock = threading.Lock()
+
+
+def get_knowledge_base() -> KnowledgeBase:
+    """Return the process-wide knowledge base, loading it and starting the watcher on first use"""
+    global _default_knowledge_base
+    if _default_knowledge_base is None:
+        with _default_lock:
+            if _default_knowledge_base is None:
+                knowledge_base = KnowledgeBase(**config.KNOWLEDGE_BASE_SETTINGS)
+                knowledge_base.start_watching()
+                _default_knowledge_base = knowledge_base
+    return _default_knowledge_base
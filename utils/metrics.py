@@ -0,0 +1,185 @@
+import bisect
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Latency buckets in seconds, from sub-millisecond lookups to long generations
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+def _label_text(names: Sequence[str], values: Tuple[str, ...], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Counter:
+    """Monotonic counter, optionally split by labels"""
+
+    kind = 'counter'
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = tuple(str(labels.get(name, '')) for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        return [f'{self.name}{_label_text(self.labels, key)} {value:g}' for key, value in sorted(values.items())]
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus exposition format"""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], List] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(str(labels.get(name, '')) for name in self.labels)
+        position = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # Per-bucket counts (last one is +Inf), sum
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][position] += 1
+            series[1] += value
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            series = {key: (list(counts), total) for key, (counts, total) in self._series.items()}
+        lines = []
+        for key, (counts, total) in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float('inf') else f'le="{bound:g}"'
+                lines.append(f'{self.name}_bucket{_label_text(self.labels, key, le)} {cumulative}')
+            lines.append(f'{self.name}_sum{_label_text(self.labels, key)} {total:.6f}')
+            lines.append(f'{self.name}_count{_label_text(self.labels, key)} {cumulative}')
+        return lines
+
+
+class MetricsRegistry:
+    """Named counters and histograms rendered together for ``/metrics``"""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            return metric
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, help, labels)
+
+    def histogram(self, name: str, help: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, help, labels, buckets)
+
+    def render(self, prefix: str = '') -> str:
+        """All metrics in the Prometheus text exposition format.
+
+        ``prefix`` is prepended to every metric name, so another process's
+        metrics can be appended to this one's without clashing.
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f'# HELP {prefix}{metric.name} {metric.help}')
+            lines.append(f'# TYPE {prefix}{metric.name} {metric.kind}')
+            lines.extend(prefix + sample for sample in metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+# Stages: intent_check, cache_lookup, embedding, retrieval, prompt_build, queue_wait, prompt_eval, generation,
+# post_processing and tamil_chat
+STAGE_SECONDS = registry.histogram('chat_stage_seconds', "Time spent in each stage of the chat hot path", ['stage'])
+
+_trace = threading.local()
+
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    """Time a block as one stage of the current request"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - start)
+
+
+def record(stage: str, seconds: float) -> None:
+    """Add an already measured stage duration to the histograms and the current trace"""
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    stages = getattr(_trace, 'stages', None)
+    if stages is not None:
+        stages[stage] = stages.get(stage, 0.0) + seconds
+
+
+@contextmanager
+def trace(into: Optional[Dict[str, float]] = None) -> Iterator[Dict[str, float]]:
+    """Collect the stages recorded on this thread into a dict, e.g. for a per-request log line.
+
+    Traces nest: an enclosing trace also receives the inner trace's stages.
+    ``into`` also receives them, so one dict can gather the steps of a
+    stream that are run on different threads.
+    """
+    previous = getattr(_trace, 'stages', None)
+    stages = _trace.stages = {}
+    try:
+        yield stages
+    finally:
+        _trace.stages = previous
+        for target in (previous, into):
+            if target is not None:
+                _add(target, stages)
+
+
+def merge(stages: Dict[str, float]) -> None:
+    """Add stages measured elsewhere, on a worker thread or in the inference server, to the current trace.
+
+    They are not observed again: the histograms were updated where they were measured.
+    """
+    current = getattr(_trace, 'stages', None)
+    if current is not None:
+        _add(current, stages)
+
+
+def _add(target: Dict[str, float], stages: Dict[str, float]) -> None:
+    for stage, seconds in stages.items():
+        target[stage] = target.get(stage, 0.0) + seconds
+
+
+def format_stages(stages: Dict[str, float]) -> str:
+    return ', '.join(f"{stage} {1000 * seconds:.1f} ms" for stage, seconds in stages.items())
@@ -0,0 +1,122 @@
+import logging
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+import config
+from utils.knowledge_base import get_knowledge_base
+
+logger = logging.getLogger(__name__)
+
+# Mean Earth radius used for distances
+EARTH_RADIUS_KM = 6371.0088
+
+# Service types served by /nearby/api, in response order
+SERVICE_TYPES = ('police', 'women_help_desk', 'hospital', 'fire_station')
+
+
+def to_unit_vectors(lat, lon) -> np.ndarray:
+    """Points on the unit sphere for latitudes and longitudes in degrees, shape (n, 3).
+
+    Straight-line (chord) distance between these points grows with the
+    great-circle distance, so a Euclidean KD-tree finds geographic neighbours
+    without any special handling near the poles or the antimeridian.
+    """
+    lat = np.radians(np.asarray(lat, dtype=np.float64))
+    lon = np.radians(np.asarray(lon, dtype=np.float64))
+    cos_lat = np.cos(lat)
+    return np.column_stack((cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)))
+
+
+def chord_to_km(chord):
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(np.asarray(chord) / 2, 1.0))
+
+
+def km_to_chord(km: float) -> float:
+    return float(2 * np.sin(min(km / EARTH_RADIUS_KM, np.pi) / 2))
+
+
+def load_places(knowledge_base: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Places of a known service type with valid coordinates from the stations file"""
+    places = []
+    for place in (knowledge_base.get('stations') or {}).get('places', []):
+        try:
+            lat, lon = float(place['lat']), float(place['lon'])
+        except (KeyError, TypeError, ValueError):
+            logger.warning(f"Skipping place without coordinates: {place.get('name')}")
+            continue
+        if place.get('type') in SERVICE_TYPES and -90 <= lat <= 90 and -180 <= lon <= 180:
+            places.append(dict(place, lat=lat, lon=lon))
+    return places
+
+
+class NearbyIndex:
+    """k-nearest places of each service type, from one KD-tree per type.
+
+    Coordinates are mapped onto the unit sphere (see ``to_unit_vectors``) and
+    indexed with scipy's cKDTree, so a lookup is a few tree descents instead
+    of a scan of every place or a call to an external places API.
+    """
+
+    def __init__(self, places: Sequence[Dict[str, Any]]):
+        self.places: Dict[str, List[Dict[str, Any]]] = {}
+        self.trees: Dict[str, cKDTree] = {}
+        for service_type in SERVICE_TYPES:
+            typed = [place for place in places if place['type'] == service_type]
+            if typed:
+                self.places[service_type] = typed
+                self.trees[service_type] = cKDTree(to_unit_vectors([p['lat'] for p in typed],
+                                                                   [p['lon'] for p in typed]))
+
+    def __len__(self) -> int:
+        return sum(len(places) for places in self.places.values())
+
+    def nearest(self, lat: float, lon: float, k: int = 5, types: Optional[Iterable[str]] = None,
+                max_distance_km: Optional[float] = None) -> Dict[str, List[Dict[str, Any]]]:
+        """The ``k`` nearest places of each requested type, closest first, with ``distance_km``"""
+        point = to_unit_vectors(lat, lon)[0]
+        bound = km_to_chord(max_distance_km) if max_distance_km else np.inf
+        results = {}
+        for service_type in types or SERVICE_TYPES:
+            tree = self.trees.get(service_type)
+            if tree is None:
+                results[service_type] = []
+                continue
+            chords, indices = tree.query(point, k=min(k, tree.n), distance_upper_bound=bound)
+            chords, indices = np.atleast_1d(chords), np.atleast_1d(indices)
+            found = indices < tree.n  # Misses beyond the distance bound come back as index n
+            results[service_type] = [
+                dict(self.places[service_type][i], distance_km=round(float(km), 3))
+                for i, km in zip(indices[found], chord_to_km(chords[found]))
+            ]
+        return results
+
+    def stats(self) -> Dict[str, int]:
+        return {service_type: len(places) for service_type, places in self.places.items()}
+
+
+_default_index = None
+_default_lock = threading.Lock()
+
+
+def _reload_places(knowledge_base: Dict[str, Any], changed: List[str]) -> None:
+    """Swap in a rebuilt index when the stations file is edited"""
+    global _default_index
+    if 'stations' in changed:
+        _default_index = NearbyIndex(load_places(knowledge_base))
+        logger.info(f"Reloaded nearby index: {len(_default_index)} places")
+
+
+def get_nearby_index() -> NearbyIndex:
+    """Return the process-wide index of the stations file, building it on first use"""
+    global _default_index
+    if _default_index is None:
+        with _default_lock:
+            if _default_index is None:
+                knowledge_base = get_knowledge_base()
+                _default_index = NearbyIndex(load_places(knowledge_base.snapshot()))
+                knowledge_base.subscribe(_reload_places)
+                logger.info(f"Nearby index built over {len(_default_index)} places")
+    return _default_index
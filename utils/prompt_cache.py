@@ -0,0 +1,86 @@
+import logging
+import time
+from collections import deque
+from typing import Any, Dict, List, Sequence
+
+logger = logging.getLogger(__name__)
+
+# Number of recent requests kept for prompt-eval statistics
+SAMPLES = 1000
+
+
+def common_prefix_length(a: Sequence[int], b: Sequence[int]) -> int:
+    n = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        n += 1
+    return n
+
+
+class PromptPrefixCache:
+    """Evaluate a fixed prompt preamble once and reuse its llama.cpp KV state.
+
+    The preamble is evaluated at startup and snapshotted with
+    ``Llama.save_state()``. Before each generation, :meth:`prepare` checks
+    that the model's cached tokens still start with the preamble and
+    restores the snapshot only if they do not, so llama.cpp's own prefix
+    matching evaluates just the variable suffix of each prompt. With
+    ``enabled=False`` the context is reset and every prompt is evaluated in
+    full, which is useful as a baseline.
+
+    Must be called from the thread that owns the model (the scheduler worker).
+    """
+
+    def __init__(self, llm: Any, prefix: str, enabled: bool = True):
+        self.llm = llm
+        self.enabled = enabled
+        self.prefix_tokens = self._tokenize(prefix)
+        self.state = None
+        self._eval_seconds = deque(maxlen=SAMPLES)
+        self._stats = {'requests': 0, 'restores': 0, 'reused_tokens': 0, 'evaluated_tokens': 0}
+
+        if enabled:
+            start = time.perf_counter()
+            llm.reset()
+            llm.eval(self.prefix_tokens)
+            self.state = llm.save_state()
+            logger.info(f"Cached KV state for a {len(self.prefix_tokens)}-token prompt preamble "
+                        f"in {time.perf_counter() - start:.2f}s")
+
+    def _tokenize(self, text: str) -> List[int]:
+        # Same tokenization llama.cpp applies to completion prompts
+        return self.llm.tokenize(text.encode('utf-8'), special=True)
+
+    def prepare(self, prompt: str) -> int:
+        """Get the KV cache ready for ``prompt``; returns the number of tokens left to evaluate"""
+        tokens = self._tokenize(prompt)
+        if not self.enabled:
+            self.llm.reset()
+        else:
+            cached = list(self.llm._input_ids)
+            if common_prefix_length(cached, self.prefix_tokens) < len(self.prefix_tokens):
+                self.llm.load_state(self.state)
+                self._stats['restores'] += 1
+
+        reused = common_prefix_length(list(self.llm._input_ids), tokens)
+        evaluated = len(tokens) - reused
+        self._stats['requests'] += 1
+        self._stats['reused_tokens'] += reused
+        self._stats['evaluated_tokens'] += evaluated
+        return evaluated
+
+    def record(self, prompt_tokens: int, seconds: float) -> None:
+        """Record the prompt-eval time (start of generation to first token) of a request"""
+        self._eval_seconds.append(seconds)
+        logger.debug(f"Prompt eval: {prompt_tokens} tokens in {1000 * seconds:.0f} ms "
+                    f"(prefix cache {'on' if self.enabled else 'off'})")
+
+    def stats(self) -> Dict[str, Any]:
+        samples = sorted(self._eval_seconds)
+        stats = dict(self._stats)
+        stats['enabled'] = self.enabled
+        stats['prefix_tokens'] = len(self.prefix_tokens)
+        stats['prompt_eval_p50_ms'] = 1000 * samples[len(samples) // 2] if samples else 0.0
+        stats['prompt_eval_mean_ms'] = 1000 * sum(samples) / len(samples) if samples else 0.0
+        return stats
@@ -0,0 +1,88 @@
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List
+
+import numpy as np
+
+from utils.inference_scheduler import InferenceScheduler
+
+logger = logging.getLogger(__name__)
+
+
+class QueryEmbedder:
+    """Query embeddings through an LRU cache and a micro-batching queue.
+
+    A repeated query is answered from the cache without touching the model.
+    Other queries wait up to ``batch_wait`` seconds for company and are
+    encoded together, up to ``max_batch_size`` per ``encode`` call, so
+    concurrent requests share one forward pass instead of paying the Python
+    and Torch dispatch overhead each. A query with no other query in flight
+    is encoded straight away, so batching adds no latency at low load.
+    """
+
+    def __init__(self, embedder, max_batch_size: int = 32, batch_wait: float = 0.002, cache_size: int = 4096,
+                 max_queue: int = 1024, timeout: float = 10.0):
+        self.embedder = embedder
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'direct': 0}
+        self._in_flight = 0
+        self.scheduler = InferenceScheduler('embedder', max_queue=max_queue, timeout=timeout,
+                                            batch_handler=self._encode_batch,
+                                            max_batch_size=max_batch_size, batch_wait=batch_wait)
+
+    def _encode_batch(self, queries: List[str]) -> List[np.ndarray]:
+        # Identical queries in the same batch are encoded once
+        unique = list(dict.fromkeys(queries))
+        matrix = self.embedder.encode(unique, batch_size=len(unique), normalize_embeddings=True)
+        rows = dict(zip(unique, matrix))
+        return [rows[query] for query in queries]
+
+    def encode(self, query: str) -> np.ndarray:
+        """Encode a query as a (1, dim) unit-length embedding"""
+        with self._lock:
+            vector = self._cache.get(query)
+            if vector is not None:
+                self._cache.move_to_end(query)
+                self._stats['hits'] += 1
+                return vector[np.newaxis]
+            self._stats['misses'] += 1
+            self._in_flight += 1
+            alone = self._in_flight == 1
+            if alone:
+                self._stats['direct'] += 1
+
+        try:
+            if alone:
+                vector = self._encode_batch([query])[0]
+            else:
+                vector = self.scheduler.run_batched(query)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+        vector = np.asarray(vector, dtype=np.float32)
+        # Cached vectors are shared between requests, so nobody may modify them
+        vector.flags.writeable = False
+        if self.cache_size > 0:
+            with self._lock:
+                self._cache[query] = vector
+                self._cache.move_to_end(query)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return vector[np.newaxis]
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache hit rate plus batch sizes and queue waits of encoded queries"""
+        with self._lock:
+            stats = dict(self._stats, entries=len(self._cache))
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        scheduler = self.scheduler.metrics()
+        stats['batches'] = scheduler['batches']
+        stats['mean_batch_size'] = scheduler['batched_items'] / scheduler['batches'] if scheduler['batches'] else 0.0
+        stats['queue_wait_p50_ms'] = scheduler['wait_p50_ms']
+        stats['queue_wait_p95_ms'] = scheduler['wait_p95_ms']
+        return stats
@@ -0,0 +1,146 @@
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_PUNCTUATION = re.compile(r'[^\w\s]+', re.UNICODE)
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_query(text: str) -> str:
+    """Lower-case a query and drop punctuation and repeated whitespace"""
+    text = _PUNCTUATION.sub(' ', text.lower())
+    return _WHITESPACE.sub(' ', text).strip()
+
+
+class _Entry:
+    __slots__ = ('response', 'created', 'cost')
+
+    def __init__(self, response: str, cost: float):
+        self.response = response
+        self.created = time.monotonic()
+        self.cost = cost
+
+
+class ResponseCache:
+    """Two-tier cache of generated answers.
+
+    The first tier is keyed by the normalized query text. The second tier
+    keeps the (unit-length) query embeddings of cached answers and serves a
+    new query whose embedding is at least ``similarity_threshold`` similar to
+    one of them. Both tiers are LRU-bounded to ``max_entries`` with a TTL.
+    Call ``clear`` when the answers may be stale, e.g. from a retriever
+    listener after the knowledge base changes.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 24 * 60 * 60,
+                 similarity_threshold: float = 0.95):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+
+        self._lock = threading.Lock()
+        self._exact = OrderedDict()
+        self._semantic = OrderedDict()
+        self._matrix = None
+        self._matrix_keys = []
+        self._stats = {'exact_hits': 0, 'semantic_hits': 0, 'misses': 0, 'invalidations': 0,
+                       'saved_seconds': 0.0, 'hit_seconds': 0.0}
+
+    def clear(self) -> None:
+        """Drop every cached answer"""
+        with self._lock:
+            self._exact.clear()
+            self._semantic.clear()
+            self._matrix = None
+            self._matrix_keys = []
+            self._stats['invalidations'] += 1
+        logger.info("Response cache cleared")
+
+    def _expired(self, entry: _Entry) -> bool:
+        return time.monotonic() - entry.created > self.ttl
+
+    def _hit(self, kind: str, entry: _Entry, start: float) -> str:
+        self._stats[f'{kind}_hits'] += 1
+        self._stats['saved_seconds'] += entry.cost
+        self._stats['hit_seconds'] += time.perf_counter() - start
+        return entry.response
+
+    def get_exact(self, query: str) -> Optional[str]:
+        """Return the cached answer for this exact (normalized) query, or None"""
+        start = time.perf_counter()
+        key = normalize_query(query)
+        with self._lock:
+            entry = self._exact.get(key)
+            if entry is None or self._expired(entry):
+                if entry is not None:
+                    del self._exact[key]
+                return None
+            self._exact.move_to_end(key)
+            return self._hit('exact', entry, start)
+
+    def get_similar(self, query_embedding: np.ndarray) -> Optional[str]:
+        """Return the answer cached for the most similar earlier query, or None.
+
+        ``query_embedding`` must be unit length, as used for retrieval.
+        """
+        start = time.perf_counter()
+        with self._lock:
+            if self._semantic and self._matrix is None:
+                self._matrix_keys = list(self._semantic.keys())
+                self._matrix = np.stack([self._semantic[k][0] for k in self._matrix_keys])
+            if self._matrix is None:
+                self._stats['misses'] += 1
+                return None
+
+            scores = self._matrix @ np.asarray(query_embedding, dtype=np.float32).reshape(-1)
+            best = int(np.argmax(scores))
+            key = self._matrix_keys[best]
+            if scores[best] < self.similarity_threshold or key not in self._semantic:
+                self._stats['misses'] += 1
+                return None
+            entry = self._semantic[key][1]
+            if self._expired(entry):
+                del self._semantic[key]
+                self._matrix = None
+                self._stats['misses'] += 1
+                return None
+            self._semantic.move_to_end(key)
+            return self._hit('semantic', entry, start)
+
+    def put(self, query: str, query_embedding: Optional[np.ndarray], response: str, cost: float = 0.0) -> None:
+        """Cache ``response``; ``cost`` is the generation time it saves on a hit"""
+        key = normalize_query(query)
+        entry = _Entry(response, cost)
+        with self._lock:
+            self._exact[key] = entry
+            self._exact.move_to_end(key)
+            while len(self._exact) > self.max_entries:
+                self._exact.popitem(last=False)
+
+            if query_embedding is not None:
+                vector = np.asarray(query_embedding, dtype=np.float32).reshape(-1)
+                self._semantic[key] = (vector, entry)
+                self._semantic.move_to_end(key)
+                while len(self._semantic) > self.max_entries:
+                    self._semantic.popitem(last=False)
+                # Rebuilt lazily on the next lookup
+                self._matrix = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit rate, entry counts and time saved"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['exact_entries'] = len(self._exact)
+            stats['semantic_entries'] = len(self._semantic)
+        hits = stats['exact_hits'] + stats['semantic_hits']
+        lookups = hits + stats['misses']
+        stats['hit_rate'] = hits / lookups if lookups else 0.0
+        stats['mean_hit_ms'] = 1000 * stats.pop('hit_seconds') / hits if hits else 0.0
+        return stats
@@ -0,0 +1,426 @@
+import logging
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+from sentence_transformers import SentenceTransformer
+
+import config
+from utils.bm25 import BM25Index
+from utils.embedding_store import EmbeddingStore
+from utils.ingestion import (append_chunk_file, chunk_documents, load_chunk_file, remove_chunks, replaced_documents,
+                             store_chunks)
+from utils.kb_snapshot import file_signature
+from utils.knowledge_base import get_knowledge_base
+from utils.metrics import span
+from utils.query_embedder import QueryEmbedder
+from utils.vector_index import load_or_build_index
+
+logger = logging.getLogger(__name__)
+
+# Knowledge base files that feed the retrieval corpus; editing one rebuilds it
+CORPUS_FILES = {'emergency_contacts', 'departments', 'common_queries', 'kids_safety', 'english_responses',
+                'tamil_responses', 'tamil_qa'}
+
+LANGUAGES = ('english', 'tamil')
+
+_TAMIL_CHARACTER = re.compile(r'[\u0B80-\u0BFF]')
+_LETTER = re.compile(r'[^\W\d_]')
+
+
+class _Corpus(NamedTuple):
+    """Retrieval documents with their languages, embeddings and indexes, swapped in as one unit"""
+    documents: List[str]
+    languages: List[str]
+    embeddings: np.ndarray
+    index: Any
+    lexical: Optional[BM25Index]
+
+
+def detect_language(text: str) -> str:
+    """'tamil' if most letters of ``text`` are Tamil script, otherwise 'english'"""
+    letters = len(_LETTER.findall(text))
+    return 'tamil' if letters and len(_TAMIL_CHARACTER.findall(text)) > letters / 2 else 'english'
+
+
+def _response_patterns(data: Any):
+    patterns = data.get('patterns', []) if isinstance(data, dict) else []
+    return patterns.values() if isinstance(patterns, dict) else patterns
+
+
+def prepare_documents(knowledge_base: Dict[str, Any]) -> Tuple[List[str], List[str]]:
+    """Retrieval documents from the knowledge base files and ingested document chunks, with their languages"""
+    documents, languages = [], []
+
+    def add(text: str, language: str) -> None:
+        documents.append(text)
+        languages.append(language)
+
+    for language in LANGUAGES:
+        # Add emergency contacts
+        for contact, number in knowledge_base['emergency_contacts'][language].items():
+            add(f"{contact}: {number}", language)
+
+        # Add departments
+        for category, items in knowledge_base['departments'][language].items():
+            if isinstance(items, dict):
+                for dept, desc in items.items():
+                    add(f"{dept}: {desc}", language)
+
+        # Add common queries
+        for category, items in knowledge_base['common_queries'][language].items():
+            if isinstance(items, dict):
+                for query, answer in items.items():
+                    add(f"Q: {query}\nA: {answer}", language)
+
+        # Add kids safety
+        for category, items in knowledge_base['kids_safety'][language].items():
+            if isinstance(items, list):
+                for item in items:
+                    add(item, language)
+
+        # Add response patterns
+        for pattern in _response_patterns(knowledge_base.get(f'{language}_responses')):
+            if isinstance(pattern, dict) and 'keywords' in pattern and 'response' in pattern:
+                add(f"Keywords: {', '.join(pattern['keywords'])}\nResponse: {pattern['response']}", language)
+
+    # Add Tamil questions and answers by topic
+    for topic, items in (knowledge_base.get('tamil_qa') or {}).items():
+        if isinstance(items, dict):
+            for query, answer in items.items():
+                add(f"Q: {query}\nA: {answer}", 'tamil')
+
+    # Add chunks from ingested documents (see ingest_documents.py)
+    for chunk in load_chunk_file(config.INGESTION_SETTINGS['chunks_file']):
+        add(chunk['text'], detect_language(chunk['text']))
+
+    return documents, languages
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[int]], k: float = 60.0) -> List[int]:
+    """Merge ranked lists of document ids by the sum of ``1 / (k + rank)`` over the lists each appears in"""
+    scores: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+class Retriever:
+    """Embedding search over the knowledge base and ingested documents.
+
+    One instance per process serves every generation backend (see
+    ``get_retriever``). The corpus is rebuilt when knowledge base files are
+    edited and extended when documents are ingested; listeners registered
+    with ``subscribe`` are called after each change, e.g. to drop cached
+    answers.
+    """
+
+    def __init__(self, embedder=None, cache_dir: Optional[str] = None):
+        self.startup_timings: Dict[str, float] = {}
+        stage_start = time.perf_counter()
+
+        settings = config.EMBEDDING_SETTINGS
+        embedding_model = settings['model_name']
+        self.embedder = embedder or SentenceTransformer(
+            embedding_model,
+            device='cpu',
+            cache_folder='./model_cache'
+        )
+        # Queries from concurrent requests are encoded together, and repeated ones not at all
+        self.query_embedder = QueryEmbedder(
+            self.embedder,
+            max_batch_size=settings['query_batch_size'],
+            batch_wait=settings['query_batch_wait'],
+            cache_size=settings['query_cache_size']
+        )
+        stage_start = self._record_stage('embedder', stage_start)
+
+        knowledge_base = get_knowledge_base()
+        self.knowledge_base = knowledge_base.snapshot()
+        stage_start = self._record_stage('knowledge_base', stage_start)
+
+        # Take the documents and embeddings from the compiled snapshot when it is current, otherwise
+        # create them, re-encoding only documents missing from the on-disk store
+        self.embedding_store = EmbeddingStore(embedding_model, cache_dir or settings['cache_dir'])
+        self._stores = {'': self.embedding_store}
+        self._lock = threading.Lock()
+        self._listeners: List[Callable[[], None]] = []
+        compiled = self._compiled_corpus(knowledge_base, embedding_model)
+        if compiled is not None:
+            documents, languages, embeddings = compiled
+            snapshot = knowledge_base.compiled
+            # Lets the vector index be saved and later reloads reuse these rows instead of re-encoding them
+            self.embedding_store.attach(documents, embeddings, f"{snapshot.path}:{snapshot.header['created']}")
+            logger.info(f"Loaded {len(documents)} documents and embeddings from {snapshot.path}")
+        else:
+            logger.info("Preparing document embeddings...")
+            documents, languages = prepare_documents(self.knowledge_base)
+            embeddings = self.embed_documents(documents)
+        stage_start = self._record_stage('embeddings', stage_start)
+        self._corpus = self._build_corpus(documents, languages, embeddings)
+        self._document_versions = chunk_documents(load_chunk_file(config.INGESTION_SETTINGS['chunks_file']))
+        self._record_stage('index', stage_start)
+
+        # Rebuild the corpus in the background when knowledge base files are edited
+        get_knowledge_base().subscribe(self._reload_knowledge_base)
+
+    def _record_stage(self, stage: str, start: float) -> float:
+        now = time.perf_counter()
+        self.startup_timings[stage] = now - start
+        return now
+
+    @property
+    def documents(self) -> List[str]:
+        return self._corpus.documents
+
+    @property
+    def embeddings(self) -> np.ndarray:
+        return self._corpus.embeddings
+
+    @property
+    def index(self):
+        return self._corpus.index
+
+    @property
+    def languages(self) -> List[str]:
+        return self._corpus.languages
+
+    def subscribe(self, listener: Callable[[], None]) -> None:
+        """Call ``listener()`` after every change to the corpus"""
+        self._listeners.append(listener)
+
+    def _notify(self) -> None:
+        for listener in self._listeners:
+            try:
+                listener()
+            except Exception as e:
+                logger.error(f"Error in corpus listener: {str(e)}")
+
+    def embed_query(self, query: str) -> np.ndarray:
+        """Encode a query as a (1, dim) unit-length embedding"""
+        with span('embedding'):
+            return self.query_embedder.encode(query)
+
+    def search(self, query: str, candidates: Optional[int] = None,
+               query_embedding: Optional[np.ndarray] = None, language: Optional[str] = None) -> List[str]:
+        """The ``candidates`` documents most relevant to the query, best first.
+
+        Dense and BM25 rankings of the top ``fusion_pool`` documents each are
+        merged by reciprocal rank fusion, so both paraphrases and exact terms
+        such as "FIR" or "1098" are found. ``language`` restricts the results
+        to 'english' or 'tamil' documents; the rankings are filtered before
+        they are cut to ``fusion_pool``, searching deeper when the filter
+        leaves too few.
+        """
+        if query_embedding is None:
+            query_embedding = self.embed_query(query)
+
+        with span('retrieval'):
+            # The indexes and documents come from the same snapshot in case a reload swaps them meanwhile
+            corpus = self._corpus
+            settings = config.RETRIEVAL_SETTINGS
+            candidates = candidates or config.CONTEXT_SETTINGS['candidates']
+            target = max(candidates, settings['fusion_pool'])
+
+            pool = target
+            while True:
+                rankings, exhausted = self._rankings(corpus, query, query_embedding, pool)
+                if language is None:
+                    break
+                rankings = [[i for i in ranking if corpus.languages[i] == language] for ranking in rankings]
+                # When most hits are in the other language, search deeper until each ranking has a full
+                # pool in this one or holds every document it can match
+                if pool >= len(corpus.documents) or all(len(ranking) >= target or done
+                                                        for ranking, done in zip(rankings, exhausted)):
+                    break
+                pool = min(4 * pool, len(corpus.documents))
+            rankings = [ranking[:target] for ranking in rankings]
+
+            if len(rankings) == 1:
+                ranked = rankings[0]
+            else:
+                ranked = reciprocal_rank_fusion(rankings, settings['rrf_k'])
+            return [corpus.documents[i] for i in ranked[:candidates]]
+
+    @staticmethod
+    def _rankings(corpus: _Corpus, query: str, query_embedding: np.ndarray,
+                  pool: int) -> Tuple[List[List[int]], List[bool]]:
+        """Dense and BM25 rankings of the top ``pool`` documents, and whether each returned fewer than asked"""
+        # Approximate backends pad missing hits with -1
+        dense, _ = corpus.index.search(query_embedding, pool)
+        rankings = [[i for i in dense[0] if i >= 0]]
+        if corpus.lexical is not None:
+            lexical, _ = corpus.lexical.search(query, pool)
+            rankings.append(lexical.tolist())
+        return rankings, [len(ranking) < pool for ranking in rankings]
+
+    def known_documents(self) -> Dict[str, str]:
+        """Content hash of every ingested source file by path, so ingestion can skip unchanged files"""
+        with self._lock:
+            return dict(self._document_versions)
+
+    def add_documents(self, chunks: List[Dict[str, str]]) -> int:
+        """Embed document chunks and add them to the live index.
+
+        Serving continues meanwhile: the new corpus is built off to the side
+        and swapped in together with the index that refers to it. Chunks of
+        new documents are appended to the index; when a chunk comes from an
+        edited version of an already ingested file, that file's old chunks
+        are dropped and the corpus is rebuilt, re-encoding only new text.
+        Returns the number of chunks added.
+        """
+        if not chunks:
+            return 0
+        chunks_file = config.INGESTION_SETTINGS['chunks_file']
+        with self._lock:
+            replaced = replaced_documents(self._document_versions, chunks)
+            if replaced:
+                removed = store_chunks(chunks_file, chunks)
+                documents, languages = prepare_documents(self.knowledge_base)
+                self._corpus = self._build_corpus(documents, languages, self._embed_reusing(documents))
+                logger.info(f"Replaced {removed} chunks of {len(replaced)} edited documents with {len(chunks)} new ones")
+            else:
+                texts = [chunk['text'] for chunk in chunks]
+                embeddings = self.embedder.encode(texts, batch_size=32, normalize_embeddings=True)
+                corpus = self._corpus
+                documents = corpus.documents + texts
+                self._corpus = _Corpus(
+                    documents,
+                    corpus.languages + [detect_language(text) for text in texts],
+                    np.concatenate([corpus.embeddings, embeddings]),
+                    corpus.index.extended(embeddings),
+                    self._build_lexical(documents)
+                )
+                append_chunk_file(chunks_file, chunks)
+            self._document_versions.update(chunk_documents(chunks))
+
+        self._notify()
+        return len(chunks)
+
+    def remove_documents(self, paths: List[str]) -> int:
+        """Drop the ingested chunks of the files at ``paths``, e.g. of one that failed half way through ingestion.
+
+        Returns the number of chunks removed.
+        """
+        with self._lock:
+            removed = remove_chunks(config.INGESTION_SETTINGS['chunks_file'], paths)
+            if removed:
+                documents, languages = prepare_documents(self.knowledge_base)
+                self._corpus = self._build_corpus(documents, languages, self._embed_reusing(documents))
+                logger.info(f"Removed {removed} chunks of {len(paths)} documents")
+            for path in paths:
+                self._document_versions.pop(path, None)
+
+        if removed:
+            self._notify()
+        return removed
+
+    def persist_embeddings(self) -> None:
+        """Write the embeddings of ingested chunks to the embedding store so restarts do not re-encode them"""
+        with self._lock:
+            # Every document already has an embedding in memory; the store only needs them written out
+            corpus = self._corpus
+            self._corpus = corpus._replace(embeddings=self._embed_reusing(corpus.documents))
+
+    def _embed_reusing(self, documents: List[str]) -> np.ndarray:
+        """Like embed_documents, but rows already in the live corpus are copied instead of encoded"""
+        corpus = self._corpus
+        rows = dict(zip(corpus.documents, corpus.embeddings))
+
+        def encode(docs: List[str]) -> np.ndarray:
+            new = [doc for doc in docs if doc not in rows]
+            if new:
+                rows.update(zip(new, self.embedder.encode(new, batch_size=32, normalize_embeddings=True)))
+            return np.stack([rows[doc] for doc in docs])
+
+        return self.embedding_store.get_embeddings(documents, encode)
+
+    @staticmethod
+    def _compiled_corpus(knowledge_base, model_name: str) -> Optional[Tuple[List[str], List[str], np.ndarray]]:
+        """Documents, languages and embeddings from the knowledge base snapshot, if none of their sources changed"""
+        if knowledge_base.compiled is None or not CORPUS_FILES <= knowledge_base.compiled_files:
+            return None
+        chunks_signature = file_signature(config.INGESTION_SETTINGS['chunks_file'])
+        return knowledge_base.compiled.corpus(model_name, chunks_signature)
+
+    def embed_documents(self, documents: List[str], namespace: str = '') -> np.ndarray:
+        """Embeddings of ``documents``, encoding only those missing from the embedding store.
+
+        Other consumers pass their own ``namespace`` so their documents are
+        stored apart from the retrieval corpus instead of replacing it.
+        """
+        store = self._stores.get(namespace)
+        if store is None:
+            store = self._stores[namespace] = EmbeddingStore(
+                self.embedding_store.model_name, self.embedding_store.cache_dir, namespace
+            )
+        return store.get_embeddings(
+            documents,
+            lambda docs: self.embedder.encode(
+                docs,
+                batch_size=32,  # Smaller batch size for CPU
+                show_progress_bar=True,
+                normalize_embeddings=True  # Lets the index map the store without a normalized copy
+            )
+        )
+
+    def _reload_knowledge_base(self, knowledge_base: Dict[str, Any], changed: List[str]) -> None:
+        """Rebuild the corpus from edited knowledge base files and swap it in.
+
+        Only documents whose text changed are re-encoded: rows already in the
+        live corpus, including ingested chunks not yet persisted, are reused.
+        Requests keep using the previous corpus until the new one is complete.
+        """
+        if not CORPUS_FILES.intersection(changed):
+            return
+        with self._lock:
+            start = time.perf_counter()
+            old_documents = set(self._corpus.documents)
+            documents, languages = prepare_documents(knowledge_base)
+            self._corpus = self._build_corpus(documents, languages, self._embed_reusing(documents))
+            self.knowledge_base = knowledge_base
+
+            added = len(set(documents) - old_documents)
+            removed = len(old_documents - set(documents))
+            logger.info(f"Reloaded corpus: {len(documents)} documents, {added} added, {removed} removed "
+                        f"in {time.perf_counter() - start:.2f}s")
+
+        self._notify()
+
+    def _build_corpus(self, documents: List[str], languages: List[str], embeddings: np.ndarray) -> _Corpus:
+        return _Corpus(documents, languages, embeddings, self._build_index(embeddings), self._build_lexical(documents))
+
+    @staticmethod
+    def _build_lexical(documents: List[str]) -> Optional[BM25Index]:
+        """BM25 index over ``documents``, or None when hybrid retrieval is off"""
+        settings = config.RETRIEVAL_SETTINGS
+        if not settings['hybrid']:
+            return None
+        return BM25Index(documents, k1=settings['bm25_k1'], b=settings['bm25_b'], max_df=settings['bm25_max_df'])
+
+    def _build_index(self, embeddings: np.ndarray):
+        """Build (or load) the vector index configured in config.RETRIEVAL_SETTINGS"""
+        settings = config.RETRIEVAL_SETTINGS
+        backend = settings['backend']
+        if backend == 'ivf':
+            params = {'n_lists': settings['ivf_lists'], 'nprobe': settings['ivf_nprobe']}
+        else:
+            params = {'dtype': settings['dtype']}
+        return load_or_build_index(embeddings, self.embedding_store.index_path(backend), backend, **params)
+
+
+_default_retriever = None
+_default_lock = threading.Lock()
+
+
+def get_retriever() -> Retriever:
+    """Return the process-wide retriever, loading the embedder and corpus on first use"""
+    global _default_retriever
+    if _default_retriever is None:
+        with _default_lock:
+            if _default_retriever is None:
+                _default_retriever = Retriever()
+    return _default_retriever
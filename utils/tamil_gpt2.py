@@ -1,86 +1,173 @@
-import torch
-from transformers import AutoModelForCausalLM, AutoTokenizer
 import os
 import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional
+import config
+from utils.inference_scheduler import InferenceScheduler
+from utils.knowledge_base import get_knowledge_base
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-class TamilGPT2Chatbot:
-    def __init__(self):
-        try:
-            # Use the AI4Bharat Tamil GPT-2 model
-            model_name = "ai4bharat/IndicGPT2-Tamil"
-            logger.info(f"Loading model from {model_name}")
-            
-            self.tokenizer = AutoTokenizer.from_pretrained(model_name)
-            self.model = AutoModelForCausalLM.from_pretrained(model_name)
-            
-            # Move model to GPU if available
-            if torch.cuda.is_available():
-                self.model = self.model.to('cuda')
-                logger.info("Model moved to GPU")
-            else:
-                logger.info("Using CPU for model inference")
-            
-            logger.info("Model loaded successfully")
-            
-        except Exception as e:
-            logger.error(f"Error initializing model: {str(e)}")
-            raise
-
-    def generate_response(self, prompt, max_length=100):
+
+def configure_threads(intra_op_threads: Optional[int], inter_op_threads: Optional[int]) -> None:
+    """Set PyTorch's CPU thread pools; they are process-wide, so this also affects other torch models"""
+    import torch
+    if intra_op_threads:
+        torch.set_num_threads(intra_op_threads)
+    if inter_op_threads:
         try:
-            # Tokenize the input
-            inputs = self.tokenizer.encode(prompt, return_tensors='pt')
-            
-            # Move inputs to the same device as the model
-            if torch.cuda.is_available():
-                inputs = inputs.to('cuda')
-            
-            # Generate response
+            torch.set_num_interop_threads(inter_op_threads)
+        except RuntimeError:
+            # Only allowed before the first parallel operation in the process
+            logger.warning("PyTorch inter-op threads already in use; keeping the current setting")
+
+
+def _conv1d_to_linear(model) -> int:
+    """Replace GPT-2's Conv1D projections with equivalent nn.Linear layers, returning how many were swapped.
+
+    Conv1D is a transposed Linear that dynamic quantization does not
+    recognise, so without this only the output head would become int8.
+    """
+    import torch
+    from transformers.pytorch_utils import Conv1D
+
+    replaced = 0
+    for parent in list(model.modules()):
+        for name, child in list(parent.named_children()):
+            if isinstance(child, Conv1D):
+                n_in, n_out = child.weight.shape
+                linear = torch.nn.Linear(n_in, n_out)
+                linear.weight = torch.nn.Parameter(child.weight.detach().t().contiguous())
+                linear.bias = torch.nn.Parameter(child.bias.detach())
+                setattr(parent, name, linear)
+                replaced += 1
+    return replaced
+
+
+class TamilGPT2Chatbot:
+    """Free-form Tamil generation with a GPT-2 model, tuned for CPU serving.
+
+    The model is loaded on first use (or at construction with ``lazy=False``),
+    its Linear layers are quantized to int8, and concurrent prompts are
+    generated together in batches of up to ``batch_size`` through an
+    InferenceScheduler. Settings default to config.TAMIL_GPT2_SETTINGS.
+    """
+
+    def __init__(self, settings: Optional[Dict[str, Any]] = None, **overrides):
+        self.settings = dict(settings or config.TAMIL_GPT2_SETTINGS, **overrides)
+        self.model = None
+        self.tokenizer = None
+        self.device = 'cpu'
+        self.load_seconds = None
+        self._load_lock = threading.Lock()
+
+        # One model, one generation at a time; prompts that queue up meanwhile are batched together
+        self.scheduler = InferenceScheduler(
+            'tamil_gpt2',
+            max_queue=self.settings['max_queue'],
+            timeout=self.settings['timeout'],
+            batch_handler=self.generate_batch,
+            max_batch_size=self.settings['batch_size'],
+            batch_wait=self.settings['batch_wait']
+        )
+
+        if not self.settings['lazy']:
+            self.load()
+
+    def load(self) -> None:
+        """Load, quantize and configure the model unless that has been done already"""
+        if self.model is not None:
+            return
+        with self._load_lock:
+            if self.model is not None:
+                return
+            try:
+                import torch
+                from transformers import AutoModelForCausalLM, AutoTokenizer
+
+                start = time.perf_counter()
+                model_name = self.settings['model_name']
+                logger.info(f"Loading model from {model_name}")
+
+                tokenizer = AutoTokenizer.from_pretrained(model_name)
+                # Batched prompts are padded on the left so every row continues from its last real token
+                tokenizer.padding_side = 'left'
+                if tokenizer.pad_token is None:
+                    tokenizer.pad_token = tokenizer.eos_token
+                model = AutoModelForCausalLM.from_pretrained(model_name)
+                model.eval()
+
+                # Move model to GPU if available; quantization and thread settings are CPU only
+                if torch.cuda.is_available():
+                    model = model.to('cuda')
+                    self.device = 'cuda'
+                    logger.info("Model moved to GPU")
+                else:
+                    configure_threads(self.settings['intra_op_threads'], self.settings['inter_op_threads'])
+                    if self.settings['quantize']:
+                        replaced = _conv1d_to_linear(model)
+                        # In place, so the fp32 weights are released rather than copied
+                        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8,
+                                                                    inplace=True)
+                        logger.info(f"Quantized model to int8 ({replaced} projections converted)")
+                    logger.info(f"Using CPU for model inference with {torch.get_num_threads()} threads")
+
+                self.tokenizer = tokenizer
+                self.model = model
+                self.load_seconds = time.perf_counter() - start
+                logger.info(f"Model loaded successfully in {self.load_seconds:.1f}s")
+
+            except Exception as e:
+                logger.error(f"Error initializing model: {str(e)}")
+                raise
+
+    def generate_batch(self, prompts: List[str], max_new_tokens: Optional[int] = None) -> List[str]:
+        """Generate continuations of several prompts in one forward pass per token"""
+        import torch
+        self.load()
+        inputs = self.tokenizer(prompts, return_tensors='pt', padding=True).to(self.device)
+
+        # Greedy decoding with the KV cache; inference mode skips autograd bookkeeping entirely
+        with torch.inference_mode():
             outputs = self.model.generate(
-                inputs,
-                max_length=max_length,
+                **inputs,
+                max_new_tokens=max_new_tokens or self.settings['max_new_tokens'],
                 num_return_sequences=1,
                 no_repeat_ngram_size=2,
-                temperature=0.7,
-                top_k=50,
-                top_p=0.95,
-                pad_token_id=self.tokenizer.eos_token_id
+                do_sample=False,
+                use_cache=True,
+                pad_token_id=self.tokenizer.pad_token_id
             )
-            
-            # Decode and return the response
-            response = self.tokenizer.decode(outputs[0], skip_special_tokens=True)
-            return response
-            
-        except Exception as e:
-            logger.error(f"Error generating response: {str(e)}")
-            return "மன்னிக்கவும், பதில் உருவாக்குவதில் பிழை ஏற்பட்டது. தயவுசெய்து மீண்டும் முயற்சிக்கவும்."
 
+        # Decode only the generated tokens of each row
+        prompt_length = inputs['input_ids'].shape[1]
+        return [text.strip() for text in self.tokenizer.batch_decode(outputs[:, prompt_length:], skip_special_tokens=True)]
+
+    def generate_response(self, prompt: str) -> str:
+        """Generate a continuation of ``prompt``, batched with any other prompts waiting at the same time.
+
+        Raises SchedulerBusy when too many prompts are queued, and the model's
+        error if generation fails, so the backend router can fall back.
+        """
+        return self.scheduler.run_batched(prompt)
+
+    def stats(self) -> Dict[str, Any]:
+        return {'loaded': self.model is not None, 'load_seconds': self.load_seconds,
+                'scheduler': self.scheduler.metrics()}
+
+    # Reference data comes from the shared knowledge base, so edits to static/data apply here too
     def get_emergency_contacts(self):
-        return {
-            "அவசர உதவி": "100",
-            "குழந்தைகள் உதவி": "1098",
-            "போக்குவரத்து காவல்துறை": "103",
-            "கைப்பற்றல்": "100",
-            "தீயணைப்பு": "101"
-        }
+        return dict(get_knowledge_base().get('emergency_contacts')['tamil'])
 
     def get_department_info(self):
-        return {
-            "குற்றவியல் பிரிவு": "044-23452345",
-            "போக்குவரத்து பிரிவு": "044-23452346",
-            "கணினி குற்றங்கள் பிரிவு": "044-23452347",
-            "பெண்கள் பாதுகாப்பு பிரிவு": "044-23452348",
-            "குழந்தைகள் பாதுகாப்பு பிரிவு": "044-23452349"
-        }
+        return dict(get_knowledge_base().get('departments')['tamil'].get('தொடர்பு எண்கள்', {}))
 
     def get_common_queries(self):
-        return {
-            "காவல்நிலையம் கிடைக்கும்": "அருகிலுள்ள காவல்நிலையத்தை கண்டுபிடிக்க",
-            "கைப்பற்றல் செய்தல்": "கைப்பற்றல் செய்வதற்கான வழிமுறைகள்",
-            "போக்குவரத்து சான்று": "போக்குவரத்து சான்று பெறுவதற்கான வழிமுறைகள்",
-            "காவல்துறை சான்று": "காவல்துறை சான்று பெறுவதற்கான வழிமுறைகள்"
-        } 
\ No newline at end of file
+        queries = {}
+        for items in get_knowledge_base().get('common_queries')['tamil'].values():
+            if isinstance(items, dict):
+                queries.update(items)
+        return queries
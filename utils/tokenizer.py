@@ -0,0 +1,75 @@
+import re
+import unicodedata
+from functools import lru_cache
+from typing import List
+
+# Characters deleted before tokenizing: zero-width spaces and joiners, the word joiner, the BOM and
+# soft hyphens, which would otherwise split a word in two or make equal words compare unequal
+_INVISIBLE = re.compile('[\u200b\u200c\u200d\u2060\ufeff\u00ad]')
+
+# A token starts with a letter or digit and runs on through letters, digits and the combining marks
+# (Tamil vowel signs and pulli, Latin diacritics) that \w alone would split off. Everything else,
+# punctuation and underscores included, separates tokens.
+_TOKEN = re.compile(r'[^\W_](?:[^\W_]|[\u0300-\u036F\u0B80-\u0BFF])*')
+
+_TAMIL = re.compile(r'[\u0B80-\u0BFF]')
+
+# Common Tamil case and plural suffixes as written after the stem; one starting with a vowel sign
+# has merged into the stem's final consonant (புகார் + உக்கு -> புகாருக்கு)
+TAMIL_SUFFIXES = (
+    'களிலிருந்து', 'ிலிருந்து', 'களுக்காக', 'ுக்காக', 'க்காக', 'களுக்கு', 'ுக்கு', 'க்கு', 'ிற்கு',
+    'களில்', 'களின்', 'களை', 'கள்', 'ுடன்', 'ிடம்', 'ில்', 'ின்', 'ால்', 'ை'
+)
+_SUFFIX = re.compile('(?:' + '|'.join(sorted(TAMIL_SUFFIXES, key=len, reverse=True)) + ')$')
+
+# A hard consonant doubled onto a vowel-final word before the next one (வழக்குப் பதிவு)
+_SANDHI = re.compile(r'(?<=[\u0BBE-\u0BCC])[கசதப]\u0BCD$')
+
+# Oblique and plural stems of -am nouns (நிலையம் -> நிலையத்தில், நிலையங்கள்)
+_OBLIQUE = re.compile(r'(?:த\u0BCDத|ங\u0BCD)$')
+
+# The final u vowel sign or pulli, which case suffixes replace (வழக்கு -> வழக்கை, புகார் -> புகாரை)
+_FINAL_MARK = re.compile(r'[\u0BC1\u0BCD]$')
+
+# Stems shorter than this many code points are left alone (கை, வழக்கு)
+_MIN_STEM = 3
+
+
+def normalize(text: str) -> str:
+    """NFC-normalize, drop invisible characters and lower-case"""
+    if not text.isascii():
+        text = _INVISIBLE.sub('', unicodedata.normalize('NFC', text))
+    return text.lower()
+
+
+@lru_cache(maxsize=65536)
+def stem(token: str) -> str:
+    """Matching key of a Tamil word with up to two case or plural suffixes removed.
+
+    The key is not itself a word: the final u vowel sign or pulli is dropped
+    as well, so that வழக்கு and வழக்கை, புகார் and புகாருக்கு, or நிலையம் and
+    நிலையத்தில் get the same key. Words without Tamil letters are returned unchanged.
+    """
+    if not _TAMIL.search(token):
+        return token
+    token = _SANDHI.sub('', token)
+    for _ in range(2):
+        match = _SUFFIX.search(token)
+        if match is None or match.start() < _MIN_STEM:
+            break
+        token = _OBLIQUE.sub('ம', token[:match.start()])
+    return _FINAL_MARK.sub('', token)
+
+
+def tokenize(text: str) -> List[str]:
+    """Words of ``text`` in Tamil or English, never split inside a letter and its vowel signs"""
+    return _TOKEN.findall(normalize(text))
+
+
+def tokenize_stemmed(text: str) -> List[str]:
+    """``tokenize`` with the common Tamil suffixes stripped from each word"""
+    return [stem(token) for token in _TOKEN.findall(normalize(text))]
+
+
+def get_tokenizer(stemming: bool = False):
+    return tokenize_stemmed if stemming else tokenize
@@ -0,0 +1,351 @@
+import inspect
+import json
+import logging
+import os
+import time
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_DTYPES = ('float32', 'float16', 'int8')
+
+# Parameters that only affect searching; a saved index is reused whatever their value
+SEARCH_PARAMS = ('nprobe',)
+
+# Rows scored per block when the matrix has to be up-cast from float16/int8
+BLOCK_ROWS = 8192
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """Return ``matrix`` as contiguous float32 with unit-length rows.
+
+    Matrices that are already float32, contiguous and normalized (for example
+    a memory-mapped embedding store) are returned as-is without a copy.
+    """
+    matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+    if matrix.ndim == 1:
+        matrix = matrix.reshape(1, -1)
+    norms = np.linalg.norm(matrix, axis=1)
+    if matrix.shape[0] == 0 or np.allclose(norms, 1.0, atol=1e-3):
+        return matrix
+    norms[norms == 0] = 1.0
+    return matrix / norms[:, None]
+
+
+def top_k(scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Pick the ``k`` best columns of each row of ``scores`` with argpartition"""
+    k = min(k, scores.shape[1])
+    if k <= 0:
+        empty = np.empty((scores.shape[0], 0))
+        return empty.astype(np.int64), empty.astype(np.float32)
+    if k < scores.shape[1]:
+        candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        candidates = np.tile(np.arange(scores.shape[1]), (scores.shape[0], 1))
+    candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+    order = np.argsort(-candidate_scores, axis=1)
+    return np.take_along_axis(candidates, order, axis=1), np.take_along_axis(candidate_scores, order, axis=1)
+
+
+class VectorIndex:
+    """Interface shared by all vector index backends.
+
+    Backends return ``(indices, scores)`` arrays of shape (n_queries, k) with
+    the best match first, and can be saved to and loaded from a single
+    ``.npz`` file.
+    """
+
+    kind = None
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    def search(self, queries: np.ndarray, k: int = 3) -> Tuple[np.ndarray, np.ndarray]:
+        raise NotImplementedError
+
+    def extended(self, embeddings: np.ndarray) -> 'VectorIndex':
+        """Return a new index that also holds ``embeddings`` as documents ``len(self)`` onwards.
+
+        The current index is left untouched, so searches running against it
+        are unaffected and the caller can swap the new one in atomically.
+        """
+        raise NotImplementedError
+
+    def _arrays(self) -> Dict[str, np.ndarray]:
+        raise NotImplementedError
+
+    def _params(self) -> Dict:
+        return {}
+
+    @property
+    def build_params(self) -> Dict:
+        """The constructor arguments the index was built with, apart from the embeddings and SEARCH_PARAMS"""
+        return {}
+
+    def save(self, path: str) -> None:
+        """Write the index atomically to ``path``"""
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, kind=np.array(self.kind), params=np.array(json.dumps(self._params())), **self._arrays())
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def load(path: str) -> 'VectorIndex':
+        """Load an index written by :meth:`save`, whatever its backend"""
+        with np.load(path, allow_pickle=False) as data:
+            kind = str(data['kind'])
+            params = json.loads(str(data['params']))
+            arrays = {name: data[name] for name in data.files if name not in ('kind', 'params')}
+        if kind not in BACKENDS:
+            raise ValueError(f"Unknown vector index backend: {kind}")
+        return BACKENDS[kind]._from_arrays(arrays, params)
+
+
+class ExactIndex(VectorIndex):
+    """Brute-force cosine similarity search over a pre-normalized matrix.
+
+    The corpus is normalized once at build time, so a query costs one matrix
+    product plus an ``argpartition``. ``dtype`` may be ``float16`` or ``int8``
+    to halve or quarter the memory of large corpora at a small accuracy cost.
+    """
+
+    kind = 'exact'
+
+    def __init__(self, embeddings: np.ndarray, dtype: str = 'float32'):
+        if dtype not in SUPPORTED_DTYPES:
+            raise ValueError(f"Unsupported index dtype: {dtype}")
+        self.dtype = dtype
+        self.scales = None
+        normalized = normalize_rows(embeddings)
+        if dtype == 'float16':
+            self.matrix = normalized.astype(np.float16)
+        elif dtype == 'int8':
+            # Symmetric per-row quantization; scores are rescaled after the product
+            scales = np.abs(normalized).max(axis=1) / 127.0 if len(normalized) else np.ones(0)
+            scales[scales == 0] = 1.0
+            self.matrix = np.round(normalized / scales[:, None]).astype(np.int8)
+            self.scales = scales.astype(np.float32)
+        else:
+            self.matrix = normalized
+
+    def __len__(self) -> int:
+        return self.matrix.shape[0]
+
+    @property
+    def dim(self) -> int:
+        return self.matrix.shape[1]
+
+    def scores(self, queries: np.ndarray) -> np.ndarray:
+        """Cosine similarity of each query against every document"""
+        queries = normalize_rows(queries)
+        if self.dtype == 'float32':
+            return queries @ self.matrix.T
+
+        result = np.empty((queries.shape[0], len(self)), dtype=np.float32)
+        for start in range(0, len(self), BLOCK_ROWS):
+            block = self.matrix[start:start + BLOCK_ROWS].astype(np.float32)
+            if self.scales is not None:
+                block *= self.scales[start:start + BLOCK_ROWS, None]
+            result[:, start:start + BLOCK_ROWS] = queries @ block.T
+        return result
+
+    def search(self, queries: np.ndarray, k: int = 3) -> Tuple[np.ndarray, np.ndarray]:
+        """Return ``(indices, scores)`` of the ``k`` nearest documents per query.
+
+        ``queries`` may be a single vector or a (n_queries, dim) batch; all
+        queries are scored in a single matrix product.
+        """
+        return top_k(self.scores(queries), k)
+
+    def extended(self, embeddings: np.ndarray) -> 'ExactIndex':
+        added = ExactIndex(embeddings, self.dtype)
+        arrays = {'matrix': np.concatenate([self.matrix, added.matrix])}
+        if self.scales is not None:
+            arrays['scales'] = np.concatenate([self.scales, added.scales])
+        return ExactIndex._from_arrays(arrays, self._params())
+
+    def _arrays(self) -> Dict[str, np.ndarray]:
+        arrays = {'matrix': self.matrix}
+        if self.scales is not None:
+            arrays['scales'] = self.scales
+        return arrays
+
+    def _params(self) -> Dict:
+        return {'dtype': self.dtype}
+
+    @property
+    def build_params(self) -> Dict:
+        return {'dtype': self.dtype}
+
+    @classmethod
+    def _from_arrays(cls, arrays: Dict[str, np.ndarray], params: Dict) -> 'ExactIndex':
+        index = cls.__new__(cls)
+        index.dtype = params['dtype']
+        index.matrix = arrays['matrix']
+        index.scales = arrays.get('scales')
+        return index
+
+
+class IVFIndex(VectorIndex):
+    """Approximate search with an inverted file over spherical k-means clusters.
+
+    Documents are grouped into ``n_lists`` clusters and stored contiguously by
+    cluster. A query is only scored against the ``nprobe`` clusters whose
+    centroids are closest to it, so raising ``nprobe`` trades latency for
+    recall; ``nprobe == n_lists`` is an exact search.
+    """
+
+    kind = 'ivf'
+
+    def __init__(self, embeddings: np.ndarray, n_lists: Optional[int] = None, nprobe: int = 8,
+                 n_iter: int = 10, max_train: int = 50000, seed: int = 0):
+        start = time.perf_counter()
+        self._build_params = {'n_lists': n_lists, 'n_iter': n_iter, 'max_train': max_train, 'seed': seed}
+        normalized = normalize_rows(embeddings)
+        n_docs = normalized.shape[0]
+        if n_lists is None:
+            n_lists = int(np.sqrt(n_docs))
+        n_lists = max(1, min(n_lists, n_docs))
+        self.nprobe = nprobe
+
+        rng = np.random.default_rng(seed)
+        train = normalized
+        if n_docs > max_train:
+            train = normalized[np.sort(rng.choice(n_docs, max_train, replace=False))]
+        centroids = train[rng.choice(train.shape[0], n_lists, replace=False)].copy()
+        for _ in range(n_iter):
+            assignment = self._assign(train, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, train)
+            empty = np.bincount(assignment, minlength=n_lists) == 0
+            sums[empty] = centroids[empty]
+            centroids = normalize_rows(sums)
+        self.centroids = centroids
+
+        assignment = self._assign(normalized, centroids)
+        order = np.argsort(assignment, kind='stable')
+        self.ids = order.astype(np.int64)
+        self.matrix = np.ascontiguousarray(normalized[order])
+        self.offsets = np.concatenate([[0], np.cumsum(np.bincount(assignment, minlength=n_lists))]).astype(np.int64)
+        logger.info(f"Built IVF index over {n_docs} vectors with {n_lists} lists "
+                    f"in {time.perf_counter() - start:.2f}s")
+
+    @staticmethod
+    def _assign(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+        assignment = np.empty(vectors.shape[0], dtype=np.int64)
+        for start in range(0, vectors.shape[0], BLOCK_ROWS):
+            block = vectors[start:start + BLOCK_ROWS]
+            assignment[start:start + BLOCK_ROWS] = np.argmax(block @ centroids.T, axis=1)
+        return assignment
+
+    def __len__(self) -> int:
+        return self.matrix.shape[0]
+
+    @property
+    def n_lists(self) -> int:
+        return self.centroids.shape[0]
+
+    def search(self, queries: np.ndarray, k: int = 3,
+               nprobe: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Return ``(indices, scores)`` of the ``k`` best documents in the probed lists"""
+        queries = normalize_rows(queries)
+        nprobe = min(nprobe or self.nprobe, self.n_lists)
+        probes, _ = top_k(queries @ self.centroids.T, nprobe)
+
+        indices = np.full((queries.shape[0], k), -1, dtype=np.int64)
+        scores = np.full((queries.shape[0], k), -np.inf, dtype=np.float32)
+        for row, (query, lists) in enumerate(zip(queries, probes)):
+            rows = np.concatenate([np.arange(self.offsets[l], self.offsets[l + 1]) for l in lists])
+            if rows.size == 0:
+                continue
+            best, best_scores = top_k((self.matrix[rows] @ query)[None, :], k)
+            indices[row, :best.shape[1]] = self.ids[rows[best[0]]]
+            scores[row, :best.shape[1]] = best_scores[0]
+        return indices, scores
+
+    def extended(self, embeddings: np.ndarray) -> 'IVFIndex':
+        """Add vectors to their nearest existing lists; the centroids are not retrained"""
+        normalized = normalize_rows(embeddings)
+        assignment = self._assign(normalized, self.centroids)
+        old_lists = np.repeat(np.arange(self.n_lists), np.diff(self.offsets))
+        lists = np.concatenate([old_lists, assignment])
+        order = np.argsort(lists, kind='stable')
+        new_ids = np.arange(len(self), len(self) + len(normalized), dtype=np.int64)
+        arrays = {
+            'centroids': self.centroids,
+            'ids': np.concatenate([self.ids, new_ids])[order],
+            'matrix': np.ascontiguousarray(np.concatenate([self.matrix, normalized])[order]),
+            'offsets': np.concatenate([[0], np.cumsum(np.bincount(lists, minlength=self.n_lists))]).astype(np.int64)
+        }
+        return IVFIndex._from_arrays(arrays, self._params())
+
+    def _arrays(self) -> Dict[str, np.ndarray]:
+        return {'centroids': self.centroids, 'ids': self.ids, 'matrix': self.matrix, 'offsets': self.offsets}
+
+    def _params(self) -> Dict:
+        return {'nprobe': self.nprobe, 'build': self._build_params}
+
+    @property
+    def build_params(self) -> Dict:
+        return self._build_params
+
+    @classmethod
+    def _from_arrays(cls, arrays: Dict[str, np.ndarray], params: Dict) -> 'IVFIndex':
+        index = cls.__new__(cls)
+        index.nprobe = params['nprobe']
+        # Indexes saved before build parameters were recorded never match a requested build
+        index._build_params = params.get('build')
+        for name in ('centroids', 'ids', 'matrix', 'offsets'):
+            setattr(index, name, arrays[name])
+        return index
+
+
+BACKENDS = {backend.kind: backend for backend in (ExactIndex, IVFIndex)}
+
+
+def create_index(embeddings: np.ndarray, backend: str = 'exact', **params) -> VectorIndex:
+    """Build a vector index with the named backend"""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown vector index backend: {backend}")
+    return BACKENDS[backend](embeddings, **params)
+
+
+def requested_build_params(backend: str, params: Dict) -> Dict:
+    """``params`` with the backend's defaults filled in, without the embeddings and SEARCH_PARAMS"""
+    bound = inspect.signature(BACKENDS[backend]).bind(None, **params)
+    bound.apply_defaults()
+    return {name: value for name, value in bound.arguments.items()
+            if name != 'embeddings' and name not in SEARCH_PARAMS}
+
+
+def load_or_build_index(embeddings: np.ndarray, path: Optional[str], backend: str = 'exact',
+                        **params) -> VectorIndex:
+    """Load the index saved at ``path`` if it matches ``embeddings`` and ``params``, else build and save it.
+
+    A saved index is rebuilt when any build parameter differs from the
+    requested one (with defaults applied); search parameters such as
+    ``nprobe`` are simply applied to it. The exact backend is cheap to build
+    and is never written to disk.
+    """
+    if backend == 'exact' or path is None:
+        return create_index(embeddings, backend, **params)
+    if os.path.exists(path):
+        try:
+            index = VectorIndex.load(path)
+            if (index.kind == backend and len(index) == len(embeddings)
+                    and index.build_params == requested_build_params(backend, params)):
+                if 'nprobe' in params:
+                    index.nprobe = params['nprobe']
+                logger.info(f"Loaded {backend} index from {path}")
+                return index
+            logger.info(f"Rebuilding {backend} index {path}: it was built for other documents or settings")
+        except Exception as e:
+            logger.warning(f"Could not load vector index {path}: {str(e)}")
+    index = create_index(embeddings, backend, **params)
+    try:
+        index.save(path)
+    except OSError as e:
+        logger.warning(f"Could not save vector index {path}: {str(e)}")
+    return index